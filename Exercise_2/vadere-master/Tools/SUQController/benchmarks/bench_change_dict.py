@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+"""Benchmark of applying parameter variations to a Vadere scenario: `change_dict`
+(deep copy and key look-up per variation) vs. a compiled `KeyPathPlan`.
+
+Usage: python benchmarks/bench_change_dict.py <path.scenario> <key> [<key> ...]
+"""
+
+import argparse
+import json
+import timeit
+
+import numpy as np
+
+from suqc.parameter.postchanges import PostScenarioChangesBase
+from suqc.utils.dict_utils import KeyPathPlan, change_dict, deep_dict_lookup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("scenario_path")
+    parser.add_argument("keys", nargs="+", help="numeric keys to vary")
+    parser.add_argument("--nr-variations", type=int, default=1000)
+    args = parser.parse_args()
+
+    with open(args.scenario_path, "r") as f:
+        basis = json.load(f)
+
+    post_changes = PostScenarioChangesBase(apply_default=True)
+
+    rng = np.random.default_rng(1)
+    variations = [
+        {
+            k: float(deep_dict_lookup(basis, k)[0]) * rng.uniform(0.5, 1.5)
+            for k in args.keys
+        }
+        for _ in range(args.nr_variations)
+    ]
+
+    def run_change_dict():
+        for i, var in enumerate(variations):
+            scenario = change_dict(basis, changes=var)
+            post_changes.change_scenario(scenario, i, 0, var)
+
+    def run_key_plan():
+        plan = KeyPathPlan(basis, keys=args.keys)  # compile once per basis
+        for i, var in enumerate(variations):
+            scenario = plan.apply(var)
+            post_changes.change_scenario(scenario, i, 0, var, key_plan=plan)
+
+    # both implementations have to return the same scenarios
+    plan = KeyPathPlan(basis, keys=args.keys)
+    for i, var in enumerate(variations[:10]):
+        expected = post_changes.change_scenario(change_dict(basis, var), i, 0, var)
+        actual = post_changes.change_scenario(plan.apply(var), i, 0, var, plan)
+        assert json.dumps(expected) == json.dumps(actual)
+
+    for name, func in [("change_dict", run_change_dict), ("KeyPathPlan", run_key_plan)]:
+        best = min(timeit.repeat(func, number=1, repeat=3))
+        print(
+            f"{name:>12}: {best:.3f} s for {args.nr_variations} variations "
+            f"({best / args.nr_variations * 1e6:.1f} us per variation)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""Convergence of the mean estimate for RandomSampling (i.i.d.) vs. scrambled Sobol and
+Halton designs. A cheap analytic function stands in for Vadere: the Sobol G-function on
+[0, 1]^d, which has the exact mean 1.
+
+Usage: python benchmarks/bench_qmc_convergence.py [--dimension 4] [--repetitions 20]
+"""
+
+import argparse
+
+import numpy as np
+
+from suqc.parameter.sampling import (
+    HaltonSampling,
+    Parameter,
+    RandomSampling,
+    SobolSampling,
+)
+
+
+def g_function(x: np.ndarray):
+    a = np.arange(x.shape[1]) / 2.0
+    return np.prod((np.abs(4 * x - 2) + a) / (1 + a), axis=1)
+
+
+def random_points(dimension, nr_samples, seed):
+    np.random.seed(seed)
+    sampling = RandomSampling()
+    for i in range(dimension):
+        sampling.add_parameter(f"x{i}", np.random.uniform, low=0, high=1)
+    sampling.create_grid(nr_samples)
+    return sampling.points.to_numpy()
+
+
+def qmc_points(cls, dimension, nr_samples, seed):
+    parameters = [Parameter(f"x{i}", range=[0, 1]) for i in range(dimension)]
+    return cls(parameters, seed=seed).create_grid(nr_samples).points.to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dimension", type=int, default=4)
+    parser.add_argument("--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    samplers = {
+        "random": random_points,
+        "sobol": lambda d, n, s: qmc_points(SobolSampling, d, n, s),
+        "halton": lambda d, n, s: qmc_points(HaltonSampling, d, n, s),
+    }
+
+    print(f"RMSE of the mean estimate (exact mean=1, d={args.dimension})")
+    print(f"{'N':>6} " + " ".join(f"{name:>10}" for name in samplers))
+
+    for m in range(6, 13):
+        nr_samples = 2**m
+        rmse = list()
+        for sampler in samplers.values():
+            errors = [
+                g_function(sampler(args.dimension, nr_samples, seed)).mean() - 1
+                for seed in range(args.repetitions)
+            ]
+            rmse.append(np.sqrt(np.mean(np.square(errors))))
+        print(f"{nr_samples:>6} " + " ".join(f"{e:>10.2e}" for e in rmse))
+
+
+if __name__ == "__main__":
+    main()
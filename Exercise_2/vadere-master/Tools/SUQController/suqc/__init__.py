@@ -1,8 +1,23 @@
 #!/usr/bin/env python3
 
+from suqc.adaptive import AdaptiveSampling
+from suqc.cache import SimulationCache
+from suqc.executor import (
+    DynamicPoolExecutor,
+    LocalHostRunner,
+    LocalPoolExecutor,
+    MemoryAdmission,
+    MultiHostExecutor,
+    RetryPolicy,
+    RuntimePredictor,
+    SSHHostRunner,
+)
 from suqc.parameter.sampling import *
 from suqc.parameter.postchanges import PostScenarioChangesBase
 from suqc.qoi import *
 from suqc.request import *
+from suqc.sensitivity import morris_analysis, sobol_analysis
+from suqc.surrogate import Surrogate
+from suqc.tracing import Tracer
 
 __version__ = "2.1"
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+import itertools
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from suqc.parameter.sampling import Parameter, UnitHypercube
+from suqc.request import DictVariation
+from suqc.surrogate import gaussian_process_regressor, valid_qoi_values
+
+
+def request_batch_runner(
+    scenario_path: str,
+    model,
+    qoi,
+    qoi_reduction: Optional[Callable] = None,
+    scenario_runs: int = 1,
+    output_path=None,
+    output_folder="adaptive",
+    njobs: int = 1,
+    **variation_kwargs,
+):
+    """Returns a function `run_batch(points) -> np.ndarray` for AdaptiveSampling, which
+    runs each batch as DictVariation (in a new environment "<output_folder>_batch<nr>").
+
+    :param qoi_reduction: maps the compiled QoI data of a batch to a pd.Series with one
+        value per run (index (id, run_id)). If None, the QoI data must have a single
+        column (e.g. from a scalar `reduction` of VadereQuantityOfInterest).
+    :param variation_kwargs: further arguments of DictVariation
+    """
+
+    batch_counter = itertools.count()
+
+    def run_batch(points: pd.DataFrame) -> np.ndarray:
+        setup = DictVariation(
+            scenario_path=scenario_path,
+            parameter_dict_list=points.to_dict("records"),
+            qoi=qoi,
+            model=model,
+            scenario_runs=scenario_runs,
+            output_path=output_path,
+            output_folder=f"{output_folder}_batch{next(batch_counter)}",
+            **variation_kwargs,
+        )
+        _, data = setup.run(njobs)
+
+        if data is None:  # all runs failed
+            return np.full(points.shape[0], np.nan)
+
+        if qoi_reduction is None:
+            if data.shape[1] != 1:
+                raise ValueError(
+                    "The QoI data has more than one column, set 'qoi_reduction'."
+                )
+            values = data.iloc[:, 0]
+        else:
+            values = qoi_reduction(data)
+
+        # mean over the runs of a parameter point, failed points are NaN
+        values = values.groupby(level="id").mean()
+        return values.reindex(np.arange(points.shape[0])).to_numpy(dtype=float)
+
+    return run_batch
+
+
+class AdaptiveSampling(object):
+    """Sequential design: the parameter points are run in batches, a Gaussian process
+    is fitted to the (scalar) QoI and the next batch is selected where the surrogate is
+    most uncertain.
+
+    Acquisition criteria:
+    * "variance" -- largest predictive standard deviation (global surrogate)
+    * "straddle" -- largest `1.96 * std - |mean - threshold|`, i.e. points close to the
+        level set `QoI == threshold` (e.g. "at which inflow does the corridor jam")
+
+    A batch is selected greedily: after each selected point the Gaussian process is
+    updated with its predicted mean ("kriging believer"), which reduces the uncertainty
+    around the point, so that the points of a batch are spread out.
+    """
+
+    ACQUISITIONS = ["variance", "straddle"]
+
+    def __init__(
+        self,
+        parameters: List[Parameter],
+        run_batch: Callable[[pd.DataFrame], np.ndarray],
+        acquisition: str = "variance",
+        threshold: Optional[float] = None,
+        batch_size: int = 4,
+        nr_initial: int = 8,
+        nr_candidates: int = 1024,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param parameters: scalar parameters with range [lower, upper]
+        :param run_batch: function that evaluates a batch of points (pd.DataFrame with
+            the parameter names as columns) and returns one value per point (NaN for
+            failed runs), see `request_batch_runner`
+        :param nr_candidates: number of (quasi-random) candidate points from which the
+            next batch is selected in each iteration
+        """
+
+        if acquisition not in self.ACQUISITIONS:
+            raise ValueError(
+                f"acquisition={acquisition} not contained in allowed: {self.ACQUISITIONS}"
+            )
+
+        if acquisition == "straddle" and threshold is None:
+            raise ValueError("The straddle acquisition requires a threshold.")
+
+        self.parameters = parameters
+        self.run_batch = run_batch
+        self.acquisition = acquisition
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.nr_initial = nr_initial
+        self.nr_candidates = nr_candidates
+
+        self._rng = np.random.default_rng(seed)
+        self._hypercube = UnitHypercube(parameters)
+
+        self.gp = None
+
+        # all evaluated points (unit hypercube) and values
+        self._x_unit = np.empty((0, len(parameters)))
+        self._y = np.empty(0)
+        self._batch_ids = np.empty(0, dtype=int)
+
+        # maximum acquisition value of the candidates in each iteration
+        self.history = list()
+
+    @property
+    def parameter_names(self):
+        return self._hypercube.parameter_names
+
+    @property
+    def points(self) -> pd.DataFrame:
+        """All evaluated points with the QoI value and the batch number."""
+        df = pd.DataFrame(
+            self._hypercube.to_parameter_space(self._x_unit),
+            columns=self.parameter_names,
+        )
+        df["qoi"] = self._y
+        df["batch"] = self._batch_ids
+        df.index.name = "id"
+        return df
+
+    def _sobol(self, nr_points):
+        from scipy.stats import qmc
+
+        engine = qmc.Sobol(
+            d=len(self.parameters), scramble=True, seed=self._rng.integers(2**32)
+        )
+        return engine.random(nr_points)
+
+    def _fit(self):
+        is_valid = valid_qoi_values(self._y)
+
+        self.gp = gaussian_process_regressor(
+            self._hypercube.dimension, random_state=int(self._rng.integers(2**31))
+        )
+        self.gp.fit(self._x_unit[is_valid], self._y[is_valid])
+
+    def _acquisition_values(self, gp, x_unit):
+        mean, std = gp.predict(x_unit, return_std=True)
+
+        if self.acquisition == "variance":
+            return std
+        else:  # straddle
+            return 1.96 * std - np.abs(mean - self.threshold)
+
+    def _select_batch(self, nr_points):
+        from sklearn.base import clone
+
+        candidates = self._sobol(self.nr_candidates)
+
+        is_valid = ~np.isnan(self._y)
+        x_fit, y_fit = self._x_unit[is_valid], self._y[is_valid]
+
+        # the hyper-parameters are kept fixed for the fantasized updates
+        gp = clone(self.gp).set_params(kernel=self.gp.kernel_, optimizer=None)
+        gp.fit(x_fit, y_fit)
+
+        selected = list()
+        max_acquisition = None
+
+        for _ in range(nr_points):
+            acq = self._acquisition_values(gp, candidates)
+            best = int(np.argmax(acq))
+
+            if max_acquisition is None:
+                max_acquisition = float(acq[best])
+
+            selected.append(candidates[best])
+
+            x_fit = np.vstack([x_fit, candidates[best]])
+            y_fit = np.append(y_fit, gp.predict(candidates[best][np.newaxis, :]))
+            candidates = np.delete(candidates, best, axis=0)
+            gp.fit(x_fit, y_fit)
+
+        return np.array(selected), max_acquisition
+
+    def _evaluate(self, x_unit, batch_id):
+        points = pd.DataFrame(
+            self._hypercube.to_parameter_space(x_unit), columns=self.parameter_names
+        )
+        values = np.asarray(self.run_batch(points), dtype=float)
+
+        if values.shape != (x_unit.shape[0],):
+            raise ValueError(
+                f"run_batch has to return {x_unit.shape[0]} values. Got shape "
+                f"{values.shape}."
+            )
+
+        self._x_unit = np.vstack([self._x_unit, x_unit])
+        self._y = np.append(self._y, values)
+        self._batch_ids = np.append(
+            self._batch_ids, np.full(x_unit.shape[0], batch_id, dtype=int)
+        )
+
+    def run(self, max_points: int, tolerance: Optional[float] = None):
+        """Run batches until `max_points` points are evaluated or the maximum acquisition
+        value of the candidates is below `tolerance`. For "variance" this is the largest
+        predictive standard deviation, for "straddle" a value below 0 means that all
+        candidates are classified w.r.t. the threshold with ~95% confidence.
+
+        Returns the evaluated points (see `points`).
+        """
+
+        if self._y.shape[0] == 0:
+            self._evaluate(self._sobol(min(self.nr_initial, max_points)), batch_id=0)
+
+        while self._y.shape[0] < max_points:
+            self._fit()
+
+            nr_points = min(self.batch_size, max_points - self._y.shape[0])
+            x_unit, max_acquisition = self._select_batch(nr_points)
+            self.history.append(max_acquisition)
+
+            if tolerance is not None and max_acquisition < tolerance:
+                print(
+                    f"INFO: Adaptive sampling converged (maximum acquisition value "
+                    f"{max_acquisition} < tolerance {tolerance})."
+                )
+                break
+
+            self._evaluate(x_unit, batch_id=int(self._batch_ids.max()) + 1)
+
+        self._fit()
+        return self.points
+
+    def predict(self, points: Union[pd.DataFrame, np.ndarray], return_std=False):
+        """Surrogate prediction at points given in parameter space."""
+
+        if self.gp is None:
+            raise RuntimeError("Call 'run' first.")
+
+        if isinstance(points, pd.DataFrame):
+            points = points[self.parameter_names].to_numpy()
+
+        return self.gp.predict(self._hypercube.to_unit(points), return_std=return_std)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import *
+
+from suqc.utils.dict_utils import deep_dict_lookup
+from suqc.utils.general import remove_folder
+
+# The hash of a Vadere .jar file is computed only once per process and file version
+_JAR_HASHES = dict()
+
+
+def file_hash(filepath, chunk_size=2 ** 20):
+    """Return the sha256 hex digest of a file's content."""
+    sha = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def jar_hash(jar_path):
+    stat = os.stat(jar_path)
+    memo_key = (os.path.abspath(jar_path), stat.st_size, stat.st_mtime_ns)
+
+    if memo_key not in _JAR_HASHES:
+        _JAR_HASHES[memo_key] = file_hash(jar_path)
+    return _JAR_HASHES[memo_key]
+
+
+class SimulationCache(object):
+    """Content-addressed store for the output of Vadere runs.
+
+    An entry is identified by a hash of the final scenario file (without cosmetic fields
+    such as the name), the hash of the Vadere .jar file and the requested output files.
+    On a cache hit the stored files are copied into the output folder of the run, so that
+    the simulation does not have to be carried out again. The cache is opt-in and can be
+    shared between several sweeps (i.e. environments). The oldest entries (by last access)
+    are removed if the total size exceeds `max_size_bytes`.
+    """
+
+    # Keys in the scenario that are changed by the default post changes (see
+    # ChangeScenarioName and ChangeDescription) but have no influence on the simulation.
+    COSMETIC_KEYS = ["name", "description"]
+
+    ENTRY_INFO_FILE = "suqc_cache_entry.json"
+    TEMP_PREFIX = "tmp_"
+
+    def __init__(
+        self,
+        cache_path: str,
+        max_size_bytes: Optional[int] = None,
+        store_all_output: bool = False,
+    ):
+        self.cache_path = os.path.abspath(cache_path)
+        self.max_size_bytes = max_size_bytes
+        # If False only the requested QoI files are stored, which are usually only a
+        # small fraction of the output (e.g. compared to trajectory files).
+        self.store_all_output = store_all_output
+
+        if max_size_bytes is not None and max_size_bytes <= 0:
+            raise ValueError(f"max_size_bytes has to be positive. Got {max_size_bytes}")
+
+        os.makedirs(self.cache_path, exist_ok=True)
+
+    @classmethod
+    def is_deterministic(cls, scenario: dict) -> bool:
+        # Without a fixed seed Vadere draws a new random seed for each run, i.e. the same
+        # scenario file yields different results. Such runs must never be cached.
+        try:
+            use_fixed_seed, _ = deep_dict_lookup(scenario, "useFixedSeed")
+        except (KeyError, ValueError):
+            return False
+        return use_fixed_seed is True
+
+    @classmethod
+    def canonical_scenario(cls, scenario: dict) -> str:
+        scenario = {k: v for k, v in scenario.items() if k not in cls.COSMETIC_KEYS}
+        return json.dumps(scenario, sort_keys=True, separators=(",", ":"))
+
+    def create_key(
+        self, scenario: Union[str, dict], jar_path, requested_files
+    ) -> Optional[str]:
+        """Returns the key of the scenario or None if the scenario is not cacheable."""
+
+        if isinstance(scenario, str):  # assume that this is a path
+            with open(scenario, "r") as f:
+                scenario = json.load(f)
+
+        if not self.is_deterministic(scenario):
+            return None
+
+        sha = hashlib.sha256()
+        sha.update(self.canonical_scenario(scenario).encode("utf-8"))
+        sha.update(jar_hash(jar_path).encode("utf-8"))
+        sha.update(json.dumps(sorted(requested_files)).encode("utf-8"))
+        return sha.hexdigest()
+
+    def _entry_path(self, key):
+        # two-level structure to not have too many entries in a single folder
+        return os.path.join(self.cache_path, key[:2], key)
+
+    def contains(self, key):
+        return os.path.isfile(os.path.join(self._entry_path(key), self.ENTRY_INFO_FILE))
+
+    def restore(self, key, output_path) -> Optional[dict]:
+        """Copy the files of an entry into output_path. Returns the stored information
+        of the entry or None if the key is not in the cache."""
+        entry_path = self._entry_path(key)
+        info_file = os.path.join(entry_path, self.ENTRY_INFO_FILE)
+
+        try:
+            with open(info_file, "r") as f:
+                info = json.load(f)
+
+            os.makedirs(output_path, exist_ok=True)
+            for filename in info["files"]:
+                target = os.path.join(output_path, filename)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(entry_path, filename), target)
+
+            # the modification time of the info file is used for the eviction order
+            os.utime(info_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            # the entry does not exist or was removed (evicted) in the meantime
+            return None
+
+        return info
+
+    def store(self, key, output_path, requested_files, required_time):
+        """Add the output of a successful run to the cache."""
+
+        if self.contains(key):
+            return
+
+        if self.store_all_output:
+            filenames = list()
+            for root, _, files in os.walk(output_path):
+                for file in files:
+                    filenames.append(
+                        os.path.relpath(os.path.join(root, file), output_path)
+                    )
+        else:
+            filenames = list(requested_files)
+
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        # Write to a temporary folder first and move it in place afterwards. This way
+        # other processes never see incomplete entries.
+        temp_path = os.path.join(
+            os.path.dirname(entry_path), f"{self.TEMP_PREFIX}{key}_{os.getpid()}"
+        )
+        remove_folder(temp_path)
+        os.mkdir(temp_path)
+
+        size = 0
+        for filename in filenames:
+            target = os.path.join(temp_path, filename)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(output_path, filename), target)
+            size += os.path.getsize(target)
+
+        info = {
+            "files": filenames,
+            "size": size,
+            "required_time": required_time,
+            "created": time.time(),
+        }
+
+        with open(os.path.join(temp_path, self.ENTRY_INFO_FILE), "w") as f:
+            json.dump(info, f)
+
+        try:
+            os.rename(temp_path, entry_path)
+        except OSError:
+            # another process stored the same entry in the meantime
+            remove_folder(temp_path)
+
+        if self.max_size_bytes is not None:
+            self.evict()
+
+    def _entries(self):
+        entries = list()
+        for subdir in os.scandir(self.cache_path):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.startswith(self.TEMP_PREFIX):
+                    continue
+                info_file = os.path.join(entry.path, self.ENTRY_INFO_FILE)
+                try:
+                    with open(info_file, "r") as f:
+                        size = json.load(f)["size"]
+                    last_access = os.path.getmtime(info_file)
+                except (FileNotFoundError, json.JSONDecodeError, KeyError):
+                    continue
+                entries.append((last_access, size, entry.path))
+        return entries
+
+    def size(self):
+        return sum([size for _, size, _ in self._entries()])
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits max_size_bytes."""
+
+        if self.max_size_bytes is None:
+            return
+
+        entries = sorted(self._entries())  # oldest access first
+        total_size = sum([size for _, size, _ in entries])
+
+        for _, size, path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            # ignore errors, the entry may be removed by another process concurrently
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        remove_folder(self.cache_path)
+        os.makedirs(self.cache_path)
@@ -12,7 +12,20 @@ from typing import *
 import pandas as pd
 
 from suqc.configuration import SuqcConfig
-from suqc.opp.config_parser import OppConfigFileBase, OppConfigType, OppParser
+from suqc.opp.config_parser import (
+    OppConfigFileBase,
+    OppConfigType,
+    OppIniTemplate,
+    OppParser,
+)
+from suqc.utils.dict_utils import KeyPathPlan, ScenarioKeyIndex
+from suqc.utils.scenario_template import (
+    OVERLAY_SUFFIX,
+    SCENARIO_FORMATS,
+    ScenarioTemplate,
+    write_overlay,
+    write_text_atomic,
+)
 from suqc.utils.general import (
     get_current_suqc_state,
     str_timestamp,
@@ -48,8 +61,19 @@ class AbstractConsoleWrapper(object):
 
 
 class CoupledConsoleWrapper(AbstractConsoleWrapper):
-    def __init__(self, model):
+    def __init__(self, model, timeout_sec: Optional[int] = 10800):
+        """
+        :param timeout_sec: a simulation is stopped after this time (default 3h), None
+            for no timeout
+        """
+
+        if timeout_sec is not None and (
+            not isinstance(timeout_sec, int) or timeout_sec <= 0
+        ):
+            raise TypeError("timeout_sec must be of type int and positive value")
+
         self.simulator = model
+        self.timeout_sec = timeout_sec
 
     def run_simulation(
         self, dirname, start_file, required_files: Union[str, List[str]]
@@ -64,17 +88,29 @@ class CoupledConsoleWrapper(AbstractConsoleWrapper):
         t = time.strftime("%H:%M:%S", time.localtime(time_started))
         print(f"{t}\t Call {os.path.basename(dirname)}/{start_file} ")
 
-        return_code = subprocess.check_call(
-            terminal_command,
-            env=os.environ,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            cwd=dirname,
-            timeout=10800 # stop simulation after 3h
-        )
-
-        process_duration = time.time() - time_started
-        output_subprocess = None
+        try:
+            return_code = subprocess.check_call(
+                terminal_command,
+                env=os.environ,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=dirname,
+                timeout=self.timeout_sec,
+            )
+            process_duration = time.time() - time_started
+            output_subprocess = None
+        except subprocess.TimeoutExpired:
+            print(
+                f"WARNING: Simulation {os.path.basename(dirname)} stopped after "
+                f"timeout of {self.timeout_sec}s."
+            )
+            return_code = 1
+            process_duration = self.timeout_sec
+            output_subprocess = {"stdout": None, "stderr": None}
+        except subprocess.CalledProcessError as exception:
+            return_code = exception.returncode
+            process_duration = time.time() - time_started
+            output_subprocess = {"stdout": None, "stderr": None}
 
         return return_code, process_duration, output_subprocess
 
@@ -212,6 +248,10 @@ class AbstractEnvironmentManager(object):
                 f"'EnvironmentManager.create_new_environment'"
             )
         self._vadere_scenario_basis = None
+        self._vadere_basis_key_index = None
+
+        self.scenario_format = "indent"
+        self._scenario_template = None
 
     @property
     def vadere_basis_scenario(self):
@@ -224,6 +264,13 @@ class AbstractEnvironmentManager(object):
 
         return self._vadere_scenario_basis
 
+    @property
+    def vadere_basis_key_index(self) -> ScenarioKeyIndex:
+        # built once, answers the key lookups for all variations of the basis scenario
+        if self._vadere_basis_key_index is None:
+            self._vadere_basis_key_index = ScenarioKeyIndex(self.vadere_basis_scenario)
+        return self._vadere_basis_key_index
+
     @property
     def vadere_path_basis_scenario(self):
         sc_files = glob.glob(
@@ -338,14 +385,72 @@ class AbstractEnvironmentManager(object):
             self._scenario_variation_filename(par_id, run_id),
         )
 
-    def save_scenario_variation(self, par_id, run_id, content):
+    def set_scenario_format(self, scenario_format):
+        """Format of the written scenario variations:
+        * "indent" -- JSON indented by 4 spaces (default)
+        * "compact" -- JSON without whitespaces
+        * "overlay" -- only the varied values are stored in a small overlay file, the
+            scenario file is materialized right before the simulation is started
+        """
+        if scenario_format not in SCENARIO_FORMATS:
+            raise ValueError(
+                f"scenario_format={scenario_format} not contained in allowed: "
+                f"{SCENARIO_FORMATS}"
+            )
+        self.scenario_format = scenario_format
+
+    def _get_scenario_template(self, key_plan: KeyPathPlan):
+        paths = key_plan.concrete_paths()
+
+        # The template has to be re-built if further keys were resolved in the plan
+        if self._scenario_template is None or self._scenario_template.paths != paths:
+            self._scenario_template = ScenarioTemplate(
+                self.vadere_basis_scenario,
+                paths,
+                compact=self.scenario_format == "compact",
+            )
+        return self._scenario_template
+
+    def scenario_variation_exists(self, par_id, run_id):
+        scenario_path = self.scenario_variation_path(par_id, run_id)
+        return os.path.exists(scenario_path) or os.path.exists(
+            f"{scenario_path}{OVERLAY_SUFFIX}"
+        )
+
+    def remove_scenario_variation(self, par_id, run_id):
         scenario_path = self.scenario_variation_path(par_id, run_id)
-        assert not os.path.exists(
-            scenario_path
+        for path in [scenario_path, f"{scenario_path}{OVERLAY_SUFFIX}"]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def save_scenario_variation(self, par_id, run_id, content, key_plan=None):
+        """Write the scenario variation. If `content` was created with `key_plan`
+        (KeyPathPlan of the basis scenario) the basis scenario is serialized only once
+        and only the values of the varied keys are inserted."""
+
+        scenario_path = self.scenario_variation_path(par_id, run_id)
+        assert not self.scenario_variation_exists(
+            par_id, run_id
         ), f"File {scenario_path} already exists!"
 
-        with open(scenario_path, "w") as outfile:
-            json.dump(content, outfile, indent=4)
+        if key_plan is not None:
+            template = self._get_scenario_template(key_plan)
+
+            if self.scenario_format == "overlay":
+                write_overlay(
+                    scenario_path, self.vadere_path_basis_scenario, template, content
+                )
+            else:
+                write_text_atomic(scenario_path, template.render(content))
+        elif self.scenario_format == "overlay":
+            raise ValueError("The overlay format requires a KeyPathPlan.")
+        elif self.scenario_format == "compact":
+            write_text_atomic(
+                scenario_path, json.dumps(content, separators=(",", ":"))
+            )
+        else:
+            write_text_atomic(scenario_path, json.dumps(content, indent=4))
+
         return scenario_path
 
     def get_temp_folder(self):
@@ -460,12 +565,14 @@ class VadereEnvironmentManager(AbstractEnvironmentManager):
                 )
                 outfile.write(s)
 
-        # Create the folder where all output is stored
-        os.mkdir(
+        # Create the folder where all output is stored (it already exists if an
+        # environment is written into)
+        os.makedirs(
             os.path.join(
                 path_output_folder,
                 VadereEnvironmentManager.simulation_runs_output_folder,
-            )
+            ),
+            exist_ok=True,
         )
 
         return cls(base_path, env_name)
@@ -489,6 +596,7 @@ class CoupledEnvironmentManager(AbstractEnvironmentManager):
     def __init__(self, base_path, env_name: str):
         super().__init__(base_path, env_name)
         self._omnet_ini_basis = None
+        self._omnet_ini_template = None
 
     @property
     def omnet_basis_ini(self):
@@ -502,6 +610,17 @@ class CoupledEnvironmentManager(AbstractEnvironmentManager):
             self._omnet_ini_basis = ini_file
         return self._omnet_ini_basis
 
+    @property
+    def omnet_basis_template(self) -> OppIniTemplate:
+        # the basis ini is parsed once, variations only replace the changed lines
+        if self._omnet_ini_template is None:
+            self._omnet_ini_template = OppIniTemplate(
+                ini_path=self.omnet_path_ini,
+                config="final",
+                cfg_type=OppConfigType.EXT_DEL_LOCAL,
+            )
+        return self._omnet_ini_template
+
     @property
     def omnet_path_ini(self):
         sc_files = glob.glob(os.path.join(self.env_path, "*ini"))
@@ -0,0 +1,1056 @@
+#!/usr/bin/env python3
+
+import abc
+import collections
+import copy
+import multiprocessing
+import multiprocessing.connection
+import os
+import re
+import shlex
+import shutil
+import signal
+import tarfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from suqc.environment import VadereConsoleWrapper
+from suqc.utils.general import njobs_check_and_set, str_timestamp
+from suqc.utils.scenario_template import OVERLAY_SUFFIX
+
+# Request of the worker processes of a LocalHostRunner (set once per process by the
+# pool initializer, such that the request is not pickled for every item).
+_WORKER_REQUEST = None
+
+
+def _set_worker_request(request):
+    global _WORKER_REQUEST
+    _WORKER_REQUEST = request
+
+
+def _run_worker_item(request_item):
+    return _WORKER_REQUEST._run_item(request_item)
+
+
+def _run_item_process(request, request_item, connection):
+    """Target of the run processes of DynamicPoolExecutor."""
+
+    if hasattr(os, "setsid"):
+        # own process group, such that the run can be killed with its simulation
+        os.setsid()
+
+    request_item = request._run_item(request_item)
+
+    # Peak resident set size of all terminated child processes (i.e. the simulations
+    # of this run).
+    try:
+        import resource
+
+        rss_bytes = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    except ImportError:  # not available on Windows
+        rss_bytes = None
+
+    connection.send((request_item, rss_bytes))
+    connection.close()
+
+
+class RetryPolicy(object):
+    """Failed runs (return code != 0, this includes runs that exceeded the timeout of
+    the model) are carried out again, up to `max_retries` times. Before the k-th retry
+    the run waits `backoff_sec * backoff_factor**(k-1)` seconds (at most
+    `max_backoff_sec`). See `Request.run`."""
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        backoff_sec: float = 5.0,
+        backoff_factor: float = 2.0,
+        max_backoff_sec: float = 300.0,
+    ):
+        if max_retries < 0:
+            raise ValueError(f"max_retries has to be non-negative. Got {max_retries}.")
+
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+        self.backoff_factor = backoff_factor
+        self.max_backoff_sec = max_backoff_sec
+
+    def backoff(self, retry_nr: int) -> float:
+        """Waiting time (seconds) before retry number `retry_nr` (starting with 1)."""
+        return min(
+            self.backoff_sec * self.backoff_factor ** (retry_nr - 1),
+            self.max_backoff_sec,
+        )
+
+
+class ExecutorBase(metaclass=abc.ABCMeta):
+    """Backend that carries out the request items of a Request (see `Request.run`)."""
+
+    @abc.abstractmethod
+    def run_items(self, request, request_items: List) -> List:
+        """Returns the request items with results, in the same order as
+        `request_items`."""
+        raise NotImplementedError("Base class")
+
+
+class LocalPoolExecutor(ExecutorBase):
+    """Default backend: the items are run in the current process (njobs=1) or in a
+    multiprocessing pool."""
+
+    def __init__(self, njobs: int = 1):
+        self.njobs = njobs
+
+    def run_items(self, request, request_items):
+        if self.njobs == 1:
+            return [request._run_item(item) for item in request_items]
+
+        with multiprocessing.Pool(processes=self.njobs) as pool:
+            return pool.map(request._run_item, request_items)
+
+
+class MemoryAdmission(object):
+    """Admission control for parallel runs based on the available memory.
+
+    The memory of a run is estimated from the peak RSS of previous runs (as soon as
+    `min_samples` runs finished), or from the -Xmx flag in `jvm_flags` of the Vadere
+    model before. Without any estimate only one run is carried out until the first run
+    finished. Another run is admitted if the estimates of all running runs fit into
+    the memory that was available at the start (minus `reserve_bytes`), and no run is
+    admitted while the currently available memory is below `reserve_bytes` (memory
+    pressure, e.g. by other processes).
+    """
+
+    # Memory of the JVM on top of the heap (metaspace, thread stacks, code cache, ...)
+    JVM_OVERHEAD = 1.25
+
+    UNITS = {"": 1, "k": 2**10, "m": 2**20, "g": 2**30, "t": 2**40}
+
+    def __init__(
+        self,
+        run_bytes: Optional[int] = None,
+        reserve_bytes: int = 2**30,
+        safety_factor: float = 1.2,
+        min_samples: int = 3,
+    ):
+        """
+        :param run_bytes: fixed memory estimate of a run (no estimation if set)
+        :param reserve_bytes: memory that is kept free for the system
+        :param safety_factor: factor on the largest measured peak RSS
+        :param min_samples: number of measured runs before the measurement replaces the
+            estimate from -Xmx
+        """
+        self.run_bytes = run_bytes
+        self.reserve_bytes = reserve_bytes
+        self.safety_factor = safety_factor
+        self.min_samples = min_samples
+
+        self._xmx_bytes = None
+        self._budget_bytes = None
+        self._observed_bytes = list()
+        # increased after runs ran out of memory
+        self._oom_factor = 1.0
+
+    @classmethod
+    def parse_xmx(cls, jvm_flags: List[str]) -> Optional[int]:
+        xmx = None
+        for flag in jvm_flags:  # as in Java, the last flag counts
+            match = re.fullmatch(r"-Xmx(\d+)([kKmMgGtT]?)", flag.strip())
+            if match is not None:
+                xmx = int(match.group(1)) * cls.UNITS[match.group(2).lower()]
+        return xmx
+
+    @staticmethod
+    def available_bytes() -> Optional[int]:
+        """Memory available for new processes without swapping (None if unknown)."""
+        try:
+            with open("/proc/meminfo", "r") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return int(psutil.virtual_memory().available)
+
+    def start(self, model):
+        self._xmx_bytes = self.parse_xmx(getattr(model, "jvm_flags", None) or [])
+
+        available = self.available_bytes()
+        if available is None:
+            print(
+                "WARNING: Available memory is unknown, runs are only limited by njobs."
+            )
+            self._budget_bytes = None
+        else:
+            self._budget_bytes = available - self.reserve_bytes
+
+    def estimate(self) -> Optional[float]:
+        if self.run_bytes is not None:
+            estimate = self.run_bytes
+        elif len(self._observed_bytes) >= self.min_samples:
+            estimate = max(self._observed_bytes) * self.safety_factor
+        elif self._xmx_bytes is not None:
+            estimate = self._xmx_bytes * self.JVM_OVERHEAD
+        elif len(self._observed_bytes) > 0:
+            estimate = max(self._observed_bytes) * self.safety_factor
+        else:
+            return None
+        return estimate * self._oom_factor
+
+    def observe(self, rss_bytes: Optional[int]):
+        if rss_bytes is not None and rss_bytes > 0:
+            self._observed_bytes.append(rss_bytes)
+
+    def on_out_of_memory(self):
+        self._oom_factor *= 1.5
+
+    def can_admit(self, nr_running: int) -> bool:
+        if nr_running == 0:
+            return True  # always make progress
+
+        estimate = self.estimate()
+        if estimate is None:
+            return False
+
+        available = self.available_bytes()
+        if available is not None and available < self.reserve_bytes:
+            return False
+
+        if self._budget_bytes is None:
+            return True
+        return (nr_running + 1) * estimate <= self._budget_bytes
+
+
+class RuntimePredictor(object):
+    """Predicts the run time of parameter points from the `required_wallclock_time`
+    of previous runs (metainfo.csv of previous sweeps).
+
+    The prediction is the distance weighted mean of the (log) run time of the nearest
+    previous points, with the parameters that are numeric and contained in both the
+    history and the predicted points (standardized with the history).
+    """
+
+    def __init__(self, history: pd.DataFrame, nr_neighbors: int = 5):
+        """
+        :param history: parameters (columns with the parameter names) and the column
+            "required_wallclock_time" of successful runs, see `from_metainfo`
+        """
+        history = history.loc[np.isfinite(history["required_wallclock_time"])]
+        history = history.loc[history["required_wallclock_time"] > 0]
+
+        if history.shape[0] == 0:
+            raise ValueError("The history contains no successful runs.")
+
+        self.history = history
+        self.nr_neighbors = nr_neighbors
+
+    @classmethod
+    def _read_metainfo(cls, filepath):
+        # the number of header rows depends on the column levels
+        with open(filepath, "r") as f:
+            nr_header_rows = 0
+            for line in f:
+                if line.startswith("id,"):
+                    break
+                nr_header_rows += 1
+
+        df = pd.read_csv(filepath, header=list(range(nr_header_rows)), index_col=[0, 1])
+
+        level0 = df.columns.get_level_values(0)
+        last_level = df.columns.get_level_values(-1)
+
+        history = df.loc[:, level0 == "Parameter"]
+        history.columns = last_level[level0 == "Parameter"]
+
+        meta = df.loc[:, level0 == "MetaInfo"]
+        meta.columns = last_level[level0 == "MetaInfo"]
+
+        history = history.assign(
+            required_wallclock_time=meta["required_wallclock_time"].to_numpy()
+        )
+        return history.loc[meta["return_code"].to_numpy() == 0]
+
+    @classmethod
+    def from_metainfo(cls, paths: Union[str, List[str]], nr_neighbors: int = 5):
+        """Reads the history from metainfo.csv files (or environment folders that
+        contain a metainfo.csv)."""
+
+        if isinstance(paths, str):
+            paths = [paths]
+
+        histories = list()
+        for path in paths:
+            if os.path.isdir(path):
+                path = os.path.join(path, "metainfo.csv")
+            histories.append(cls._read_metainfo(path))
+
+        return cls(pd.concat(histories, axis=0, ignore_index=True), nr_neighbors)
+
+    def predict(self, points: pd.DataFrame) -> np.ndarray:
+        """Predicted run time (seconds) for each row of points (columns with the
+        parameter names)."""
+        from sklearn.neighbors import KNeighborsRegressor
+
+        features = [
+            c
+            for c in points.columns
+            if c in self.history.columns
+            and c != "required_wallclock_time"
+            and pd.api.types.is_numeric_dtype(points[c])
+            and pd.api.types.is_numeric_dtype(self.history[c])
+        ]
+
+        log_time = np.log(self.history["required_wallclock_time"].to_numpy())
+
+        if len(features) == 0:
+            print(
+                "WARNING: No common numeric parameters with the run time history. "
+                "All runs are predicted with the same run time."
+            )
+            return np.full(points.shape[0], np.exp(np.median(log_time)))
+
+        x_history = self.history[features].to_numpy(dtype=float)
+        mean, std = x_history.mean(axis=0), x_history.std(axis=0)
+        std[std == 0] = 1
+
+        knn = KNeighborsRegressor(
+            n_neighbors=min(self.nr_neighbors, x_history.shape[0]), weights="distance"
+        )
+        knn.fit((x_history - mean) / std, log_time)
+
+        x_points = points[features].to_numpy(dtype=float)
+        return np.exp(knn.predict((x_points - mean) / std))
+
+
+class _RunningCopy(object):
+    """A run of DynamicPoolExecutor in its own process (a speculative copy writes to a
+    separate output folder and runs its own copy of the scenario file)."""
+
+    def __init__(
+        self, idx, request_item, process, connection, speculative, owns_scenario
+    ):
+        self.idx = idx
+        self.request_item = request_item
+        self.process = process
+        self.connection = connection
+        self.speculative = speculative
+        # If True, the scenario files are removed if the run is killed (the run removes
+        # them itself only if it finishes).
+        self.owns_scenario = owns_scenario
+        self.start = time.time()
+
+    def elapsed(self):
+        return time.time() - self.start
+
+
+class DynamicPoolExecutor(ExecutorBase):
+    """Local executor that starts the items one by one (instead of static chunks as
+    pool.map), each in its own process. If `admission` is set (see MemoryAdmission), a
+    new run is only started if enough memory is available.
+
+    Runs that ran out of memory (Java OutOfMemoryError, or the simulation or its process
+    was killed by the OOM killer) are put back into the queue and are retried up to
+    `max_requeues` times with a larger memory estimate.
+
+    If `runtime_predictor` is set (see RuntimePredictor), the runs with the longest
+    predicted run time are started first (longest-job-first), such that no long run
+    is started at the end of the sweep while all other workers are idle. After the
+    runs, `report` compares the makespan with its lower bound.
+
+    If `speculation_factor` is set, stragglers are run a second time at the tail of the
+    sweep: when no run is pending and a worker is idle, a run that takes longer than
+    `speculation_factor` times its expected run time (predicted by `runtime_predictor`,
+    or else the median run time of the finished runs of this sweep) is started again in
+    the output folder "<output_folder>_speculative" with its own copy of the scenario
+    file (the original run may remove its scenario file). The copy that finishes first
+    successfully wins, the other copy is killed (with its process group, i.e. including
+    the simulation) and the output of the winner is moved to the original output folder.
+    """
+
+    # waiting time for finished runs before the admission is checked again
+    POLL_INTERVAL_SEC = 1.0
+
+    SPECULATIVE_SUFFIX = "_speculative"
+
+    def __init__(
+        self,
+        njobs: int = -1,
+        admission: Optional[MemoryAdmission] = None,
+        max_requeues: int = 2,
+        runtime_predictor: Optional[RuntimePredictor] = None,
+        speculation_factor: Optional[float] = None,
+        min_finished: int = 3,
+    ):
+        """
+        :param speculation_factor: slowdown w.r.t. the expected run time, after which a
+            run is started speculatively a second time (None: no speculation)
+        :param min_finished: number of finished runs that are required to estimate the
+            expected run time without a runtime_predictor
+        """
+
+        if speculation_factor is not None and speculation_factor <= 1:
+            raise ValueError(
+                f"speculation_factor has to be larger than 1. Got {speculation_factor}."
+            )
+
+        self.njobs = njobs
+        self.admission = admission
+        self.max_requeues = max_requeues
+        self.runtime_predictor = runtime_predictor
+        self.speculation_factor = speculation_factor
+        self.min_finished = min_finished
+
+        self.report = None
+
+    def _start(self, request, request_item, idx, speculative=False) -> _RunningCopy:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=_run_item_process, args=(request, request_item, sender)
+        )
+        process.start()
+        sender.close()  # only the child process sends
+
+        # lazily created scenario files are removed after the run
+        owns_scenario = speculative or (
+            getattr(request_item, "parameter_variation", None) is not None
+            and not getattr(request, "retain_scenarios", True)
+        )
+        return _RunningCopy(
+            idx, request_item, process, receiver, speculative, owns_scenario
+        )
+
+    def _receive(self, run: _RunningCopy):
+        try:
+            request_item, rss_bytes = run.connection.recv()
+        except EOFError:
+            # the process was killed (usually by the OOM killer)
+            request_item, rss_bytes = run.request_item, None
+            request_item.add_qoi_result(None)
+
+        run.process.join()
+        run.connection.close()
+
+        if run.process.exitcode != 0:
+            request_item.add_meta_info(
+                required_time=float("nan"), return_code=run.process.exitcode
+            )
+        return request_item, rss_bytes
+
+    def _kill(self, run: _RunningCopy):
+        try:
+            # the run process is the leader of its own process group
+            os.killpg(run.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            # not (yet) a process group leader, or not available on Windows
+            run.process.kill()
+
+        run.process.join()
+        run.connection.close()
+
+        if run.speculative:
+            shutil.rmtree(run.request_item.output_path, ignore_errors=True)
+
+        self._remove_scenario(run)
+
+    def _remove_scenario(self, run: _RunningCopy):
+        """Removes the scenario files that a run (killed, or a finished speculative copy)
+        leaves behind."""
+
+        scenario_path = run.request_item.scenario_path
+        overlay_path = f"{scenario_path}{OVERLAY_SUFFIX}"
+
+        if run.owns_scenario:
+            paths = [scenario_path, overlay_path]
+        elif os.path.exists(overlay_path):
+            paths = [scenario_path]  # materialized from the overlay file
+        else:
+            paths = []
+
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _speculative_copy(self, request_item):
+        """Copy of the request item with its own output folder and scenario file.
+        Returns None if the scenario file of the run does not exist (anymore)."""
+
+        scenario_path = request_item.scenario_path
+        root, ext = os.path.splitext(scenario_path)
+        copy_path = f"{root}{self.SPECULATIVE_SUFFIX}{ext}"
+
+        # Lazily created and materialized scenario files are written atomically, i.e.
+        # an existing file is complete.
+        if os.path.isfile(scenario_path):
+            shutil.copyfile(scenario_path, copy_path)
+        elif os.path.isfile(f"{scenario_path}{OVERLAY_SUFFIX}"):
+            # the overlay refers to the basis scenario in the same folder
+            shutil.copyfile(
+                f"{scenario_path}{OVERLAY_SUFFIX}", f"{copy_path}{OVERLAY_SUFFIX}"
+            )
+        else:
+            return None
+
+        request_item = copy.copy(request_item)
+        request_item.scenario_path = copy_path
+        request_item.parameter_variation = None  # the scenario file exists
+        request_item.output_folder += self.SPECULATIVE_SUFFIX
+        request_item.output_path = os.path.join(
+            request_item.base_path, request_item.output_folder
+        )
+        return request_item
+
+    def _take_over_output(self, request_item, original_item):
+        """Moves the output of a speculative copy to the output folder of the original
+        run."""
+        shutil.rmtree(original_item.output_path, ignore_errors=True)
+        os.replace(request_item.output_path, original_item.output_path)
+
+        request_item.output_folder = original_item.output_folder
+        request_item.output_path = original_item.output_path
+        request_item.scenario_path = original_item.scenario_path
+        request_item.parameter_variation = original_item.parameter_variation
+        return request_item
+
+    def _is_out_of_memory(self, request_item):
+        if request_item.return_code in (137, -9):  # SIGKILL
+            return True
+
+        stderr_file = os.path.join(request_item.output_path, "stderr_on_error.txt")
+        if request_item.return_code != 0 and os.path.isfile(stderr_file):
+            with open(stderr_file, "rb") as f:
+                return b"java.lang.OutOfMemoryError" in f.read()
+        return False
+
+    def _predict_times(self, request, request_items) -> Optional[np.ndarray]:
+        if self.runtime_predictor is None:
+            return None
+
+        parameter_variation = getattr(request, "parameter_variation", None)
+        if parameter_variation is None:
+            print(
+                "WARNING: The request has no parameter variation, the run times are "
+                "not predicted."
+            )
+            return None
+
+        points = parameter_variation.points
+        points = points.loc[:, points.columns.get_level_values(0) == "Parameter"]
+        points.columns = points.columns.get_level_values(-1)
+
+        item_ids = pd.MultiIndex.from_tuples(
+            [(item.parameter_id, item.run_id) for item in request_items]
+        )
+        return self.runtime_predictor.predict(points.loc[item_ids])
+
+    def _order(self, predicted_times, nr_items) -> List[int]:
+        if predicted_times is None:
+            return list(range(nr_items))
+
+        # stable sort: longest predicted run time first
+        return np.argsort(-predicted_times, kind="stable").tolist()
+
+    def _stragglers(self, running, predicted_times, finished_times, speculated):
+        """Runs that take longer than speculation_factor times the expected run time,
+        slowest (relative to the expected time) first."""
+
+        if predicted_times is None and len(finished_times) < self.min_finished:
+            return list()
+
+        median_time = np.median(finished_times) if len(finished_times) > 0 else None
+
+        stragglers = list()
+        for run in running:
+            if run.speculative or run.idx in speculated:
+                continue
+
+            if predicted_times is not None:
+                expected = predicted_times[run.idx]
+            else:
+                expected = median_time
+
+            slowdown = run.elapsed() / max(expected, 1e-6)
+            if slowdown > self.speculation_factor:
+                stragglers.append((slowdown, run))
+
+        return [run for _, run in sorted(stragglers, key=lambda s: -s[0])]
+
+    def _makespan_report(self, request_items, njobs, makespan):
+        times = np.array([item.required_time for item in request_items], dtype=float)
+        times = times[np.isfinite(times)]
+
+        if times.shape[0] == 0:
+            return None
+
+        # no schedule can be faster than the longest run or a perfect distribution
+        lower_bound = max(times.max(), times.sum() / njobs)
+
+        report = {
+            "makespan": makespan,
+            "lower_bound": lower_bound,
+            "efficiency": lower_bound / makespan if makespan > 0 else np.nan,
+            "total_runtime": times.sum(),
+            "longest_run": times.max(),
+            "njobs": njobs,
+        }
+        print(
+            f"INFO: Makespan {makespan:.1f}s (lower bound {lower_bound:.1f}s, "
+            f"efficiency {report['efficiency']:.0%}, njobs={njobs})."
+        )
+        return report
+
+    def _requeue(self, idx, pending, requeues) -> bool:
+        if requeues[idx] >= self.max_requeues:
+            return False
+
+        requeues[idx] += 1
+        if self.admission is not None:
+            self.admission.on_out_of_memory()
+        pending.appendleft(idx)
+        return True
+
+    def _can_start(self, running, njobs):
+        return len(running) < njobs and (
+            self.admission is None or self.admission.can_admit(len(running))
+        )
+
+    def run_items(self, request, request_items):
+        njobs = njobs_check_and_set(njobs=self.njobs, ntasks=len(request_items))
+
+        if self.admission is not None:
+            self.admission.start(request.model)
+
+        predicted_times = self._predict_times(request, request_items)
+
+        results = [None] * len(request_items)
+        requeues = [0] * len(request_items)
+        pending = collections.deque(self._order(predicted_times, len(request_items)))
+        running = list()  # _RunningCopy
+
+        finished_times = list()  # run times of successful runs (for speculation)
+        speculated = set()  # indices of items that were started speculatively
+
+        start = time.time()
+
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                while len(pending) > 0 and self._can_start(running, njobs):
+                    idx = pending.popleft()
+                    running.append(self._start(request, request_items[idx], idx))
+
+                if self.speculation_factor is not None and len(pending) == 0:
+                    for run in self._stragglers(
+                        running, predicted_times, finished_times, speculated
+                    ):
+                        if not self._can_start(running, njobs):
+                            break
+                        speculated.add(run.idx)
+
+                        speculative_item = self._speculative_copy(run.request_item)
+                        if speculative_item is None:
+                            continue  # the run is about to finish
+
+                        print(
+                            f"INFO: Run (parameter id {run.request_item.parameter_id}, "
+                            f"run id {run.request_item.run_id}) is a straggler "
+                            f"({run.elapsed():.1f}s). Start speculative copy."
+                        )
+                        running.append(
+                            self._start(
+                                request, speculative_item, run.idx, speculative=True
+                            )
+                        )
+
+                ready = multiprocessing.connection.wait(
+                    [run.connection for run in running], timeout=self.POLL_INTERVAL_SEC
+                )
+
+                for run in [run for run in running if run.connection in ready]:
+                    if run not in running:
+                        continue  # killed, the other copy of the run won
+                    running.remove(run)
+
+                    item, rss_bytes = self._receive(run)
+                    if run.speculative:
+                        self._remove_scenario(run)
+
+                    others = [r for r in running if r.idx == run.idx]
+
+                    if item.return_code != 0 and len(others) > 0:
+                        # the other copy of the run may still succeed
+                        if run.speculative:
+                            shutil.rmtree(item.output_path, ignore_errors=True)
+                        continue
+
+                    for other in others:
+                        running.remove(other)
+                        self._kill(other)
+
+                    if run.speculative:
+                        item = self._take_over_output(item, request_items[run.idx])
+                        if item.return_code == 0:
+                            print(
+                                f"INFO: Speculative copy of run (parameter id "
+                                f"{item.parameter_id}, run id {item.run_id}) "
+                                f"finished first."
+                            )
+
+                    if self.admission is not None:
+                        self.admission.observe(rss_bytes)
+
+                    if self._is_out_of_memory(item) and self._requeue(
+                        run.idx, pending, requeues
+                    ):
+                        print(
+                            f"WARNING: Run (parameter id {item.parameter_id}, run id "
+                            f"{item.run_id}) ran out of memory. The run is requeued."
+                        )
+                        speculated.discard(run.idx)
+                    else:
+                        results[run.idx] = item
+                        if item.return_code == 0:
+                            finished_times.append(run.elapsed())
+        finally:
+            for run in running:
+                self._kill(run)
+
+        self.report = self._makespan_report(results, njobs, time.time() - start)
+        return results
+
+
+class HostRunner(metaclass=abc.ABCMeta):
+    """A host of the MultiHostExecutor that runs up to `njobs` items at the same
+    time. `run_item` is called concurrently from `njobs` threads."""
+
+    def __init__(self, name: str, njobs: int):
+        if njobs < 1:
+            raise ValueError(f"njobs has to be a positive integer. Got {njobs}.")
+
+        self.name = name
+        self.njobs = njobs
+
+    def open(self, request):
+        """Called once (from the main thread) before the first item is run."""
+
+    @abc.abstractmethod
+    def run_item(self, request_item):
+        raise NotImplementedError("Base class")
+
+    def close(self):
+        """Called once after all items finished."""
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(name={self.name}, njobs={self.njobs})"
+
+
+class LocalHostRunner(HostRunner):
+    """Runs the items in a process pool on the local machine."""
+
+    def __init__(self, njobs: int = 1, name: str = "localhost"):
+        super(LocalHostRunner, self).__init__(name=name, njobs=njobs)
+        self._pool = None
+
+    def open(self, request):
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.njobs,
+            initializer=_set_worker_request,
+            initargs=(request,),
+        )
+
+        # Start all worker processes now (from the main thread), instead of forking on
+        # demand from the threads of the MultiHostExecutor.
+        for future in [self._pool.submit(time.sleep, 0) for _ in range(self.njobs)]:
+            future.result()
+
+    def run_item(self, request_item):
+        return self._pool.submit(_run_worker_item, request_item).result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class _RemoteVadereModel(VadereConsoleWrapper):
+    """Runs the simulation on the host of a SSHHostRunner: the scenario file is
+    transferred to the host, and the output is transferred back after the run."""
+
+    def __init__(self, local_model: VadereConsoleWrapper, host_runner: "SSHHostRunner"):
+        # the attributes are copied, the constructor checks for the local .jar file
+        self.__dict__.update(local_model.__dict__)
+        self.host_runner = host_runner
+
+    def run_simulation(self, scenario_fp, output_path):
+        start = time.time()
+
+        con = self.host_runner.connection()
+        remote_output = "/".join(
+            [self.host_runner.remote_folder_path, os.path.basename(output_path)]
+        )
+        remote_scenario = "/".join([remote_output, os.path.basename(scenario_fp)])
+
+        con.run(f"mkdir -p {shlex.quote(remote_output)}", hide=True)
+        con.put(scenario_fp, remote_scenario)
+
+        cmd = ["java"] + self.jvm_flags
+        cmd += ["-jar", self.host_runner.remote_jar_path, "--loglevel", self.loglvl]
+        cmd += ["suq", "-f", remote_scenario, "-o", remote_output]
+
+        result = con.run(
+            " ".join(shlex.quote(c) for c in cmd),
+            warn=True,
+            hide=True,
+            timeout=self.timeout_sec,
+        )
+
+        if result.ok:
+            self._transfer_output(con, remote_output, output_path)
+            output_subprocess = None
+        else:
+            output_subprocess = {
+                "stdout": result.stdout.encode(),
+                "stderr": result.stderr.encode(),
+            }
+
+        con.run(f"rm -r {shlex.quote(remote_output)}", hide=True, warn=True)
+
+        return result.return_code, time.time() - start, output_subprocess
+
+    def _transfer_output(self, con, remote_output, output_path):
+        remote_archive = f"{remote_output}.tar.gz"
+        local_archive = os.path.join(output_path, "suqc_transfer.tar.gz")
+
+        con.run(
+            f"tar -czf {shlex.quote(remote_archive)} --exclude='*.scenario' "
+            f"-C {shlex.quote(remote_output)} .",
+            hide=True,
+        )
+        con.get(remote_archive, local_archive)
+        con.run(f"rm {shlex.quote(remote_archive)}", hide=True)
+
+        with tarfile.open(local_archive, "r:gz") as archive:
+            archive.extractall(path=output_path)
+        os.remove(local_archive)
+
+
+class SSHHostRunner(HostRunner):
+    """Runs the Vadere simulations on a remote host (connection with fabric). Only
+    the simulation is carried out remotely; scenario files are created and QoI are
+    parsed locally. The .jar file is transferred once to the host."""
+
+    def __init__(
+        self,
+        host: str,
+        user: Optional[str] = None,
+        port: int = 22,
+        njobs: int = 1,
+        remote_base_path: str = "suqc_envs",
+        name: Optional[str] = None,
+    ):
+        super(SSHHostRunner, self).__init__(name=name or host, njobs=njobs)
+        self.host = host
+        self.user = user
+        self.port = port
+
+        self.remote_folder_path = "/".join(
+            [remote_base_path, f"executor_{self.name}_{str_timestamp()}"]
+        )
+        self.remote_jar_path = None
+
+        self._request = None
+        self._local = threading.local()
+        self._connections = list()
+        self._lock = threading.Lock()
+
+    def connection(self):
+        """Connection of the current thread (fabric connections are not thread-safe)."""
+        from fabric import Connection
+
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = Connection(
+                self.host, user=self.user, port=self.port
+            )
+            with self._lock:
+                self._connections.append(self._local.connection)
+        return self._local.connection
+
+    def open(self, request):
+        if not isinstance(request.model, VadereConsoleWrapper):
+            raise ValueError(
+                "SSHHostRunner only supports Vadere simulations "
+                f"(model is of type {type(request.model)})."
+            )
+
+        con = self.connection()
+        con.run(f"mkdir -p {shlex.quote(self.remote_folder_path)}", hide=True)
+
+        self.remote_jar_path = "/".join(
+            [self.remote_folder_path, os.path.basename(request.model.jar_path)]
+        )
+        con.put(request.model.jar_path, self.remote_jar_path)
+
+        self._request = copy.copy(request)
+        self._request.model = _RemoteVadereModel(request.model, self)
+        print(f"INFO: Host {self.name} ({self.user}@{self.host}:{self.port}) ready.")
+
+    def run_item(self, request_item):
+        return self._request._run_item(request_item)
+
+    def close(self):
+        try:
+            self.connection().run(
+                f"rm -r {shlex.quote(self.remote_folder_path)}", hide=True, warn=True
+            )
+        finally:
+            for con in self._connections:
+                con.close()
+            self._connections = list()
+            self._local = threading.local()
+
+
+class MultiHostExecutor(ExecutorBase):
+    """Distributes the request items over several hosts.
+
+    The items are first sharded over the hosts (proportional to `njobs` of each host).
+    Every host runs items from its own queue; a host with an empty queue steals items
+    from the end of the longest queue of another host, such that hosts that finish
+    early take over work of slower hosts.
+
+    An item that fails on a host (exception of the host, e.g. lost connection, or a
+    return code != 0) is retried on another host that has not run the item yet, until
+    `max_attempts` is reached.
+    """
+
+    def __init__(self, hosts: List[HostRunner], max_attempts: int = 2):
+        if len(hosts) == 0:
+            raise ValueError("At least one host is required.")
+
+        names = [host.name for host in hosts]
+        if len(set(names)) != len(names):
+            raise ValueError(f"The host names have to be unique. Got {names}.")
+
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts has to be positive. Got {max_attempts}.")
+
+        self.hosts = hosts
+        self.max_attempts = max_attempts
+
+    def _initial_shards(self, nr_items):
+        # weighted round-robin: host i gets njobs[i] consecutive items in each round
+        slots = [i for i, host in enumerate(self.hosts) for _ in range(host.njobs)]
+        queues = [collections.deque() for _ in self.hosts]
+
+        for idx in range(nr_items):
+            queues[slots[idx % len(slots)]].append(idx)
+        return queues
+
+    def _next_item(self, host_idx):
+        # own queue first (front), otherwise steal from the end of the longest queue
+        own = self._queues[host_idx]
+
+        for pos, idx in enumerate(own):
+            if host_idx not in self._tried[idx]:
+                del own[pos]
+                return idx
+
+        for queue in sorted(self._queues, key=len, reverse=True):
+            for pos in range(len(queue) - 1, -1, -1):
+                idx = queue[pos]
+                if host_idx not in self._tried[idx]:
+                    del queue[pos]
+                    return idx
+        return None
+
+    def _requeue(self, idx):
+        candidates = [i for i in range(len(self.hosts)) if i not in self._tried[idx]]
+        target = min(
+            candidates, key=lambda i: len(self._queues[i]) / self.hosts[i].njobs
+        )
+        self._queues[target].append(idx)
+
+    def _worker(self, host_idx):
+        host = self.hosts[host_idx]
+
+        while True:
+            with self._condition:
+                idx = self._next_item(host_idx)
+                while idx is None and self._nr_pending > 0:
+                    self._condition.wait()
+                    idx = self._next_item(host_idx)
+
+                if idx is None:
+                    return  # all items finished
+                self._tried[idx].add(host_idx)
+
+            error = None
+            try:
+                item = host.run_item(self._items[idx])
+                is_success = item.return_code == 0
+            except Exception as e:
+                item, is_success, error = None, False, e
+
+            with self._condition:
+                item_info = (
+                    f"(parameter id {self._items[idx].parameter_id}, run id "
+                    f"{self._items[idx].run_id})"
+                )
+                if error is not None:
+                    print(
+                        f"WARNING: Host {host.name} failed to run item {item_info}: {error!r}"
+                    )
+
+                nr_attempts = len(self._tried[idx])
+                if (
+                    is_success
+                    or nr_attempts >= self.max_attempts
+                    or nr_attempts >= len(self.hosts)
+                ):
+                    self._results[idx] = item
+                    self._nr_pending -= 1
+                else:
+                    print(f"INFO: Retry item {item_info} on another host.")
+                    self._requeue(idx)
+                self._condition.notify_all()
+
+    def run_items(self, request, request_items):
+        self._items = request_items
+        self._results = [None] * len(request_items)
+        self._tried = [set() for _ in request_items]
+        self._queues = self._initial_shards(len(request_items))
+        self._nr_pending = len(request_items)
+        self._condition = threading.Condition()
+
+        for host in self.hosts:
+            host.open(request)
+
+        try:
+            threads = [
+                threading.Thread(target=self._worker, args=(host_idx,), daemon=True)
+                for host_idx, host in enumerate(self.hosts)
+                for _ in range(host.njobs)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for host in self.hosts:
+                host.close()
+
+        for idx, item in enumerate(self._results):
+            if item is None:
+                # no host could run the item (only exceptions)
+                item = request_items[idx]
+                item.add_qoi_result(None)
+                item.add_meta_info(required_time=float("nan"), return_code=1)
+                self._results[idx] = item
+
+        return self._results
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import pickle
+import sqlite3
+from typing import *
+
+
+class ResultJournal(object):
+    """Append-only journal of run results in a SQLite database (write-ahead log).
+
+    Each worker process appends one row per finished run (the QoI data is pickled). An
+    append is a single transaction, i.e. a crash during a sweep never leaves a partially
+    written entry and all entries committed before are kept. Concurrent appends of
+    several processes are serialized by the database lock.
+    """
+
+    # seconds a writer waits for the database lock of another process
+    TIMEOUT_SEC = 60
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "parameter_id INTEGER, run_id INTEGER, return_code INTEGER, "
+                "required_time REAL, qoi_result BLOB)"
+            )
+        con.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.journal_path, timeout=self.TIMEOUT_SEC)
+
+    def append(
+        self,
+        parameter_id: int,
+        run_id: int,
+        qoi_result: Optional[dict],
+        return_code: int,
+        required_time: float,
+    ):
+        if qoi_result is None:
+            payload = None
+        else:
+            payload = pickle.dumps(qoi_result, protocol=pickle.HIGHEST_PROTOCOL)
+
+        con = self._connect()
+        try:
+            with con:  # commits the transaction
+                con.execute(
+                    "INSERT INTO results VALUES (?, ?, ?, ?, ?)",
+                    (
+                        int(parameter_id),
+                        int(run_id),
+                        int(return_code),
+                        float(required_time),
+                        payload,
+                    ),
+                )
+        finally:
+            con.close()
+
+    def read(self) -> Iterator[Tuple[int, int, int, float, Optional[dict]]]:
+        """Yields (parameter_id, run_id, return_code, required_time, qoi_result) in the
+        order in which the runs finished. If a run was appended several times (e.g. a
+        repeated sweep), the last entry counts."""
+
+        con = self._connect()
+        try:
+            entries = dict()
+            for par_id, run_id, return_code, required_time, payload in con.execute(
+                "SELECT * FROM results ORDER BY rowid"
+            ):
+                entries.pop((par_id, run_id), None)  # keep order of the last entry
+                entries[(par_id, run_id)] = (return_code, required_time, payload)
+        finally:
+            con.close()
+
+        for (par_id, run_id), (return_code, required_time, payload) in entries.items():
+            qoi_result = None if payload is None else pickle.loads(payload)
+            yield par_id, run_id, return_code, required_time, qoi_result
@@ -1,12 +1,62 @@
 import enum
+import io
+import re
 from collections.abc import MutableMapping
 from configparser import ConfigParser, NoOptionError
 
 
 class OppParser(ConfigParser):
+
+    # Incremented on changes, see the resolved views of OppConfigFileBase: the version
+    # on added or removed options and sections, the value_version on changed values.
+    _version = 0
+    _value_version = 0
+
     def optionxform(self, optionstr):
         return optionstr
 
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def value_version(self):
+        return self._value_version
+
+    def _changed(self):
+        self._version += 1
+
+    def read(self, filenames, encoding=None):
+        self._changed()
+        return super().read(filenames, encoding=encoding)
+
+    def read_file(self, f, source=None):
+        self._changed()
+        super().read_file(f, source=source)
+
+    def read_dict(self, dictionary, source="<dict>"):
+        self._changed()
+        super().read_dict(dictionary, source=source)
+
+    def add_section(self, section):
+        self._changed()
+        super().add_section(section)
+
+    def set(self, section, option, value=None):
+        if self.has_option(section, option) and option not in self.defaults():
+            self._value_version += 1
+        else:
+            self._changed()
+        super().set(section, option, value)
+
+    def remove_option(self, section, option):
+        self._changed()
+        return super().remove_option(section, option)
+
+    def remove_section(self, section):
+        self._changed()
+        return super().remove_section(section)
+
 
 class OppConfigType(enum.Enum):
     """
@@ -97,7 +147,6 @@ class OppConfigFileBase(MutableMapping):
 
         if not self._has_section_(self._sec):
             raise ValueError(f"no section found with name {self._sec}")
-        self._parent_cfg = []
         self.section_hierarchy = [self._ensure_config_prefix(self._sec)]
         self._is_parent = is_parent
         if not self._is_parent:
@@ -106,20 +155,26 @@ class OppConfigFileBase(MutableMapping):
                 for p in stack[0]:
                     if p == "":
                         continue
-                    _pp = OppConfigFileBase(self._root, p, is_parent=True)
-                    self._parent_cfg.append(_pp)
-                    self.section_hierarchy.append(self._ensure_config_prefix(p))
-                    if len(_pp.parents) > 0:
-                        stack.append(iter(_pp.parents))
+                    parent_sec = self._ensure_config_prefix(p)
+                    if not self._has_section_(parent_sec):
+                        raise ValueError(f"no section found with name {parent_sec}")
+                    self.section_hierarchy.append(parent_sec)
+                    parents = self._parents_of(parent_sec)
+                    if len(parents) > 0:
+                        stack.append(iter(parents))
                 else:
                     stack.pop(0)
 
         if config_name != "General" and self._has_section_("General"):
-            self._parent_cfg.append(
-                OppConfigFileBase(self._root, "General", is_parent=True)
-            )
             self.section_hierarchy.append("General")
 
+        # Resolved view: option -> section of its first occurrence in the search path
+        # (and cached values). It is built once and rebuilt after the root changed.
+        self._view = None
+        self._view_values = None
+        self._view_version = None
+        self._view_value_version = None
+
     def writer(self, fp):
         """ write the current state to the given file descriptor. Caller must close file."""
         self._root.write(fp)
@@ -139,10 +194,40 @@ class OppConfigFileBase(MutableMapping):
     @property
     def parents(self):
         """ local parents i.e all configurations listed in the 'extends' option (read-only) """
-        return [
-            s.strip()
-            for s in self._getitem_local_("extends", default="").strip().split(",")
-        ]
+        return self._parents_of(self._sec)
+
+    def _parents_of(self, sec):
+        try:
+            extends = self._root.get(sec, "extends")
+        except NoOptionError:
+            extends = ""
+        return [s.strip() for s in extends.strip().split(",")]
+
+    def _resolved_view(self):
+        """ option -> section in which the option is found first in the search path """
+        version = getattr(self._root, "version", None)
+
+        if self._view is None or version != self._view_version:
+            view = dict()
+            for sec in self.section_hierarchy:
+                for option in self._root.options(sec):
+                    view.setdefault(option, sec)
+
+            self._view = view
+            self._view_values = dict()
+            self._view_version = version
+
+        value_version = getattr(self._root, "value_version", None)
+        if value_version != self._view_value_version:
+            self._view_values = dict()
+            self._view_value_version = value_version
+
+        return self._view
+
+    def _invalidate_view(self):
+        # only required for parsers that do not track changes (see OppParser)
+        if not isinstance(self._root, OppParser):
+            self._view = None
 
     @property
     def type(self):
@@ -160,13 +245,7 @@ class OppConfigFileBase(MutableMapping):
         Returns the name of the section the option first occurs search order: local --> general
         or None if option does not exist
         """
-        if self._contains_local_(option):
-            return self.section
-        else:
-            for p in self._parent_cfg:
-                if p._contains_local_(option):
-                    return p.get_config_for_option(option)
-        return None
+        return self._resolved_view().get(option)
 
     def _has_section_(self, sec):
         """
@@ -192,6 +271,7 @@ class OppConfigFileBase(MutableMapping):
         Set new value for key. OppConfigType checks already done
         """
         self._root.set(self._sec, k, v)
+        self._invalidate_view()
 
     def _contains_local_(self, k):
         """
@@ -204,30 +284,41 @@ class OppConfigFileBase(MutableMapping):
         True if key exists in any parent. Note key my exist multiple time but only first occurrence of key
         will be returned. See search path.
         """
-        return any([k in parent for parent in self._parent_cfg])
+        return any(self._root.has_option(sec, k) for sec in self.section_hierarchy[1:])
 
     def _delitem_local(self, k):
         """
         Delete local key.
         """
         self._root.remove_option(self._sec, k)
+        self._invalidate_view()
 
     def __setitem__(self, k, v):
+        self.apply({k: v})
+
+    def apply(self, changes: dict):
+        """
+        Set the values of several existing keys at once (e.g. a parameter variation). The
+        same rules as for single keys apply: a key is changed in the section where it is
+        found first; keys of parents can only be changed with EXT_DEL_LOCAL. No key is
+        changed if one of the keys is invalid.
+        """
         if self._cfg_type is OppConfigType.READ_ONLY:
             raise NotImplementedError("Cannot set value on read only config")
 
-        if self._contains_local_(k):
-            self._set_local(k, v)
-        elif self._contained_by_parent(k):
-            if self._cfg_type <= OppConfigType.EDIT_LOCAL:
+        view = self._resolved_view()
+        targets = list()
+        for k, v in changes.items():
+            sec = view.get(k)
+            if sec is None:
+                raise KeyError(f"key not found. Key: {k}")
+            if sec != self._sec and self._cfg_type <= OppConfigType.EDIT_LOCAL:
                 raise NotImplementedError("Cannot edit value of parent config")
-            else:
-                for p in self._parent_cfg:
-                    if p._contains_local_(k):
-                        p._set_local(k, v)
-                        return
-        else:
-            raise KeyError(f"key not found. Key: {k}")
+            targets.append((sec, k, v))
+
+        for sec, k, v in targets:
+            self._root.set(sec, k, v)
+        self._invalidate_view()
 
     def __delitem__(self, k):
         if self._cfg_type.value < OppConfigType.EXT_DEL_LOCAL:
@@ -237,33 +328,23 @@ class OppConfigFileBase(MutableMapping):
         if k not in self:
             raise KeyError(f"key not found. Key: {k}")
         if self._contains_local_(k):
-            self._root.remove_option(self._sec, k)
+            self._delitem_local(k)
         else:
             raise NotImplementedError(
                 f"deletion of parent config option not implemented"
             )
 
     def __getitem__(self, k):
-        if k not in self:
+        sec = self._resolved_view().get(k)
+        if sec is None:
             raise KeyError(f"key not found. Key: {k}")
 
-        if self._contains_local_(k):
-            return self._getitem_local_(k)
-        else:
-            for parent in self._parent_cfg:
-                try:
-                    return parent._getitem_local_(k)
-                except KeyError:
-                    pass
-        raise KeyError(f"key not found. Key: {k}")
+        if k not in self._view_values:
+            self._view_values[k] = self._root.get(sec, k)
+        return self._view_values[k]
 
     def __contains__(self, k) -> bool:
-        if self._contains_local_(k):
-            return True
-        elif any([k in parent for parent in self._parent_cfg]):
-            return True
-        else:
-            return False
+        return k in self._resolved_view()
 
     def __len__(self) -> int:
         _len = 0
@@ -312,3 +393,110 @@ class OppConfigFile(OppConfigFileBase):
 
     def __init__(self, root_cfg: OppParser, config_name: str):
         super().__init__(root_cfg, config_name)
+
+
+class OppIniTemplate(object):
+    """
+    Basis omnetpp.ini that is parsed once and used for many variations. A variation
+    (`render`) is the basis text where only the lines of the changed options are replaced,
+    i.e. comments and the formatting are kept and the basis configuration is not
+    modified. An option is changed in the section where it is resolved for `config` (see
+    OppConfigFileBase.__setitem__ with the configuration type `cfg_type`).
+    """
+
+    _SECTION = re.compile(r"\[(?P<header>.+)\]")
+    _OPTION = re.compile(r"(?P<key>[^=\s#;][^=]*?)\s*=")
+
+    def __init__(self, ini_path, config, cfg_type=OppConfigType.EXT_DEL_LOCAL):
+        with open(ini_path, "r") as f:
+            self.text = f.read()
+
+        self.config = config
+        self.cfg_type = cfg_type
+        self.basis = self._parse(self.text)
+
+        self._lines = self.text.splitlines(keepends=True)
+        self._option_lines = self._index_options(self._lines)
+
+    def _parse(self, text) -> OppConfigFileBase:
+        root = OppParser(inline_comment_prefixes="#")
+        root.read_string(text)
+        return OppConfigFileBase(root, self.config, self.cfg_type)
+
+    @classmethod
+    def _index_options(cls, lines):
+        """(section, key) -> (first line, last line + 1) of the option and its
+        continuation lines."""
+
+        index = dict()
+        section, option = None, None
+
+        for nr, line in enumerate(lines):
+            if line.strip() == "" or line.lstrip()[0] in "#;":
+                option = None
+                continue
+
+            if line[0].isspace():
+                if option is not None:  # continuation line of a multi-line value
+                    index[option] = (index[option][0], nr + 1)
+                continue
+
+            match = cls._SECTION.match(line)
+            if match is not None:
+                section, option = match.group("header").strip(), None
+                continue
+
+            match = cls._OPTION.match(line)
+            if match is not None and section is not None:
+                option = (section, match.group("key").strip())
+                index[option] = (nr, nr + 1)
+            else:
+                option = None
+
+        return index
+
+    def _section_of(self, key):
+        if self.cfg_type is OppConfigType.READ_ONLY:
+            raise NotImplementedError("Cannot set value on read only config")
+
+        if self.basis.is_local(key):
+            return self.basis.section
+
+        if self.cfg_type <= OppConfigType.EDIT_LOCAL and key in self.basis:
+            raise NotImplementedError("Cannot edit value of parent config")
+
+        section = self.basis.get_config_for_option(key)
+        if section is None:
+            raise KeyError(f"key not found. Key: {key}")
+        return section
+
+    def render(self, changes: dict) -> str:
+        """Text of the ini file with the changes (key -> value) applied."""
+
+        replaced = dict()
+        for key, value in changes.items():
+            lines = self._option_lines.get((self._section_of(key), key))
+
+            if lines is None:
+                # not found in the text (e.g. unusual syntax), re-serialize a fresh parse
+                return self._render_parsed(changes)
+
+            value = str(value).replace("\n", "\n\t")
+            replaced[lines] = f"{key} = {value}\n"
+
+        new_lines = list(self._lines)
+        for (start, stop), line in sorted(replaced.items(), reverse=True):
+            new_lines[start:stop] = [line]
+        return "".join(new_lines)
+
+    def _render_parsed(self, changes: dict) -> str:
+        ini_object = self._parse(self.text)
+        ini_object.apply(changes)
+
+        buffer = io.StringIO()
+        ini_object.writer(buffer)
+        return buffer.getvalue()
+
+    def write(self, path, changes: dict):
+        with open(path, "w") as f:
+            f.write(self.render(changes))
@@ -1,7 +1,12 @@
 import os
 import unittest
 
-from suqc.opp.config_parser import OppConfigFileBase, OppConfigType
+from suqc.opp.config_parser import (
+    OppConfigFileBase,
+    OppConfigType,
+    OppIniTemplate,
+    OppParser,
+)
 
 
 class OppConfigFileBaseTest(unittest.TestCase):
@@ -157,3 +162,90 @@ class OppConfigFileBaseTest(unittest.TestCase):
             if not line.startswith("\n")
         ]
         self.assertListEqual(lines_new, lines_del)
+
+    def test_apply(self):
+        opp = self.get_object("SlottedAloha2b", OppConfigType.EXT_DEL_LOCAL)
+        opp.apply({"opt_6": '"new_6"', "opt_1": '"new_1"', "opt_HT": '"new_HT"'})
+        self.assertEqual(opp["opt_6"], '"new_6"')
+        self.assertEqual(opp["opt_1"], '"new_1"')
+        self.assertEqual(opp["opt_HT"], '"new_HT"')
+        self.assertEqual(opp.get_config_for_option("opt_HT"), "Config SlottedAloha2")
+
+        # no key is changed if one key is invalid
+        self.assertRaises(KeyError, opp.apply, {"opt_6": '"x"', "no_key": '"x"'})
+        self.assertEqual(opp["opt_6"], '"new_6"')
+
+        opp = self.get_object("SlottedAloha2b", OppConfigType.EDIT_LOCAL)
+        self.assertRaises(
+            NotImplementedError, opp.apply, {"opt_6": '"x"', "opt_1": '"x"'}
+        )
+        self.assertEqual(opp["opt_6"], '"val_6"')
+
+    def test_resolved_view_invalidated(self):
+        opp = self.get_object("SlottedAloha2b", OppConfigType.EXT_DEL_LOCAL)
+        sa_2 = OppConfigFileBase(
+            opp._root, "SlottedAloha2", OppConfigType.EXT_DEL_LOCAL
+        )
+        self.assertEqual(opp["opt_HT"], '"overwritten_val_HT"')
+
+        # changes of another object (or the parser) on the same file are visible
+        sa_2["opt_HT"] = '"changed"'
+        self.assertEqual(opp["opt_HT"], '"changed"')
+        del sa_2["opt_HT"]
+        self.assertEqual(opp["opt_HT"], '"val_HT"')
+        self.assertEqual(
+            opp.get_config_for_option("opt_HT"), "Config HighTrafficSettings"
+        )
+        opp._root.set("Config SlottedAloha2b", "opt_HT", '"local"')
+        self.assertEqual(opp["opt_HT"], '"local"')
+        self.assertTrue("opt_HT" in opp)
+
+
+class OppIniTemplateTest(unittest.TestCase):
+
+    INI_PATH = os.path.join(os.path.split(__file__)[0], "omnetpp.ini")
+
+    def get_template(self, config, cfg_type=OppConfigType.EXT_DEL_LOCAL):
+        return OppIniTemplate(self.INI_PATH, config, cfg_type)
+
+    @staticmethod
+    def parse(text, config):
+        root = OppParser(inline_comment_prefixes="#")
+        root.read_string(text)
+        return OppConfigFileBase(root, config, OppConfigType.EXT_DEL_LOCAL)
+
+    def test_render_same_as_set(self):
+        template = self.get_template("SlottedAloha2b")
+        changes = {
+            "opt_6": '"new_6"',  # local
+            "opt_1": '"new_1"',  # parent
+            "opt_HT": '"new_HT"',  # first occurrence in the search path
+            "general_option": '"new_general"',
+        }
+
+        expected = OppConfigFileBase.from_path(
+            self.INI_PATH, "SlottedAloha2b", OppConfigType.EXT_DEL_LOCAL
+        )
+        for key, value in changes.items():
+            expected[key] = value
+
+        rendered = self.parse(template.render(changes), "SlottedAloha2b")
+        self.assertEqual(dict(rendered.items()), dict(expected.items()))
+
+        # only the changed lines differ, the basis is not modified
+        basis_lines = template.text.splitlines()
+        diff = [
+            (a, b)
+            for a, b in zip(basis_lines, template.render(changes).splitlines())
+            if a != b
+        ]
+        self.assertEqual(len(diff), len(changes))
+        self.assertEqual(template.basis["opt_6"], '"val_6"')
+        self.assertEqual(template.render(dict()), template.text)
+
+    def test_render_errors(self):
+        template = self.get_template("SlottedAloha2b")
+        self.assertRaises(KeyError, template.render, {"no_key": "1"})
+
+        template = self.get_template("SlottedAloha2b", OppConfigType.EDIT_LOCAL)
+        self.assertRaises(NotImplementedError, template.render, {"opt_1": "1"})
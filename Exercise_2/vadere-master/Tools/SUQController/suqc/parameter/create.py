@@ -1,16 +1,26 @@
 #!/usr/bin/env python3
 import abc
+import hashlib
+import json
 import multiprocessing
 import os
 import warnings
-from distutils.dir_util import copy_tree
 
 import suqc.request  # no "from suqc.request import ..." works because of circular imports
+from suqc.cache import file_hash
 from suqc.environment import AbstractEnvironmentManager, VadereEnvironmentManager
 from suqc.parameter.postchanges import PostScenarioChangesBase
 from suqc.parameter.sampling import ParameterVariationBase
-from suqc.utils.dict_utils import change_dict, change_dict_ini, deep_dict_lookup
-from suqc.utils.general import create_folder, njobs_check_and_set, remove_folder
+from suqc import tracing
+from suqc.utils.dict_utils import KeyPathPlan, get_path_value
+from suqc.utils.general import (
+    LINK_MODES,
+    create_folder,
+    link_tree,
+    make_read_only,
+    njobs_check_and_set,
+    remove_folder,
+)
 
 
 class AbstractScenarioCreation(object):
@@ -23,6 +33,12 @@ class AbstractScenarioCreation(object):
         self._env_man = env_man
         self._parameter_variation = parameter_variation
         self._post_changes = post_change
+        self._resume = False
+        self._vadere_key_plan = None
+        self._basis_hash = None
+        self._post_changes_config = None
+        # see CoupledScenarioCreation
+        self._asset_mode = "copy"
         self._sampling_check_selected_keys()
 
     @abc.abstractmethod
@@ -38,7 +54,11 @@ class AbstractScenarioCreation(object):
         raise NotImplemented
 
     # public methods
-    def generate_scenarios(self, njobs):
+    def generate_scenarios(self, njobs, resume=False, lazy=False):
+        """Writes all scenario files and returns the request items. If lazy is True, no
+        scenario file is written here. Instead, each request item carries its parameter
+        variation and the scenario is written right before the run (see
+        `create_lazy_scenario`, only supported by VadereScenarioCreation)."""
 
         ntasks = self._parameter_variation.points.shape[0]
         njobs = njobs_check_and_set(njobs=njobs, ntasks=ntasks)
@@ -52,17 +72,60 @@ class AbstractScenarioCreation(object):
 
         target_path = self._env_man.get_env_outputfolder_path()
 
-        # For security:
-        remove_folder(target_path)
-        create_folder(target_path)
+        # compiled before the scenarios are created, so that the (parallel) workers do not
+        # have to resolve the keys again
+        self._compile_vadere_key_plan()
+        self._basis_hash = file_hash(self._env_man.vadere_path_basis_scenario)
+        self._post_changes_config = json.dumps(
+            None if self._post_changes is None else self._post_changes.configuration(),
+            sort_keys=True,
+            default=str,
+        )
+
+        # If resume is True, the scenario files of completed runs of a previous (interrupted)
+        # sweep are kept, if the variation hash of the run did not change.
+        self._resume = resume
 
-        if njobs == 1:
-            request_item_list = self._sp_creation()
+        if resume:
+            os.makedirs(target_path, exist_ok=True)
         else:
-            request_item_list = self._mp_creation(njobs)
+            # For security:
+            remove_folder(target_path)
+            create_folder(target_path)
+
+        with tracing.span("create_scenarios", lazy=lazy, njobs=njobs):
+            if lazy:
+                request_item_list = self._lazy_creation()
+            elif njobs == 1:
+                request_item_list = self._sp_creation()
+            else:
+                request_item_list = self._mp_creation(njobs)
 
         return request_item_list
 
+    def create_lazy_scenario(self, request_item) -> bool:
+        """Write the scenario file of a request item from `generate_scenarios(lazy=True)`.
+        Returns False if the scenario file already exists."""
+
+        if self._env_man.scenario_variation_exists(
+            request_item.parameter_id, request_item.run_id
+        ):
+            if not self._resume:
+                # scenario files are written atomically, an existing file is complete
+                return False
+
+            # the run is carried out (again), the file may be of a changed sweep
+            self._env_man.remove_scenario_variation(
+                request_item.parameter_id, request_item.run_id
+            )
+
+        self._write_vadere_scenario(
+            request_item.parameter_id,
+            request_item.run_id,
+            request_item.parameter_variation,
+        )
+        return True
+
     # private methods
     def _adapt_nr_digits_env_man(self, nr_variations, nr_runs):
         self._env_man.nr_digits_variation = len(str(nr_variations))
@@ -78,10 +141,57 @@ class AbstractScenarioCreation(object):
         run_id = args[1]
         parameter_variation = args[2]
 
-        par_var_scenario = change_dict(
-            self._env_man.vadere_basis_scenario, changes=parameter_variation
+        request_item = self._vadere_request_item(
+            parameter_id, run_id, self._variation_hash(parameter_variation)
+        )
+
+        if self._resume and self._env_man.scenario_variation_exists(
+            parameter_id, run_id
+        ):
+            if suqc.request.Request.is_completed(request_item):
+                # scenario files are written atomically, an existing file is complete
+                return request_item
+
+            # the run did not finish or the sweep changed -> the scenario is written again
+            self._env_man.remove_scenario_variation(parameter_id, run_id)
+
+        # the span is returned with the request item (also from the worker processes)
+        with tracing.collect() as events:
+            self._write_vadere_scenario(parameter_id, run_id, parameter_variation)
+
+        request_item.trace_events.extend(events)
+        return request_item
+
+    def _variation_hash(self, parameter_variation):
+        # identifies the scenario of a run: basis scenario, post changes and the varied
+        # values
+        sha = hashlib.sha256(self._basis_hash.encode())
+        sha.update(self._post_changes_config.encode())
+        sha.update(
+            json.dumps(parameter_variation, sort_keys=True, default=str).encode()
+        )
+        return sha.hexdigest()
+
+    def _vadere_request_item(
+        self, parameter_id, run_id, variation_hash, parameter_variation=None
+    ):
+        return suqc.request.RequestItem(
+            parameter_id=parameter_id,
+            run_id=run_id,
+            scenario_path=self._env_man.scenario_variation_path(parameter_id, run_id),
+            base_path=self._env_man.base_path,
+            output_folder=self._env_man.get_variation_output_folder(
+                parameter_id, run_id
+            ),
+            parameter_variation=parameter_variation,
+            variation_hash=variation_hash,
         )
 
+    @tracing.traced("create_scenario")
+    def _write_vadere_scenario(self, parameter_id, run_id, parameter_variation):
+        key_plan = self._vadere_key_plan
+        par_var_scenario = key_plan.apply(parameter_variation)
+
         if self._post_changes is not None:
             # Apply pre-defined changes to each scenario file
             new_scenario = self._post_changes.change_scenario(
@@ -89,30 +199,39 @@ class AbstractScenarioCreation(object):
                 parameter_id=parameter_id,
                 run_id=run_id,
                 parameter_variation=parameter_variation,
+                key_plan=key_plan,
             )
         else:
             new_scenario = par_var_scenario
 
-        output_folder = self._env_man.get_variation_output_folder(parameter_id, run_id)
         self._print_scenario_warnings(new_scenario)
-        scenario_path = self._env_man.save_scenario_variation(
-            parameter_id, run_id, new_scenario
+        return self._env_man.save_scenario_variation(
+            parameter_id, run_id, new_scenario, key_plan=key_plan
         )
 
-        result_item = suqc.request.RequestItem(
-            parameter_id=parameter_id,
-            run_id=run_id,
-            scenario_path=scenario_path,
-            base_path=self._env_man.base_path,
-            output_folder=output_folder,
-        )
-        return result_item
+    def _compile_vadere_key_plan(self):
+        # The key chains are resolved once per basis scenario and not for every
+        # variation. Keys of the post changes are resolved when they are first used.
+        if self._vadere_key_plan is None:
+            columns = self._parameter_variation.points.columns
+            keys = columns.get_level_values(-1)
+            if self._parameter_variation.is_multiple_simulators():
+                keys = keys[columns.get_level_values(1) == "vadere"]
+
+            self._vadere_key_plan = KeyPathPlan(
+                self._env_man.vadere_basis_scenario,
+                keys=keys,
+                key_index=self._env_man.vadere_basis_key_index,
+            )
 
     def _print_scenario_warnings(self, scenario):
         try:
-            real_time_sim_time_ratio, _ = deep_dict_lookup(
-                scenario, "realTimeSimTimeRatio"
+            # The variations have the structure of the basis scenario, the key is looked
+            # up once in the index of the basis.
+            _, path = self._env_man.vadere_basis_key_index.lookup(
+                "realTimeSimTimeRatio"
             )
+            real_time_sim_time_ratio = get_path_value(scenario, path)
         except Exception:
             real_time_sim_time_ratio = (
                 0  # ignore this warning if the lookup failed for whatever reason.
@@ -133,19 +252,19 @@ class AbstractScenarioCreation(object):
         run_id = args[1]
         parameter_variation = args[2]
 
-        par_var_scenario = change_dict_ini(
-            self._env_man.omnet_basis_ini, changes=parameter_variation
-        )
         output_path = self._env_man.scenario_variation_path(
             parameter_id, run_id, simulator="omnet"
         )
 
-        with open(output_path, "w") as outfile:
-            par_var_scenario.writer(outfile)
+        with tracing.span("create_omnet_scenario"):
+            # only the lines of the changed options differ from the basis ini
+            self._env_man.omnet_basis_template.write(output_path, parameter_variation)
+
+            folder = os.path.dirname(output_path)
+            link_tree(self._shared_assets_path(), folder, mode=self._asset_mode)
 
-        folder = os.path.dirname(output_path)
-        ini_path = os.path.join(self._env_man.env_path, "additional_rover_files")
-        copy_tree(ini_path, folder)
+    def _shared_assets_path(self):
+        return os.path.join(self._env_man.env_path, "additional_rover_files")
 
 
 class VadereScenarioCreation(AbstractScenarioCreation):
@@ -174,8 +293,19 @@ class VadereScenarioCreation(AbstractScenarioCreation):
         )
         return request_item_list
 
+    def _lazy_creation(self):
+        """Request items without scenario files (written right before the run)."""
+        return [
+            self._vadere_request_item(
+                par_id, run_id, self._variation_hash(par_change), par_change
+            )
+            for par_id, run_id, par_change in self._parameter_variation.par_iter()
+        ]
+
     def _sampling_check_selected_keys(self):
-        self._parameter_variation.check_vadere_keys(self._env_man.vadere_basis_scenario)
+        self._parameter_variation.check_vadere_keys(
+            self._env_man.vadere_basis_key_index
+        )
 
 
 class CoupledScenarioCreation(AbstractScenarioCreation):
@@ -184,11 +314,29 @@ class CoupledScenarioCreation(AbstractScenarioCreation):
         env_man: AbstractEnvironmentManager,
         parameter_variation: ParameterVariationBase,
         post_change: PostScenarioChangesBase = None,
+        shared_assets: str = "copy",
     ):
+        """
+        :param shared_assets: how the files of "additional_rover_files" are placed in
+            the folder of each variation, see `link_tree` ("copy", "hardlink" or
+            "symlink"). With "hardlink", the shared files are made read-only.
+        """
         super().__init__(env_man, parameter_variation, post_change)
 
+        if shared_assets not in LINK_MODES:
+            raise ValueError(
+                f"shared_assets={shared_assets} not contained in allowed: {LINK_MODES}"
+            )
+        self._asset_mode = shared_assets
+
+    def _prepare_shared_assets(self):
+        if self._asset_mode == "hardlink":
+            # a run must not change a file (in place) of all other runs
+            make_read_only(self._shared_assets_path())
+
     def _sp_creation(self):
         """Single process loop to create all requested scenarios."""
+        self._prepare_shared_assets()
 
         # omnet specific
         variations_omnet = self._parameter_variation.par_iter(simulator="omnet")
@@ -207,6 +355,7 @@ class CoupledScenarioCreation(AbstractScenarioCreation):
 
     def _mp_creation(self, njobs):
         """Multi process function to create all requested scenarios."""
+        self._prepare_shared_assets()
         pool = multiprocessing.Pool(processes=njobs)
 
         variations_omnet = self._parameter_variation.par_iter(simulator="omnet")
@@ -218,5 +367,7 @@ class CoupledScenarioCreation(AbstractScenarioCreation):
 
     def _sampling_check_selected_keys(self):
 
-        self._parameter_variation.check_vadere_keys(self._env_man.vadere_basis_scenario)
+        self._parameter_variation.check_vadere_keys(
+            self._env_man.vadere_basis_key_index
+        )
         self._parameter_variation.check_omnet_keys(self._env_man.omnet_basis_ini)
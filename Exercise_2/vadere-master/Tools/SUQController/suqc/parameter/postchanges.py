@@ -30,6 +30,12 @@ class PostScenarioChangesBase(object):
             )
         self._apply_scenario_changes[scenario_change.name] = scenario_change
 
+    def configuration(self) -> list:
+        """Canonical (JSON serializable) form of the scenario changes, e.g. to detect
+        changed post changes when a sweep is resumed."""
+        # in the order the changes are applied
+        return [chn.configuration() for chn in self._apply_scenario_changes.values()]
+
     def _collect_changes(self, scenario, parameter_id, run_id, parameter_variation):
         changes = {}
         for chn in self._apply_scenario_changes.values():
@@ -43,19 +49,31 @@ class PostScenarioChangesBase(object):
             )
         return changes
 
-    def change_scenario(self, scenario, parameter_id, run_id, parameter_variation):
-        return change_dict(
-            scenario,
-            changes=self._collect_changes(
-                scenario, parameter_id, run_id, parameter_variation
-            ),
+    def change_scenario(
+        self, scenario, parameter_id, run_id, parameter_variation, key_plan=None
+    ):
+        changes = self._collect_changes(
+            scenario, parameter_id, run_id, parameter_variation
         )
 
+        if key_plan is None:
+            return change_dict(scenario, changes=changes)
+        else:
+            # key_plan: KeyPathPlan of the basis scenario of 'scenario'
+            return key_plan.apply(changes, scenario)
+
 
 class PostScenarioChange(metaclass=abc.ABCMeta):
     def __init__(self, name):
         self.name = name
 
+    def configuration(self) -> dict:
+        """Class and attributes (the settings) of the change."""
+        return {
+            "class": f"{type(self).__module__}.{type(self).__qualname__}",
+            "attributes": dict(vars(self)),
+        }
+
     @abc.abstractmethod
     def get_changes_dict(self, scenario, parameter_id, run_id, parameter_variation):
         raise NotImplementedError("ABC method")
@@ -66,26 +66,19 @@ class ParameterVariationBase(metaclass=abc.ABCMeta):
                     f"WARNING: {information}. Last {len(scenario_runs)-len(self._points.index.values)} element(s) are ignored."
                 )
 
-        if isinstance(scenario_runs, int):
-            scenario_runs = scenario_runs * np.ones(
-                (len(self._points.index.values),), dtype=int
-            )
+        nr_points = len(self._points.index.values)
 
-        k = 0
-        for idx_vals in self._points.index.values:
-            idx_id = idx_vals.repeat(scenario_runs[k])
-            idx_run_id = np.arange(0, scenario_runs[k])
-            df0 = np.tile(self._points.values[k], (scenario_runs[k], 1))
-            if k == 0:
-                idx_ids = idx_id
-                idx_run_ids = idx_run_id
-                df = df0
-            else:
-                idx_ids = np.append(idx_ids, idx_id)
-                idx_run_ids = np.append(idx_run_ids, idx_run_id)
+        if isinstance(scenario_runs, int):
+            scenario_runs = np.full(nr_points, scenario_runs, dtype=int)
+        else:
+            scenario_runs = np.asarray(scenario_runs[:nr_points], dtype=int)
 
-                df = np.append(df, df0, axis=0)
-            k += 1
+        # Each point (row) is repeated scenario_runs times, the run ids count from 0 to
+        # scenario_runs-1 for each point.
+        idx_ids = np.repeat(self._points.index.values, scenario_runs)
+        run_offsets = np.repeat(np.cumsum(scenario_runs) - scenario_runs, scenario_runs)
+        idx_run_ids = np.arange(idx_ids.shape[0]) - run_offsets
+        df = np.repeat(self._points.values, scenario_runs, axis=0)
 
         self._points = pd.DataFrame(
             df,
@@ -153,11 +146,18 @@ class ParameterVariationBase(metaclass=abc.ABCMeta):
             )
             cols = [tuple([parameter]) for parameter in df.columns.values]
 
+        self._set_parameter_points(df, cols)
+
+    def _add_columnar_points(self, columns: Dict[str, np.ndarray]):
+        # Same as _add_dict_points (vadere only) but with the values stored per parameter
+        df = pd.concat([self._points, pd.DataFrame(columns)], ignore_index=True, axis=0)
+        cols = [tuple([parameter]) for parameter in df.columns.values]
+        self._set_parameter_points(df, cols)
+
+    def _set_parameter_points(self, df: pd.DataFrame, cols):
+
         # Add an additional multiindex levels called "Parameter"
-        for ii in range(len(cols)):
-            col = list(cols[ii])
-            col.insert(0, ParameterVariationBase.MULTI_IDX_LEVEL0_PAR)
-            cols[ii] = tuple(col)
+        cols = [(ParameterVariationBase.MULTI_IDX_LEVEL0_PAR,) + tuple(c) for c in cols]
 
         df.columns = pd.MultiIndex.from_tuples(cols)
 
@@ -168,17 +168,21 @@ class ParameterVariationBase(metaclass=abc.ABCMeta):
     def _add_df_points(self, points: pd.DataFrame):
         self._points = points
 
-    def check_vadere_keys(self, scenario: dict, simulator="vadere"):
+    def check_vadere_keys(
+        self, scenario: Union[dict, ScenarioKeyIndex], simulator="vadere"
+    ):
 
         keys = self._points.columns.get_level_values(-1)
         if self.is_multiple_simulators():
             keys = keys[self._points.columns.get_level_values(1) == simulator]
 
+        # all keys are looked up in one index of the scenario
+        if not isinstance(scenario, ScenarioKeyIndex):
+            scenario = ScenarioKeyIndex(scenario)
+
         for k in keys:
             try:  # check that the value is 'final' (i.e. not another sub-directory) and that the key is unique.
-                deep_dict_lookup(
-                    scenario, k, check_final_leaf=True, check_unique_key=True
-                )
+                scenario.lookup(k, check_final_leaf=True, check_unique_key=True)
             except ValueError as e:
                 raise e  # re-raise Exception
         return True
@@ -196,27 +200,80 @@ class ParameterVariationBase(metaclass=abc.ABCMeta):
     def to_dictlist(self):
         return [i[1] for i in self.par_iter()]
 
-    def par_iter(self, simulator=None):
-
+    def _parameter_frame(self, simulator=None):
         if self.is_multiple_simulators():  # vadere only
-            df = self._points[(ParameterVariationBase.MULTI_IDX_LEVEL0_PAR, simulator)]
+            return self._points[
+                (ParameterVariationBase.MULTI_IDX_LEVEL0_PAR, simulator)
+            ]
+        else:
+            return self._points[ParameterVariationBase.MULTI_IDX_LEVEL0_PAR]
+
+    @staticmethod
+    def _nan_mask(values: np.ndarray):
+        # Only float NaN values are removed (not e.g. None)
+        if values.dtype.kind == "f":
+            return np.isnan(values)
+        elif values.dtype.kind == "O":
+            is_nan = np.frompyfunc(lambda v: isinstance(v, float) and v != v, 1, 1)
+            return is_nan(values).astype(bool)
         else:
-            df = self._points[ParameterVariationBase.MULTI_IDX_LEVEL0_PAR]
+            return np.zeros(values.shape, dtype=bool)
 
-        for (par_id, run_id), row in df.iterrows():
-            # TODO: this is not nice coding, however, there are some issues. See issue #40
-            parameter_variation = dict(row)
-            delete_keys = list()
+    def par_iter_batches(self, batch_size=10000, simulator=None, structured=False):
+        """Iterate over the points in batches.
 
-            # nan entries are not considered and therefore removed
-            for k, v in parameter_variation.items():
-                if isinstance(v, np.float) and np.isnan(v):
-                    delete_keys.append(k)
+        Yields lists of tuples (par_id, run_id, parameter_variation) where NaN entries
+        are removed from the parameter_variation dict. If structured is True, numpy
+        structured arrays with fields "id", "run_id" and the parameter keys are yielded
+        instead (NaN entries are kept)."""
 
-            for dk in delete_keys:
-                del parameter_variation[dk]
+        df = self._parameter_frame(simulator)
 
-            yield (par_id, run_id, parameter_variation)
+        keys = df.columns.tolist()
+        # same (common) dtype as the rows in DataFrame.iterrows
+        values = df.to_numpy()
+        index = df.index.tolist()
+
+        if structured:
+            dtype = [("id", np.int64), ("run_id", np.int64)] + [
+                (str(k), df[k].dtype) for k in keys
+            ]
+            columns = [df[k].to_numpy() for k in keys]
+
+        for start in range(0, values.shape[0], batch_size):
+            batch_values = values[start : start + batch_size]
+            batch_index = index[start : start + batch_size]
+
+            if structured:
+                batch = np.empty(batch_values.shape[0], dtype=dtype)
+                batch["id"] = [par_id for par_id, _ in batch_index]
+                batch["run_id"] = [run_id for _, run_id in batch_index]
+                for k, column in zip(keys, columns):
+                    batch[str(k)] = column[start : start + batch_size]
+                yield batch
+                continue
+
+            nan_rows = self._nan_mask(batch_values).any(axis=1)
+
+            batch = list()
+            for (par_id, run_id), row, has_nan in zip(
+                batch_index, batch_values, nan_rows
+            ):
+                if has_nan:
+                    # nan entries are not considered and therefore removed
+                    parameter_variation = {
+                        k: v
+                        for k, v in zip(keys, row)
+                        if not (isinstance(v, float) and np.isnan(v))
+                    }
+                else:
+                    parameter_variation = dict(zip(keys, row))
+                batch.append((par_id, run_id, parameter_variation))
+            yield batch
+
+    def par_iter(self, simulator=None):
+        for batch in self.par_iter_batches(simulator=simulator):
+            yield from batch
 
     def is_multiple_simulators(self):
         return self._points.columns.nlevels == 3
@@ -312,9 +369,8 @@ class RandomSampling(ParameterVariationBase):
 
     def _create_distribution_samples(self, nr_samples):
 
-        samples = list()
-        for i in range(nr_samples):
-            samples.append({})
+        # columnar storage: parameter name -> array of samples
+        samples = dict()
 
         for d in self.dists.keys():
 
@@ -330,15 +386,259 @@ class RandomSampling(ParameterVariationBase):
                     f"https://docs.scipy.org/doc/numpy-1.13.0/reference/routines.random.html"
                 )
 
-            for i in range(nr_samples):
-                samples[i][d] = outcomes[i]
+            samples[d] = outcomes
 
         return samples
 
     def create_grid(self, nr_samples=100):
         self._add_parameters = False
         samples = self._create_distribution_samples(nr_samples)
-        self._add_dict_points(samples)
+        self._add_columnar_points(samples)
+
+
+class UnitHypercube(object):
+    """Affine map between the unit hypercube and the ranges [lower, upper] of scalar
+    parameters (see class Parameter)."""
+
+    def __init__(self, parameters: List["Parameter"]):
+        for parameter in parameters:
+            if parameter.list_index is not None or parameter.get_range() is None:
+                raise ValueError(
+                    f"Parameter {parameter.name} requires a range [lower, upper] and list "
+                    f"parameters are not supported."
+                )
+
+        self.parameters = parameters
+        self.lower_bounds = np.array([p.get_lower_bound() for p in parameters])
+        self.intervals = np.array([p.get_interval() for p in parameters])
+
+    @property
+    def dimension(self):
+        return len(self.parameters)
+
+    @property
+    def parameter_names(self):
+        return [p.name for p in self.parameters]
+
+    def to_parameter_space(self, unit_points):
+        return self.lower_bounds + unit_points * self.intervals
+
+    def to_unit(self, points):
+        return (np.asarray(points, dtype=float) - self.lower_bounds) / self.intervals
+
+
+class RangeSampling(ParameterVariationBase):
+    """Base class of designs in the unit hypercube, which are mapped onto the ranges of
+    scalar parameters (see class Parameter)."""
+
+    def __init__(self, parameters: List["Parameter"]):
+        super(RangeSampling, self).__init__()
+
+        self._hypercube = UnitHypercube(parameters)
+
+        simulators = [parameter.get_simulator() for parameter in parameters]
+        if None in simulators and len(set(simulators)) > 1:
+            raise ValueError(
+                "Either all or none of the parameters have to set the simulator."
+            )
+
+        self.parameters = parameters
+        self._unit_points = None
+
+    @property
+    def parameter_names(self):
+        return [p.name for p in self.parameters]
+
+    @property
+    def unit_points(self):
+        """All points of the design in the unit hypercube."""
+        return self._unit_points
+
+    def _to_parameter_space(self, unit_points):
+        return self._hypercube.to_parameter_space(unit_points)
+
+    def _to_dict_points(self, values):
+        points = list()
+
+        for row in values:
+            sample = dict()
+            for parameter, val in zip(self.parameters, row):
+                if parameter.unit is not None:
+                    val = f"{val}{parameter.unit}"
+
+                simulator = parameter.get_simulator()
+                if simulator is None:
+                    sample[parameter.name] = val
+                else:
+                    sample.setdefault(simulator, dict())[parameter.name] = val
+            points.append(sample)
+
+        return points
+
+
+class QuasiMonteCarloSampling(RangeSampling):
+    """Low-discrepancy design. The points of a scipy.stats.qmc engine in the unit
+    hypercube are mapped onto the ranges of the parameters (see class Parameter).
+
+    The design is extensible: `append` draws the next points of the same sequence and
+    returns only the new points (with continuing ids), such that existing runs do not
+    have to be carried out again.
+    """
+
+    def __init__(self, parameters: List["Parameter"], scramble=True, seed=None):
+        super(QuasiMonteCarloSampling, self).__init__(parameters)
+        self.scramble = scramble
+        self.seed = seed
+        self._engine = None
+
+    @abc.abstractmethod
+    def _create_engine(self, dimension):
+        raise NotImplementedError("Overwrite in child class.")
+
+    def _draw(self, nr_samples):
+        if self._engine is None:
+            self._engine = self._create_engine(len(self.parameters))
+
+        unit_points = self._engine.random(nr_samples)
+
+        if self._unit_points is None:
+            self._unit_points = unit_points
+        else:
+            self._unit_points = np.concatenate([self._unit_points, unit_points])
+
+        return self._to_parameter_space(unit_points)
+
+    def create_grid(self, nr_samples):
+        if self._unit_points is not None:
+            raise ValueError(
+                "The design was already created. Use 'append' to add more points."
+            )
+
+        self._add_dict_points(self._to_dict_points(self._draw(nr_samples)))
+        return self
+
+    def append(self, nr_samples) -> "UserDefinedSampling":
+        """Draw the next points of the sequence. Only the new points are returned, their
+        ids continue after the existing points."""
+
+        if self._unit_points is None:
+            raise ValueError("Create the design with 'create_grid' first.")
+
+        first_id = self._unit_points.shape[0]
+        variation = UserDefinedSampling(self._to_dict_points(self._draw(nr_samples)))
+        variation.points.index = pd.RangeIndex(
+            first_id,
+            first_id + nr_samples,
+            name=ParameterVariationBase.ROW_IDX_NAME_ID,
+        )
+        return variation
+
+
+class SobolSampling(QuasiMonteCarloSampling):
+    """(Scrambled) Sobol sequence. The balance properties of the sequence require that
+    the number of points is a power of 2."""
+
+    def _create_engine(self, dimension):
+        from scipy.stats import qmc
+
+        return qmc.Sobol(d=dimension, scramble=self.scramble, seed=self.seed)
+
+
+class HaltonSampling(QuasiMonteCarloSampling):
+    """(Scrambled) Halton sequence."""
+
+    def _create_engine(self, dimension):
+        from scipy.stats import qmc
+
+        return qmc.Halton(d=dimension, scramble=self.scramble, seed=self.seed)
+
+
+class SaltelliSampling(SobolSampling):
+    """Design to estimate first- and total-order Sobol indices (see
+    suqc.sensitivity.sobol_analysis). Two independent Sobol matrices A and B with
+    `nr_base_samples` rows are drawn; for each parameter i the matrix AB_i is A with
+    column i taken from B. The points are ordered in blocks [A, B, AB_1, ..., AB_d],
+    i.e. the design has nr_base_samples * (d + 2) points.
+    """
+
+    def create_grid(self, nr_base_samples):
+        if self._unit_points is not None:
+            raise ValueError("The design was already created.")
+
+        dimension = len(self.parameters)
+        self._engine = self._create_engine(2 * dimension)
+
+        base = self._engine.random(nr_base_samples)
+        a, b = base[:, :dimension], base[:, dimension:]
+
+        ab = np.repeat(a[np.newaxis, :, :], dimension, axis=0)
+        ab[np.arange(dimension), :, np.arange(dimension)] = b.T
+
+        self.nr_base_samples = nr_base_samples
+        self._unit_points = np.concatenate([a, b, ab.reshape(-1, dimension)])
+
+        self._add_dict_points(
+            self._to_dict_points(self._to_parameter_space(self._unit_points))
+        )
+        return self
+
+    def append(self, nr_samples):
+        raise ValueError(
+            "A Saltelli design cannot be extended, create a new design with more base "
+            "samples."
+        )
+
+
+class MorrisSampling(RangeSampling):
+    """Morris design (elementary effects, see suqc.sensitivity.morris_analysis). Each
+    trajectory starts at a random point of a grid with `nr_levels` levels per parameter
+    and changes one parameter after another (in random order and direction) by
+    delta = nr_levels / (2 * (nr_levels - 1)), i.e. the design has
+    nr_trajectories * (d + 1) points.
+    """
+
+    def __init__(self, parameters: List["Parameter"], nr_levels=4, seed=None):
+        super(MorrisSampling, self).__init__(parameters)
+
+        if nr_levels < 2 or nr_levels % 2 != 0:
+            raise ValueError(f"nr_levels has to be even and >= 2. Got {nr_levels}.")
+
+        self.nr_levels = nr_levels
+        self.seed = seed
+
+    @property
+    def delta(self):
+        return self.nr_levels / (2 * (self.nr_levels - 1))
+
+    def create_grid(self, nr_trajectories):
+        if self._unit_points is not None:
+            raise ValueError("The design was already created.")
+
+        rng = np.random.default_rng(self.seed)
+        dimension = len(self.parameters)
+
+        # start points on the grid such that start + delta <= 1
+        start = rng.integers(
+            0, self.nr_levels // 2, size=(nr_trajectories, 1, dimension)
+        )
+        start = start / (self.nr_levels - 1)
+
+        # Campolongo et al. (2007): B is strictly lower triangular, D are random
+        # directions, P random permutations of the parameters
+        lower = np.tril(np.ones((dimension + 1, dimension)), k=-1)
+        directions = rng.choice([-1.0, 1.0], size=(nr_trajectories, 1, dimension))
+        steps = (self.delta / 2) * ((2 * lower - 1) * directions + 1)
+
+        order = np.argsort(rng.random((nr_trajectories, 1, dimension)), axis=2)
+        trajectories = start + np.take_along_axis(steps, order, axis=2)
+
+        self.nr_trajectories = nr_trajectories
+        self._unit_points = trajectories.reshape(-1, dimension)
+
+        self._add_dict_points(
+            self._to_dict_points(self._to_parameter_space(self._unit_points))
+        )
+        return self
 
 
 class BoxSamplingUlamMethod(ParameterVariationBase):
@@ -361,31 +661,27 @@ class BoxSamplingUlamMethod(ParameterVariationBase):
             )[1:-1]
         return arr
 
-    def _get_box(self, row):
+    def _box_index(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized box ids of points (one row per point, one column per parameter).
+        The ids count first in x-, then in y- and z-direction (see `create_grid`)."""
 
-        vals = row.values
+        values = np.atleast_2d(np.asarray(values, dtype=float))
 
-        def _get_idx(val, dim):
-            return int(np.floor((val - self._edges[dim][0]) / self._box_width[dim]))
+        box = np.zeros(values.shape[0], dtype=np.int64)
+        stride = 1
 
-        idx_x = _get_idx(vals[0], 0)
-        if len(vals) == 1:
-            idx_y = 0
-            idx_z = 0
-        elif len(vals) == 2:
-            idx_y = _get_idx(vals[1], 1)
-            idx_z = 0
-        else:
-            idx_y = _get_idx(vals[1], 1)
-            idx_z = _get_idx(vals[2], 2)
+        for dim in range(values.shape[1]):
+            idx = np.floor(
+                (values[:, dim] - self._edges[dim][0]) / self._box_width[dim]
+            )
+            box += idx.astype(np.int64) * stride
+            stride *= self._nr_boxes[dim]
 
-        box = (
-            idx_x
-            + idx_y * (self._nr_boxes[0])
-            + idx_z * (self._nr_boxes[0] * self._nr_boxes[1])
-        )
         return box
 
+    def _get_box(self, row):
+        return int(self._box_index(row.values)[0])
+
     def create_grid(self, par, lb, rb, nr_boxes, nr_testf):
 
         if isinstance(par, str):
@@ -462,54 +758,92 @@ class BoxSamplingUlamMethod(ParameterVariationBase):
         )
         df_final.index.name = ParameterVariationBase.ROW_IDX_NAME_ID
 
-        df_final["boxid"] = df_final.T.apply(self._get_box)
+        df_final["boxid"] = self._box_index(df_final.to_numpy())
 
         self._add_df_points(points=df_final)
 
     def generate_markov_matrix(self, result):
+        """Transition matrix of the boxes (scipy.sparse.csr_matrix), row i contains the
+        relative frequencies of the boxes that the test points of box i end in."""
 
-        # bool_idx = np.isnan(result).any(axis=1)
-        # result = result.loc[~bool_idx, :]
-
-        def apply_result(point):
-            row = point.iloc[:, 0]
-            if np.isnan(row).any():
-                return np.nan
-            else:
-                return self._get_box(row)
+        from scipy.sparse import csr_matrix
 
         idx = pd.IndexSlice
+
+        # The final position of each point is given by the rows of the first "last"
+        # column (one row per dimension).
+        last = result.loc[:, idx[:, "last"]].iloc[:, 0]
+        position = pd.Series(
+            last.to_numpy(),
+            index=[
+                last.index.get_level_values(0),
+                last.groupby(level=0).cumcount().to_numpy(),
+            ],
+        ).unstack()
+
         box_start = self._points["boxid"]
-        box_finish = result.loc[:, idx[:, "last"]].groupby(level=0).apply(apply_result)
+        if isinstance(box_start.index, pd.MultiIndex):
+            box_start = box_start.groupby(level=0).first()
+        box_start = box_start.loc[position.index].to_numpy(dtype=np.int64)
+
+        # make all nan boxes (usually happens when the ped is spawned into target) a
+        # self reference
+        is_nan = position.isna().any(axis=1).to_numpy()
+        box_finish = box_start.copy()
+        box_finish[~is_nan] = self._box_index(position.to_numpy()[~is_nan])
+
+        nr_boxes = self._points["boxid"].max() + 1  # box ids start with 0
+
+        # duplicate entries are summed up by scipy, i.e. the transitions are counted
+        markov = csr_matrix(
+            (np.ones(box_start.shape[0]), (box_start, box_finish)),
+            shape=(nr_boxes, nr_boxes),
+        )
+        markov.sum_duplicates()
 
-        nr_boxes = box_start.max() + 1  # box ids start with 0
+        row_counts = np.bincount(box_start, minlength=nr_boxes)
+        row_of_entry = np.repeat(np.arange(nr_boxes), np.diff(markov.indptr))
+        markov.data /= row_counts[row_of_entry]
 
-        markov = np.zeros([nr_boxes, nr_boxes])
+        return markov
+
+    def compute_eig(self, markov, nr_eigenpairs: Optional[int] = 6):
+        """The nr_eigenpairs eigenpairs with largest magnitude of the transposed
+        transition matrix, sorted in descending order.
 
-        for i in range(nr_boxes):
-            fboxes = box_finish.loc[box_start == i]
-            vals, counts = np.unique(fboxes, return_counts=True)
+        For a sparse transition matrix (see generate_markov_matrix) the eigenpairs are
+        computed with the iterative solver scipy.sparse.linalg.eigs, which only requires
+        the non-zero entries (also for large box grids). A dense matrix is solved with
+        the dense solver. With nr_eigenpairs=None all eigenpairs are computed with the
+        dense solver (a sparse matrix is converted, which requires nr_boxes**2 values).
+        """
 
-            # make all nan boxes (usually happens when the ped is spawned into target) a self reference
-            if np.isnan(vals).any():
-                pos_nan = np.where(np.isnan(vals))
+        from scipy.sparse import issparse
+        from scipy.sparse.linalg import eigs
 
-                # length bc. np.nan != np.nan --> therefore only count=1 entries in np.unique
-                markov[i, i] = len(pos_nan[0])
-                counts = np.delete(counts, pos_nan)
-                vals = np.delete(vals, pos_nan)
+        nr_boxes = markov.shape[0]
 
-            markov[i, vals.astype(np.int)] = counts
+        if nr_eigenpairs is not None and nr_eigenpairs < 1:
+            raise ValueError(f"nr_eigenpairs={nr_eigenpairs} has to be positive.")
 
-        bool_idx = markov.sum(axis=1).astype(np.bool)
-        markov[bool_idx, :] = (
-            markov[bool_idx, :] / markov[bool_idx, :].sum(axis=1)[:, np.newaxis]
+        # eigs requires nr_eigenpairs < nr_boxes - 1
+        use_sparse = (
+            issparse(markov)
+            and nr_eigenpairs is not None
+            and nr_eigenpairs < nr_boxes - 1
         )
 
-        return markov
+        if use_sparse:
+            eigval, eigvec = eigs(markov.T, k=nr_eigenpairs, which="LM")
+        else:
+            if issparse(markov):
+                markov = markov.toarray()
+            eigval, eigvec = np.linalg.eig(markov.T)
+
+            if nr_eigenpairs is not None:
+                largest = np.argsort(-np.abs(eigval), kind="stable")[:nr_eigenpairs]
+                eigval, eigvec = eigval[largest], eigvec[:, largest]
 
-    def compute_eig(self, markov):
-        eigval, eigvec = np.linalg.eig(markov.T)
         idx = eigval.argsort()[::-1]
         eigval = eigval[idx]
         eigvec = eigvec[:, idx]
@@ -517,62 +851,51 @@ class BoxSamplingUlamMethod(ParameterVariationBase):
 
     def uniform_distribution_over_boxes_included(self, points: pd.DataFrame):
 
-        boxes_included = points.groupby(level=0, axis=0).apply(
-            lambda row: self._get_box(row.iloc[0, :])
-        )
-        boxes_included = np.unique(boxes_included)
+        # first row of each point
+        is_first = ~points.index.get_level_values(0).duplicated()
+        boxes_included = np.unique(self._box_index(points.loc[is_first].to_numpy()))
 
         all_boxes = self._points["boxid"].max() + 1
 
         initial_condition = np.zeros(all_boxes)
-        initial_condition[boxes_included.astype(np.int)] = (
-            1 / boxes_included.shape[0]
-        )  # uniform
+        initial_condition[boxes_included] = 1 / boxes_included.shape[0]  # uniform
 
         return initial_condition
 
-    def transfer_initial_condition(
-        self, markov: np.array, initial_cond: np.array, nrsteps: int
-    ):
+    def transfer_initial_condition(self, markov, initial_cond: np.array, nrsteps: int):
+
+        from scipy.sparse import issparse
 
         all_boxes = self._points["boxid"].max() + 1
 
         states = np.zeros([all_boxes, nrsteps + 1])
         states[:, 0] = initial_cond
 
+        markov_t = markov.T.tocsr() if issparse(markov) else markov.T
+
         for i in range(1, nrsteps + 1):
-            states[:, i] = markov.T @ states[:, i - 1]
+            states[:, i] = markov_t @ states[:, i - 1]
 
         return states
 
     def _get_bar_data_from_state(self, state):
         # Note: only works for 2D as only this can be plotted
 
-        all_boxes = self._points["boxid"].max() + 1
-
-        x_dir = lambda box_id: (np.mod(box_id, self._nr_boxes[0])).astype(np.int)
-        y_dir = lambda box_id: (box_id / self._nr_boxes[0]).astype(np.int)
+        box_ids = np.arange(state.shape[0])
+        idx_edges_x = np.mod(box_ids, self._nr_boxes[0])
+        idx_edges_y = box_ids // self._nr_boxes[0]
 
         df = pd.DataFrame(
-            0,
-            index=np.arange(state.shape[0]),
-            columns=["x", "y", "z", "dx", "dy", "dz"],
+            {
+                "x": self._edges[0][idx_edges_x],
+                "y": self._edges[1][idx_edges_y],
+                "z": 0,
+                "dx": self._box_width[0],
+                "dy": self._box_width[1],
+                "dz": state,
+            },
+            index=box_ids,
         )
-
-        idx_edges_x = x_dir(np.arange(all_boxes))
-        idx_edges_y = y_dir(np.arange(all_boxes))
-
-        for i in range(idx_edges_x.shape[0]):
-            df.loc[i, ["x", "y", "z"]] = [
-                self._edges[0][idx_edges_x[i]],
-                self._edges[1][idx_edges_y[i]],
-                0,
-            ]
-            df.loc[i, ["dx", "dy", "dz"]] = [
-                self._box_width[0],
-                self._box_width[1],
-                state[i],
-            ]
         return df
 
     def plot_states(self, states, cols, rows):
@@ -621,6 +944,7 @@ class BoxSamplingUlamMethod(ParameterVariationBase):
         plt.tight_layout()
         plt.show()
 
+
 class RoverSampling(metaclass=abc.ABCMeta):
     def __init__(self, parameters=None, parameters_dependent=None):
         self.parameters = parameters
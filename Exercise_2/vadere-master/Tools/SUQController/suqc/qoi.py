@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 
+import functools
 import os
 import re
 import time
 from typing import *
 
+import numpy as np
 import pandas as pd
 from suqc.environment import VadereEnvironmentManager
+from suqc.tracing import span
 from suqc.utils.dict_utils import deep_dict_lookup
 
 
@@ -54,13 +57,69 @@ class FileDataInfo(object):
 
 
 class QuantityOfInterest(object):
-    def __init__(self, requested_files: Union[List[str], str]):
+
+    # Number of schemas (column names, index and dtypes) of parsed output files that are
+    # cached per process (see _create_schema). The key contains the header lines, i.e. a
+    # schema is never out-dated.
+    SCHEMA_CACHE_SIZE = 256
+
+    # Vadere names columns "<name>-PID<processor id>". The dtype hints refer to <name>.
+    INT32_COLUMNS = [
+        "timeStep",
+        "pedestrianId",
+        "targetId",
+        "sourceId",
+        "groupId",
+        "faceId",
+        "id",
+    ]
+    FLOAT32_COLUMNS = ["x", "y", "startX", "startY", "endX", "endY"]
+
+    ALLOWED_ENGINES = ["c", "pyarrow"]
+
+    # full-line comments, which the "c" engine skips with comment="#"
+    _COMMENT_LINES = re.compile(rb"^#[^\n]*(\n|$)", flags=re.MULTILINE)
+
+    def __init__(
+        self,
+        requested_files: Union[List[str], str],
+        usecols: Union[None, List[str], Dict[str, List[str]]] = None,
+        dtype_hints: bool = False,
+        engine: str = "c",
+        reduction: Union[None, Callable, Dict[str, Callable]] = None,
+    ):
+        """
+        :param requested_files: output file name(s) of the simulator to read
+        :param usecols: columns to read (index columns are always read); either one list
+            for all files or a dict with the file name as key. A name without the Vadere
+            suffix "-PID<id>" selects the column of any processor.
+        :param dtype_hints: parse ids as int32 and coordinates as float32 (instead of
+            int64/float64)
+        :param engine: CSV parser, "c" (pandas) or the multi-threaded "pyarrow" engine
+            (requires pyarrow). Note that pyarrow converts floats with a different
+            algorithm, i.e. values may differ from the "c" engine in the last digit.
+        :param reduction: function (or dict with the file name as key) that is applied
+            to the DataFrame of each file directly after reading it. This is executed
+            inside the worker process, so that only the reduced data is transferred. The
+            function may return a DataFrame, Series or scalar value. For njobs > 1 the
+            function must be picklable (e.g. no lambda function).
+        """
 
         assert isinstance(requested_files, (list, str))
 
         if isinstance(requested_files, str):
             requested_files = [requested_files]
 
+        if engine not in self.ALLOWED_ENGINES:
+            raise ValueError(
+                f"engine={engine} not contained in allowed: {self.ALLOWED_ENGINES}"
+            )
+
+        self.usecols = usecols
+        self.dtype_hints = dtype_hints
+        self.engine = engine
+        self.reduction = reduction
+
         self.req_qois = self._requested_qoi(requested_files)
 
     def _requested_qoi(self, requested_files):
@@ -77,28 +136,180 @@ class QuantityOfInterest(object):
 
         return req_qois
 
-    def _read_csv(self, req_qoi: FileDataInfo, filepath):
-
-        # make sure that Vadere writes
-        with open(filepath) as f:
-            first_line = f.readline()
+    def _selected_usecols(self, filename):
+        if isinstance(self.usecols, dict):
+            return self.usecols.get(filename, None)
+        return self.usecols
+
+    @staticmethod
+    def _column_basename(column):
+        return column.split("-PID")[0]
+
+    def _get_schema(self, req_qoi: FileDataInfo, meta_line, header_line):
+        usecols = self._selected_usecols(req_qoi.filename)
+        return self._create_schema(
+            req_qoi.filename,
+            req_qoi.nr_row_indices,
+            meta_line,
+            header_line,
+            None if usecols is None else tuple(usecols),
+            self.dtype_hints,
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+    def _create_schema(
+        filename, default_nr_row_indices, meta_line, header_line, usecols, dtype_hints
+    ):
 
         try:
             # Tries to use the meta-data line, extract the number of rows
-            nr_row_indices = re.search(r"ROW=(\d+)", first_line).group(1)
+            nr_row_indices = re.search(r"ROW=(\d+)", meta_line).group(1)
             nr_row_indices = int(nr_row_indices)
-        except AttributeError or ValueError:  # AttributeError -> regex failed | ValueError -> converting to int failed
+        except (AttributeError, ValueError):
+            # AttributeError -> regex failed | ValueError -> converting to int failed
             # Fallback mode, infer index from the hard-coded list.
-            nr_row_indices = req_qoi.nr_row_indices
+            nr_row_indices = default_nr_row_indices
 
-        df = pd.read_csv(filepath, delimiter=" ", header=[0], comment="#")
+        columns = header_line.rstrip("\r\n").split(" ")
 
-        if req_qoi.nr_row_indices != 0:
-            idx_keys = df.columns[:nr_row_indices]
-            return df.set_index(idx_keys.tolist())
+        # NOTE: the fallback value decides whether an index is set at all
+        if default_nr_row_indices != 0:
+            index_columns = columns[:nr_row_indices]
+        else:
+            index_columns = []
+
+        if usecols is None:
+            selected = None
+        else:
+            selected = [
+                c
+                for c in columns
+                if c in index_columns
+                or c in usecols
+                or QuantityOfInterest._column_basename(c) in usecols
+            ]
+
+            basenames = [QuantityOfInterest._column_basename(c) for c in columns]
+            matched = [u for u in usecols if u in columns or u in basenames]
+            if len(matched) != len(usecols):
+                raise ValueError(
+                    f"Columns {set(usecols) - set(matched)} are not contained in file "
+                    f"{filename}. Available columns: {columns}"
+                )
+
+        if dtype_hints:
+            dtype = dict()
+            for c in columns if selected is None else selected:
+                basename = QuantityOfInterest._column_basename(c)
+                if basename in QuantityOfInterest.INT32_COLUMNS:
+                    dtype[c] = np.int32
+                elif basename in QuantityOfInterest.FLOAT32_COLUMNS:
+                    dtype[c] = np.float32
+        else:
+            dtype = None
+
+        return {
+            "columns": columns,
+            "usecols": selected,
+            "index_columns": index_columns,
+            "dtype": dtype,
+        }
+
+    def _parse_csv(self, f, schema, dtype):
+
+        if self.engine == "pyarrow":
+            # pyarrow is used directly (and not via pandas' engine="pyarrow"), because the
+            # options of the pandas wrapper differ between the pandas versions
+            # optional dependency
+            from pyarrow import BufferReader, csv, from_numpy_dtype
+
+            # pyarrow has no option to skip comments
+            data = f.read()
+            if b"#" in data:
+                data = self._COMMENT_LINES.sub(b"", data)
+
+            table = csv.read_csv(
+                BufferReader(data),
+                read_options=csv.ReadOptions(column_names=schema["columns"]),
+                parse_options=csv.ParseOptions(delimiter=" "),
+                convert_options=csv.ConvertOptions(
+                    include_columns=schema["usecols"],
+                    column_types=None
+                    if dtype is None
+                    else {k: from_numpy_dtype(v) for k, v in dtype.items()},
+                ),
+            )
+            return table.to_pandas()
+        else:
+            return pd.read_csv(
+                f,
+                delimiter=" ",
+                header=None,
+                names=schema["columns"],
+                usecols=schema["usecols"],
+                dtype=dtype,
+                comment="#",
+                engine="c",
+            )
+
+    def _read_csv(self, req_qoi: FileDataInfo, filepath):
+
+        # The file is only opened once: the leading comment lines (e.g. the meta-data
+        # line) and the header are read first and the remaining data is parsed from the
+        # same file handle.
+        with open(filepath, "rb") as f:
+            comment_lines = list()
+            line = f.readline()
+            while line.startswith(b"#"):
+                comment_lines.append(line.decode())
+                line = f.readline()
+
+            header_line = line.decode()
+            meta_line = "".join(comment_lines)
+            nr_skip_lines = len(comment_lines) + 1
+
+            schema = self._get_schema(req_qoi, meta_line, header_line)
+
+            try:
+                df = self._parse_csv(f, schema, dtype=schema["dtype"])
+            except ValueError:
+                if schema["dtype"] is None:
+                    raise
+                # The dtype hints do not fit the data (e.g. missing values in an id
+                # column) -> parse with inferred dtypes
+                f.seek(0)
+                for _ in range(nr_skip_lines):
+                    f.readline()
+                df = self._parse_csv(f, schema, dtype=None)
+
+        if schema["index_columns"]:
+            return df.set_index(schema["index_columns"])
         else:
             return df
 
+    def _apply_reduction(self, filename, df, par_id, run_id):
+
+        if isinstance(self.reduction, dict):
+            reduce_func = self.reduction.get(filename, None)
+        else:
+            reduce_func = self.reduction
+
+        if reduce_func is None:
+            return self._add_parid2idx(df, par_id, run_id)
+
+        reduced = reduce_func(df)
+
+        if isinstance(reduced, pd.DataFrame):
+            return self._add_parid2idx(reduced, par_id, run_id)
+
+        index = pd.MultiIndex.from_tuples([(par_id, run_id)], names=["id", "run_id"])
+
+        if isinstance(reduced, pd.Series):
+            return pd.DataFrame([reduced.values], index=index, columns=reduced.index)
+        else:  # scalar value, the file name is used as column name
+            return pd.DataFrame({filename: [reduced]}, index=index)
+
     def _add_parid2idx(self, df, par_id, run_id):
         # from https://stackoverflow.com/questions/14744068/prepend-a-level-to-a-pandas-multiindex
 
@@ -116,16 +327,22 @@ class QuantityOfInterest(object):
 
         for k in self.req_qois:
             filepath = os.path.join(output_path, k.filename)
-            df_data = self._read_csv(k, filepath)
-            read_data[k.filename] = self._add_parid2idx(
-                df_data, par_id, run_id
-            )  # filename is identifier for QoI
+            with span("read_qoi", filename=k.filename):
+                df_data = self._read_csv(k, filepath)
+                read_data[k.filename] = self._apply_reduction(
+                    k.filename, df_data, par_id, run_id
+                )  # filename is identifier for QoI
 
         return read_data
 
 
 class VadereQuantityOfInterest(QuantityOfInterest):
-    def __init__(self, basis_scenario: dict, requested_files: Union[List[str], str]):
+    def __init__(
+        self,
+        basis_scenario: dict,
+        requested_files: Union[List[str], str],
+        **read_options,
+    ):
 
         assert isinstance(requested_files, (list, str))
 
@@ -136,7 +353,8 @@ class VadereQuantityOfInterest(QuantityOfInterest):
         self.process_files = user_set_writers["files"]
         self.processsors = user_set_writers["processors"]
 
-        super().__init__(requested_files)
+        # read_options: see QuantityOfInterest
+        super().__init__(requested_files, **read_options)
 
     def get_process_files(self):
         return self.process_files
@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 
 import abc
+import hashlib
+import io
 import os
 import pickle
+import shlex
+import shutil
+import subprocess
+import tarfile
+import time
 import zipfile
 
 import numpy as np
@@ -101,10 +108,173 @@ class ServerConnection(object):
         return r.stdout.rstrip()  # rstrip -> remove trailing whitespaces and new lines
 
 
+class IncrementalOutputTransfer(object):
+    """Pulls the output of a remote environment in increments while the remote sweep
+    is still running.
+
+    Each call of `sync` transfers the files of run folders that finished since the last
+    call (folders with a completion marker, see Request.COMPLETION_MARKER), or all files
+    of the environment. Files that already exist locally with the same content (sha256)
+    are not transferred again, e.g. when a failed transfer is repeated. The files are
+    packed with tar and the fastest compressor available on both machines (zstd, pigz
+    or gzip).
+    """
+
+    COMPRESSORS = ["zstd", "pigz", "gzip"]
+
+    # same files as excluded by ServerRequest.recursive_zipping
+    EXCLUDE_FILE_ENDINGS = ["p", "jar", "zip"]
+
+    ARCHIVE_NAME = "suqc_increment.tar"
+
+    def __init__(self, connection, remote_path, local_path, completion_marker=None):
+        self.connection = connection
+        self.remote_path = remote_path.rstrip("/")
+        self.local_path = local_path
+        self.completion_marker = completion_marker
+
+        self.compressor = None
+
+        # relative paths of files (and their hash) that are identical locally
+        self._synced_files = dict()
+        self._synced_folders = set()
+
+    def _run(self, cmd):
+        return self.connection.run(
+            f"cd {shlex.quote(self.remote_path)} && {cmd}", hide=True
+        ).stdout
+
+    def _select_compressor(self):
+        if self.compressor is None:
+            for compressor in self.COMPRESSORS:
+                available_locally = compressor != "zstd" or shutil.which("zstd")
+                found = self.connection.run(
+                    f"command -v {compressor}", hide=True, warn=True
+                ).ok
+                if found and available_locally:
+                    self.compressor = compressor
+                    break
+        return self.compressor
+
+    def _completed_run_folders(self):
+        if self.completion_marker is None:
+            return list()
+
+        stdout = self._run(
+            f"find . -name {shlex.quote(self.completion_marker)} -printf '%h\\n'"
+        )
+        return [f for f in stdout.splitlines() if f and f not in self._synced_folders]
+
+    def _remote_hashes(self, folders):
+        excluded = " ".join(f"! -name '*.{e}'" for e in self.EXCLUDE_FILE_ENDINGS)
+        targets = " ".join(shlex.quote(f) for f in folders)
+
+        stdout = self._run(
+            f"find {targets} -type f {excluded} ! -name '{self.ARCHIVE_NAME}*' "
+            f"-print0 | xargs -0 -r sha256sum"
+        )
+
+        hashes = dict()
+        for line in stdout.splitlines():
+            file_hash, relpath = line.split(maxsplit=1)
+            hashes[os.path.normpath(relpath.lstrip("*"))] = file_hash
+        return hashes
+
+    def _local_hash(self, relpath):
+        filepath = os.path.join(self.local_path, relpath)
+
+        if not os.path.isfile(filepath):
+            return None
+
+        sha256 = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def _pack_and_pull(self, relpaths):
+        compressor = self._select_compressor()
+        archive = f"{self.ARCHIVE_NAME}.{compressor}"
+        filelist = f"{self.ARCHIVE_NAME}.files"
+
+        self.connection.put(
+            io.BytesIO("\n".join(relpaths).encode()),
+            "/".join([self.remote_path, filelist]),
+        )
+
+        if compressor == "zstd":
+            compress = "zstd -T0 -q -c"
+        elif compressor == "pigz":
+            compress = "pigz -c"
+        else:
+            compress = "gzip -c"
+
+        self._run(f"tar -cf - -T {filelist} | {compress} > {archive} && rm {filelist}")
+
+        local_archive = os.path.join(self.local_path, archive)
+        self.connection.get("/".join([self.remote_path, archive]), local_archive)
+        self._run(f"rm {archive}")
+
+        if compressor == "zstd":
+            process = subprocess.Popen(
+                ["zstd", "-d", "-c", local_archive], stdout=subprocess.PIPE
+            )
+            with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                tar.extractall(path=self.local_path)
+            process.wait()
+        else:  # gzip format
+            with tarfile.open(local_archive, mode="r:gz") as tar:
+                tar.extractall(path=self.local_path)
+
+        os.remove(local_archive)
+
+    def sync(self, completed_only=True) -> int:
+        """Transfers new or changed files. If completed_only is True, only the files in
+        run folders with completion marker are considered, otherwise all files of the
+        remote environment. Returns the number of transferred files."""
+
+        if completed_only:
+            folders = self._completed_run_folders()
+            if len(folders) == 0:
+                return 0
+        else:
+            folders = ["."]
+
+        remote_hashes = self._remote_hashes(folders)
+
+        required = list()
+        for relpath, file_hash in remote_hashes.items():
+            if self._synced_files.get(relpath) == file_hash:
+                continue
+            elif self._local_hash(relpath) == file_hash:
+                self._synced_files[relpath] = file_hash
+            else:
+                required.append(relpath)
+
+        if len(required) > 0:
+            os.makedirs(self.local_path, exist_ok=True)
+            self._pack_and_pull(required)
+
+            for relpath in required:
+                self._synced_files[relpath] = remote_hashes[relpath]
+
+        if completed_only:
+            self._synced_folders.update(folders)
+
+        return len(required)
+
+
 class ServerRequest(object):
 
     zip_filename = "output.zip"
 
+    # "zip": the output is compressed and transferred after the remote run finished
+    # "incremental": see IncrementalOutputTransfer
+    TRANSFER_MODES = ["zip", "incremental"]
+
+    # time between two polls for finished runs in the incremental transfer mode
+    TRANSFER_POLL_INTERVAL_SEC = 10
+
     def __init__(self):
         self.server = None
         self.remote_env_name = None
@@ -264,6 +434,17 @@ class ServerRequest(object):
         )
         zipobj.close()
 
+    def _run_with_incremental_transfer(self, cmd, output_transfer):
+        # The output of finished runs is transferred while the remote sweep continues
+        promise = self.server.connection.run(cmd, asynchronous=True)
+
+        while not promise.runner.process_is_finished:
+            nr_files = output_transfer.sync(completed_only=True)
+            if nr_files == 0:
+                time.sleep(self.TRANSFER_POLL_INTERVAL_SEC)
+
+        promise.join()
+
     @classmethod
     @abc.abstractmethod
     def _remote_run(cls, remote_pickle_arg_path):
@@ -295,8 +476,15 @@ class ServerRequest(object):
         local_model_obj,
         class_name,
         transfer_output,
+        transfer_mode="zip",
     ):
 
+        if transfer_mode not in self.TRANSFER_MODES:
+            raise ValueError(
+                f"transfer_mode={transfer_mode} not contained in allowed: "
+                f"{self.TRANSFER_MODES}"
+            )
+
         self._default_remote_environment_setter()
 
         with ServerConnection(self.remote_folder_path) as sc:
@@ -327,7 +515,18 @@ class ServerRequest(object):
             self._transfer_pickle_local2remote(local_pickle_content)
 
             s = f"""python3 -c 'import suqc; suqc.{class_name}._remote_run("{remote_pickle_arg_path}")'"""
-            self.server.connection.run(s)
+
+            if transfer_output and transfer_mode == "incremental":
+                output_transfer = IncrementalOutputTransfer(
+                    self.server.connection,
+                    remote_path=self.remote_folder_path,
+                    local_path=local_env_man.env_path,
+                    completion_marker=getattr(self, "COMPLETION_MARKER", None),
+                )
+                self._run_with_incremental_transfer(s, output_transfer)
+            else:
+                output_transfer = None
+                self.server.connection.run(s)
 
             # transfer_result
             local_pickle_path = self._default_result_pickle_path_local(
@@ -342,7 +541,10 @@ class ServerRequest(object):
                 self._default_result_pickle_path_local(local_env_man.env_path),
             )
 
-            if transfer_output:
+            if output_transfer is not None:
+                # remaining files (e.g. failed runs and files written after the runs)
+                output_transfer.sync(completed_only=False)
+            elif transfer_output:
                 zipped_file_local = self._transfer_compressed_output_remote2local(
                     local_env_man.env_path
                 )
@@ -3,9 +3,14 @@
 import json
 import multiprocessing
 import os
+import pickle
 import shutil
+import tempfile
+import time
 import glob
 
+from suqc import tracing
+from suqc.cache import SimulationCache
 from suqc.opp.config_parser import OppConfigType
 from suqc.environment import (
     AbstractConsoleWrapper,
@@ -14,66 +19,286 @@ from suqc.environment import (
     VadereConsoleWrapper,
     AbstractEnvironmentManager,
 )
+from suqc.executor import ExecutorBase, RetryPolicy
+from suqc.journal import ResultJournal
 from suqc.parameter.create import CoupledScenarioCreation, VadereScenarioCreation
 from suqc.parameter.postchanges import PostScenarioChangesBase
 from suqc.parameter.sampling import *
 from suqc.qoi import VadereQuantityOfInterest, QuantityOfInterest
 from suqc.remote import ServerRequest
 from suqc.utils.general import create_folder, njobs_check_and_set, parent_folder_clean
+from suqc.utils.scenario_template import OVERLAY_SUFFIX, materialize_scenario
+from suqc.utils.shared_frames import concat_frames, share_frames, start_resource_tracker
+
+# Cache of read_from_existing_output in the environment folder (per QoI file name): the
+# data of all files in a few consolidated segments and a manifest with the rows of each
+# file. A cache of another format version is rebuilt.
+EXISTING_OUTPUT_CACHE = ".suqc_existing_{}"
+EXISTING_OUTPUT_CACHE_VERSION = 3
+EXISTING_OUTPUT_MANIFEST = "manifest.p"
+
+# New files are appended as a segment, all segments are consolidated into one if there
+# are more segments or if files were changed or removed.
+EXISTING_OUTPUT_MAX_SEGMENTS = 8
+
+
+def _scan_files(path, filename):
+    """Recursive search (os.scandir) for files with the name filename. Returns sorted
+    tuples (filepath, mtime_ns, size)."""
+
+    found = list()
+    folders = [path]
+
+    while len(folders) > 0:
+        with os.scandir(folders.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.path)
+                elif entry.name == filename and entry.is_file():
+                    stat = entry.stat()
+                    found.append((entry.path, stat.st_mtime_ns, stat.st_size))
+
+    return sorted(found)
+
+
+def _read_existing_file(args):
+    filepath, extract_ids, parentfolder_level = args
+
+    # default vals: vadere (1), rover/omnet (5)
+    filepath0 = filepath
+    for level_up in range(parentfolder_level):
+        filepath0 = os.path.dirname(filepath0)
+
+    parentfolder = os.path.basename(filepath0)
+
+    # TODO: it'd be better to use QuantityOfInterest.read_and_extract_qois
+    #  here, as this is the "central unit" to read files of interest
+    df_data = pd.read_csv(filepath, delimiter=" ", header=[0], comment="#")
+
+    if extract_ids:
+        run_data = [int(i) for i in parentfolder.split("_") if i.isdigit()]
+
+        if len(run_data) == 2:
+            parameter_id, run_id = run_data
+        else:
+            raise ValueError("Failed to extract parameter- and run id.")
+
+        df_data.index = pd.MultiIndex.from_arrays(
+            [
+                np.full(df_data.shape[0], parameter_id, dtype=np.int64),
+                np.full(df_data.shape[0], run_id, dtype=np.int64),
+            ]
+        )
+
+    return df_data
+
+
+def _load_existing_output_cache(cache_path, settings):
+    """Returns the manifest and the segments of the cache or None if there is no valid
+    cache (e.g. other settings or another format version)."""
+
+    manifest_path = os.path.join(cache_path, EXISTING_OUTPUT_MANIFEST)
+    if not os.path.isfile(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, "rb") as f:
+            manifest = pickle.load(f)
+
+        if (
+            not isinstance(manifest, dict)
+            or manifest.get("version") != EXISTING_OUTPUT_CACHE_VERSION
+            or manifest.get("settings") != settings
+        ):
+            return None
+
+        segments = list()
+        for name in manifest["segments"]:
+            with open(os.path.join(cache_path, name), "rb") as f:
+                segments.append(pickle.load(f))
+    except Exception as e:
+        print(f"WARNING: Could not read cache {cache_path} ({e!r}), it is rebuilt.")
+        return None
+
+    return manifest, segments
+
+
+def _write_pickle(filepath, obj):
+    # atomic, a reader never sees a partially written file
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, filepath)
+
+
+def _write_existing_output_cache(cache_path, manifest, new_segment):
+    """Writes the new segment (if not None) and then the manifest. Segments that are
+    not contained in the manifest are removed afterwards."""
+
+    try:
+        os.makedirs(cache_path, exist_ok=True)
+        if new_segment is not None:
+            _write_pickle(
+                os.path.join(cache_path, manifest["segments"][-1]), new_segment
+            )
+        _write_pickle(os.path.join(cache_path, EXISTING_OUTPUT_MANIFEST), manifest)
+
+        for name in os.listdir(cache_path):
+            if name != EXISTING_OUTPUT_MANIFEST and name not in manifest["segments"]:
+                os.remove(os.path.join(cache_path, name))
+    except OSError as e:
+        print(f"WARNING: Could not write cache {cache_path} ({e!r}).")
+
+
+def _new_segment_name(segments):
+    numbers = [int(name.split("_")[1].split(".")[0]) for name in segments]
+    return f"segment_{max(numbers, default=-1) + 1}.p"
 
 
 def read_from_existing_output(
-    env_path, qoi_filename, extract_ids=True, parentfolder_level=1
+    env_path,
+    qoi_filename,
+    extract_ids=True,
+    parentfolder_level=1,
+    njobs=1,
+    use_cache=True,
 ):
+    """Reads the files qoi_filename of all runs in env_path (in parallel if njobs > 1).
+
+    If use_cache is True, the data of all files is stored in a cache folder in env_path:
+    a few consolidated data frames (segments) and a manifest with the modification
+    time, size and rows of each file. Later calls load the segments and only parse the
+    files that were added or changed since then. Added files are stored in a new
+    segment, the segments are consolidated if files changed or were removed.
+    """
+
+    settings = {"extract_ids": extract_ids, "parentfolder_level": parentfolder_level}
+    cache_path = os.path.join(env_path, EXISTING_OUTPUT_CACHE.format(qoi_filename))
+
+    files = _scan_files(env_path, qoi_filename)
+
+    if len(files) == 0:
+        raise ValueError(f"No file {qoi_filename} found in {env_path}.")
+
+    relpaths = [os.path.relpath(filepath, env_path) for filepath, _, _ in files]
+
+    cache = _load_existing_output_cache(cache_path, settings) if use_cache else None
+    if cache is not None:
+        manifest, segments = cache
+    else:
+        manifest, segments = {"segments": list(), "files": dict()}, list()
+
+    # file index -> (segment, start, stop) of the rows in the cached data
+    cached_rows = dict()
+    new_files = list()
+    for i, (relpath, (_, mtime_ns, size)) in enumerate(zip(relpaths, files)):
+        entry = manifest["files"].get(relpath)
+        if entry is not None and entry[:2] == (mtime_ns, size):
+            cached_rows[i] = entry[2:]
+        else:
+            new_files.append(i)
 
-    read_data = []
+    args = [(files[i][0], extract_ids, parentfolder_level) for i in new_files]
 
-    id_counter = 0
+    if len(args) > 1:
+        njobs = njobs_check_and_set(njobs=njobs, ntasks=len(args))
 
-    for root, dirs, files in os.walk(env_path):
-        for file in files:
-            if file == qoi_filename:
+    if len(args) <= 1 or njobs == 1:
+        new_data = list(map(_read_existing_file, args))
+    else:
+        with multiprocessing.Pool(processes=njobs) as pool:
+            new_data = pool.map(
+                _read_existing_file, args, chunksize=max(1, len(args) // (4 * njobs))
+            )
 
-                filepath = os.path.join(root, file)
-                # default vals: vadere (1), rover/omnet (5)
-                filepath0 = filepath
-                for level_up in range(parentfolder_level):
-                    filepath0 = os.path.dirname(filepath0)
+    new_data = dict(zip(new_files, new_data))
 
-                parentfolder = os.path.basename(filepath0)
+    # Collect the data in the order of the files. Consecutive cached rows of a segment
+    # are taken as one slice [segment, start, stop].
+    read_data = list()
+    nr_rows = np.zeros(len(files), dtype=np.int64)
+    cached_slice = None
 
-                # TODO: it'd be better to use QuantityOfInterest.read_and_extract_qois
-                #  here, as this is the "central unit" to read files of interest
-                df_data = pd.read_csv(filepath, delimiter=" ", header=[0], comment="#")
+    def take(rows):
+        segment, start, stop = rows
+        return segments[segment].iloc[start:stop]
 
-                if extract_ids:
-                    run_data = [int(i) for i in parentfolder.split("_") if i.isdigit()]
+    for i in range(len(files)):
+        if i in cached_rows:
+            segment, start, stop = cached_rows[i]
+            nr_rows[i] = stop - start
 
-                    if (
-                        all(isinstance(item, int) == True for item in run_data)
-                        and len(run_data) == 2
-                    ):
-                        parameter_id, run_id = run_data
-                    else:
-                        raise ValueError("Failed to extract parameter- and run id.")
+            if cached_slice is not None and cached_slice[0::2] == [segment, start]:
+                cached_slice[2] = stop
+                continue
 
-                    index = pd.MultiIndex.from_arrays(
-                        [
-                            np.ones(df_data.shape[0], dtype=np.int64) * parameter_id,
-                            np.ones(df_data.shape[0], dtype=np.int64) * run_id,
-                        ]
-                    )
-                else:
-                    index = pd.Index(
-                        np.ones(df_data.shape[0], dtype=np.int64) * id_counter
+            if cached_slice is not None:
+                read_data.append(take(cached_slice))
+            cached_slice = [segment, start, stop]
+        else:
+            if cached_slice is not None:
+                read_data.append(take(cached_slice))
+                cached_slice = None
+            read_data.append(new_data[i])
+            nr_rows[i] = new_data[i].shape[0]
+
+    if cached_slice is not None:
+        read_data.append(take(cached_slice))
+
+    if use_cache:
+        new_segment = None
+        is_appended = (
+            len(cached_rows) == len(manifest["files"])
+            and len(manifest["segments"]) < EXISTING_OUTPUT_MAX_SEGMENTS
+        )
+
+        if len(new_files) == 0 and len(cached_rows) == len(manifest["files"]):
+            manifest = None  # unchanged
+        elif is_appended:
+            # only new files: their data is stored in an additional segment
+            segment = len(manifest["segments"])
+            new_segment = pd.concat([new_data[i] for i in new_files], axis=0)
+            stops = np.cumsum([new_data[i].shape[0] for i in new_files])
+
+            manifest["segments"].append(_new_segment_name(manifest["segments"]))
+            for i, stop in zip(new_files, stops):
+                manifest["files"][relpaths[i]] = (
+                    files[i][1],
+                    files[i][2],
+                    segment,
+                    int(stop - nr_rows[i]),
+                    int(stop),
+                )
+        else:
+            # consolidate all data into a single segment
+            new_segment = pd.concat(read_data, axis=0)
+            stops = np.cumsum(nr_rows)
+            manifest = {
+                "segments": [_new_segment_name(manifest["segments"])],
+                "files": {
+                    relpath: (mtime_ns, size, 0, int(stop - rows), int(stop))
+                    for relpath, (_, mtime_ns, size), rows, stop in zip(
+                        relpaths, files, nr_rows, stops
                     )
-                    id_counter += 1
+                },
+            }
+
+        if manifest is not None:
+            manifest.update(version=EXISTING_OUTPUT_CACHE_VERSION, settings=settings)
+            _write_existing_output_cache(cache_path, manifest, new_segment)
 
-                df_data.index = index
-                read_data.append(df_data)
+        if os.path.isfile(f"{cache_path}.p"):
+            # single cache file of a previous format version
+            os.remove(f"{cache_path}.p")
 
     read_data = pd.concat(read_data, axis=0)
 
+    if not extract_ids:
+        # one id per file
+        read_data.index = pd.Index(
+            np.repeat(np.arange(len(files), dtype=np.int64), nr_rows)
+        )
+
     meta_data = pd.read_csv(
         os.path.join(env_path, "metainfo.csv"), header=[0]
     ).set_index(["id", "run_id"])
@@ -82,15 +307,37 @@ def read_from_existing_output(
 
 
 class RequestItem(object):
-    def __init__(self, parameter_id, run_id, scenario_path, base_path, output_folder):
+    def __init__(
+        self,
+        parameter_id,
+        run_id,
+        scenario_path,
+        base_path,
+        output_folder,
+        parameter_variation=None,
+        variation_hash=None,
+    ):
         self.parameter_id = parameter_id
         self.run_id = run_id
         self.base_path = base_path
         self.output_folder = output_folder
         self.scenario_path = scenario_path
 
+        # Only set for lazy scenario creation: the scenario file at scenario_path is
+        # created from the parameter variation right before the run.
+        self.parameter_variation = parameter_variation
+
+        # Hash of the basis scenario and the parameter variation (see
+        # AbstractScenarioCreation), stored in the completion marker of the run. Resumed
+        # runs are only reused if the hash is unchanged.
+        self.variation_hash = variation_hash
+
         self.output_path = os.path.join(self.base_path, self.output_folder)
 
+        # spans of the run (and the scenario creation) if tracing is enabled, see
+        # suqc.tracing
+        self.trace_events = list()
+
     def add_qoi_result(self, qoi_result):
         self.qoi_result = qoi_result
 
@@ -104,20 +351,51 @@ class Request(object):
     PARAMETER_ID = "id"
     RUN_ID = "run_id"
 
+    # Written into the output folder of a run after the run (and parsing the QoI) finished
+    # successfully. Contains the variation hash of the run (see RequestItem).
+    COMPLETION_MARKER = "suqc_completed.json"
+
+    # Set for lazy scenario creation (see VariationBase), writes the scenario files of
+    # request items with a parameter_variation right before the run
+    lazy_scenario_creation = None
+    retain_scenarios = True
+
     def __init__(
         self,
         request_item_list: List[RequestItem],
         model: Union[str, AbstractConsoleWrapper],
         qoi: Union[VadereQuantityOfInterest, None],
+        cache: Optional[SimulationCache] = None,
+        resume: bool = False,
+        scratch_path: Optional[str] = None,
+        retain_output: Optional[List[str]] = None,
     ):
 
         if len(request_item_list) == 0:
             raise ValueError("request_item_list has no entries.")
 
+        if scratch_path is not None and not os.path.isdir(scratch_path):
+            raise ValueError(f"scratch_path {scratch_path} is not an existing folder.")
+
         self.model = AbstractConsoleWrapper.infer_model(model)
         self.request_item_list = request_item_list
         # Can be None, if this is the case, no output data will be parsed to pd.DataFrame
         self.qoi = qoi
+        # Can be None, if set then runs with identical scenarios are read from the cache
+        self.cache = cache
+        # If True, runs with a completion marker (of the same variation hash) and valid
+        # output are not carried out again
+        self.resume = resume
+        # Can be None, if set then failed runs are repeated (see run)
+        self.retry_policy = None
+        # If True, the workers return the QoI data in shared memory blocks (see run)
+        self.shared_memory = False
+        # Can be None, if set then the simulations write their output to a new folder in
+        # scratch_path (e.g. a local tmpfs) and only the files that match the glob
+        # patterns in retain_output (default: the requested QoI files) are moved to the
+        # output folder of the run
+        self.scratch_path = scratch_path
+        self.retain_output = retain_output
 
         # Return values as pd.DataFrame from all runs (they cannot be included directly by the runs,
         # because Python's mulitprocessing is not shared memory due to the GIL (i.e. different/independent processes
@@ -132,13 +410,185 @@ class Request(object):
             print(f"WARNING: Simulation with parameter setting {par_id} failed.")
             return False
 
+    def _cache_key(self, request_item: RequestItem):
+        # Only the output of requested QoI files is cached, and the .jar is part of the key
+        if (
+            self.cache is None
+            or self.qoi is None
+            or not isinstance(self.model, VadereConsoleWrapper)
+        ):
+            return None
+
+        return self.cache.create_key(
+            scenario=request_item.scenario_path,
+            jar_path=self.model.jar_path,
+            requested_files=self._requested_filenames(),
+        )
+
+    def _requested_filenames(self):
+        return [k.filename for k in self.qoi.req_qois]
+
+    def _write_completion_marker(self, request_item: RequestItem):
+        marker = os.path.join(request_item.output_path, self.COMPLETION_MARKER)
+        with open(marker, "w") as f:
+            json.dump(
+                {
+                    "required_time": request_item.required_time,
+                    "return_code": request_item.return_code,
+                    "variation_hash": request_item.variation_hash,
+                },
+                f,
+            )
+
+    @classmethod
+    def _read_completion_marker(cls, request_item: RequestItem) -> Optional[dict]:
+        marker = os.path.join(request_item.output_path, cls.COMPLETION_MARKER)
+
+        if not os.path.isfile(marker):
+            return None
+
+        try:
+            with open(marker, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def is_completed(cls, request_item: RequestItem) -> bool:
+        """True if the run finished with the scenario of the request item (same
+        variation hash)."""
+        info = cls._read_completion_marker(request_item)
+        return info is not None and (
+            info.get("variation_hash") == request_item.variation_hash
+        )
+
+    def _read_completed_request(self, request_item: RequestItem) -> bool:
+        """Reads the results of a run that already finished in a previous (interrupted)
+        sweep. Returns False if the run has to be carried out (again)."""
+
+        info = self._read_completion_marker(request_item)
+
+        if info is None:
+            return False
+
+        if info.get("variation_hash") != request_item.variation_hash:
+            print(
+                f"WARNING: The output of run (parameter id {request_item.parameter_id}, "
+                f"run id {request_item.run_id}) was created with a different basis "
+                f"scenario or parameter variation. The run is carried out again."
+            )
+            return False
+
+        try:
+            if self.qoi is not None:
+                result = self.qoi.read_and_extract_qois(
+                    par_id=request_item.parameter_id,
+                    run_id=request_item.run_id,
+                    output_path=request_item.output_path,
+                )
+            else:
+                result = None
+        except (OSError, ValueError, KeyError):
+            # missing or corrupted files (pandas parser errors are ValueErrors)
+            return False
+
+        request_item.add_qoi_result(result)
+        request_item.add_meta_info(
+            required_time=info["required_time"], return_code=info["return_code"]
+        )
+        return True
+
     def _single_request(self, request_item: RequestItem) -> RequestItem:
 
-        self._create_output_path(request_item.output_path)
+        if self.scratch_path is None:
+            return self._run_request(request_item, request_item.output_path)
 
-        return_code, required_time, output_on_error = self.model.run_simulation(
-            request_item.scenario_path, request_item.output_path
+        run_output_path = tempfile.mkdtemp(
+            prefix=f"{os.path.basename(request_item.output_folder)}_",
+            dir=self.scratch_path,
         )
+        try:
+            return self._run_request(request_item, run_output_path)
+        finally:
+            shutil.rmtree(run_output_path, ignore_errors=True)
+
+    def _retained_patterns(self):
+        if self.retain_output is not None:
+            return self.retain_output
+        elif self.qoi is not None:
+            return self._requested_filenames()
+        else:
+            return ["**"]
+
+    def _retain_output(self, run_output_path, output_path):
+        """Moves the files of a run that match the retain_output patterns from the scratch
+        folder to the output folder."""
+
+        retained = set()
+        for pattern in self._retained_patterns():
+            for filepath in glob.glob(
+                os.path.join(run_output_path, pattern), recursive=True
+            ):
+                if os.path.isfile(filepath):
+                    retained.add(os.path.relpath(filepath, run_output_path))
+
+        for relpath in sorted(retained):
+            target = os.path.join(output_path, relpath)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(os.path.join(run_output_path, relpath), target)
+
+    def _run_request(self, request_item: RequestItem, run_output_path: str):
+        # the simulation writes to run_output_path (a scratch folder or the output path)
+
+        if self.resume and self._read_completed_request(request_item):
+            return request_item
+
+        self._create_output_path(request_item.output_path)
+
+        is_created, is_materialized = False, False
+
+        # The scenario files written for the run are also removed if the run raises an
+        # exception, a remaining file would otherwise be taken for a complete scenario.
+        try:
+            if request_item.parameter_variation is not None:
+                # lazy scenario creation
+                is_created = self.lazy_scenario_creation.create_lazy_scenario(
+                    request_item
+                )
+
+            # scenario files stored as overlay are written right before the run
+            is_materialized = materialize_scenario(request_item.scenario_path)
+
+            cache_key = self._cache_key(request_item)
+
+            if cache_key is not None:
+                with tracing.span("cache_restore"):
+                    cache_info = self.cache.restore(cache_key, run_output_path)
+            else:
+                cache_info = None
+
+            if cache_info is not None:
+                # cache hit -> no need to run the simulation again
+                return_code, required_time, output_on_error = (
+                    0,
+                    cache_info["required_time"],
+                    None,
+                )
+            else:
+                with tracing.span("simulation"):
+                    (
+                        return_code,
+                        required_time,
+                        output_on_error,
+                    ) = self.model.run_simulation(
+                        request_item.scenario_path, run_output_path
+                    )
+        finally:
+            if is_materialized and os.path.exists(request_item.scenario_path):
+                os.remove(request_item.scenario_path)
+
+            if is_created and not self.retain_scenarios:
+                self._remove_scenario_files(request_item.scenario_path)
 
         is_results = self._interpret_return_value(
             return_code, request_item.parameter_id
@@ -148,8 +598,17 @@ class Request(object):
             result = self.qoi.read_and_extract_qois(
                 par_id=request_item.parameter_id,
                 run_id=request_item.run_id,
-                output_path=request_item.output_path,
+                output_path=run_output_path,
             )
+
+            if cache_key is not None and cache_info is None:
+                with tracing.span("cache_store"):
+                    self.cache.store(
+                        cache_key,
+                        output_path=run_output_path,
+                        requested_files=self._requested_filenames(),
+                        required_time=required_time,
+                    )
         elif not is_results and self.qoi is not None:
             # something went wrong during simulation run
             assert output_on_error is not None
@@ -172,10 +631,68 @@ class Request(object):
         request_item.add_qoi_result(result)
         request_item.add_meta_info(required_time=required_time, return_code=return_code)
 
+        if run_output_path != request_item.output_path:
+            with tracing.span("retain_output"):
+                self._retain_output(run_output_path, request_item.output_path)
+
+        if is_results:
+            self._write_completion_marker(request_item)
+
         # Because of the multi-processor part, don't try to already add the results here
         # to request_item
         return request_item
 
+    def _run_item(self, request_item: RequestItem) -> RequestItem:
+        # the spans of the run are returned with the request item (from the workers)
+        with tracing.collect() as events:
+            with tracing.span(
+                "run",
+                parameter_id=request_item.parameter_id,
+                run_id=request_item.run_id,
+            ):
+                request_item = self._run_with_retries(request_item)
+
+            if self.shared_memory and multiprocessing.parent_process() is not None:
+                with tracing.span("share_qoi"):
+                    request_item.add_qoi_result(share_frames(request_item.qoi_result))
+
+            if tracing.is_enabled() and multiprocessing.parent_process() is not None:
+                # the request item is sent back to the main process
+                with tracing.span("pickle_result") as s:
+                    s.args["bytes"] = len(pickle.dumps(request_item))
+
+        request_item.trace_events.extend(events)
+        return request_item
+
+    def _run_with_retries(self, request_item: RequestItem) -> RequestItem:
+        # carries out the run, failed runs are repeated according to the retry policy
+        retry_nr = 0
+
+        while True:
+            request_item = self._single_request(request_item)
+
+            if (
+                self.retry_policy is None
+                or request_item.return_code == 0
+                or retry_nr >= self.retry_policy.max_retries
+            ):
+                return request_item
+
+            retry_nr += 1
+            backoff_sec = self.retry_policy.backoff(retry_nr)
+            print(
+                f"WARNING: Run (parameter id {request_item.parameter_id}, run id "
+                f"{request_item.run_id}) failed with return code "
+                f"{request_item.return_code}. Retry {retry_nr}/"
+                f"{self.retry_policy.max_retries} in {backoff_sec:.1f}s."
+            )
+            time.sleep(backoff_sec)
+
+    def _remove_scenario_files(self, scenario_path):
+        for path in [scenario_path, f"{scenario_path}{OVERLAY_SUFFIX}"]:
+            if os.path.exists(path):
+                os.remove(path)
+
     def _create_output_path(self, output_path):
         create_folder(output_path, delete_if_exists=True)
         return output_path
@@ -215,7 +732,7 @@ class Request(object):
                 collected_df = [
                     item_[filename] for item_ in qoi_results if item_ is not None
                 ]
-                collected_df = pd.concat(collected_df, axis=0)
+                collected_df = concat_frames(collected_df)
 
                 final_results[filename] = collected_df
 
@@ -263,32 +780,68 @@ class Request(object):
         # ParameterVariation.generate_vadere_scenarios and
         # ParameterVariation._vars_object()
         for i, request_item in enumerate(self.request_item_list):
-            self.request_item_list[i] = self._single_request(request_item)
+            self.request_item_list[i] = self._run_item(request_item)
 
     def _mp_query(self, njobs):
         # multi process query
         pool = multiprocessing.Pool(processes=njobs)
-        self.request_item_list = pool.map(self._single_request, self.request_item_list)
+        self.request_item_list = pool.map(self._run_item, self.request_item_list)
+
+    def run(
+        self,
+        njobs: int = 1,
+        executor: Optional[ExecutorBase] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        shared_memory: bool = False,
+    ):
+        """If an executor is given (e.g. MultiHostExecutor), the executor carries out the
+        runs and njobs is ignored. If a retry_policy is given, failed runs (including
+        runs that exceeded the timeout of the model) are repeated.
 
-    def run(self, njobs: int = 1):
+        If shared_memory is True, the worker processes write the numeric QoI data into
+        shared memory blocks and only return small descriptors (instead of pickling
+        large data frames, e.g. trajectories, through a pipe). The blocks are copied
+        once into the final data frame."""
 
-        # nr of rows = nr of parameter settings = #simulations
-        nr_simulations = len(self.request_item_list)
-        njobs = njobs_check_and_set(njobs=njobs, ntasks=nr_simulations)
+        self.retry_policy = retry_policy
+        self.shared_memory = shared_memory
 
-        if njobs == 1:
-            self._sp_query()
-        else:
-            self._mp_query(njobs=njobs)
+        if shared_memory:
+            start_resource_tracker()
+
+        with tracing.span("runs", nr_runs=len(self.request_item_list)):
+            if executor is not None:
+                self.request_item_list = executor.run_items(
+                    self, self.request_item_list
+                )
+            else:
+                # nr of rows = nr of parameter settings = #simulations
+                nr_simulations = len(self.request_item_list)
+                njobs = njobs_check_and_set(njobs=njobs, ntasks=nr_simulations)
+
+                if njobs == 1:
+                    self._sp_query()
+                else:
+                    self._mp_query(njobs=njobs)
+
+        # spans recorded in the workers (and during the scenario creation)
+        for request_item in self.request_item_list:
+            tracing.add_events(request_item.trace_events)
+            request_item.trace_events = list()
 
         if self.qoi is not None:
-            self.compiled_qoi_data = self._compile_qoi()
-            self.compiled_run_info = self._compile_run_info()
+            with tracing.span("compile_qoi"):
+                self.compiled_qoi_data = self._compile_qoi()
+                self.compiled_run_info = self._compile_run_info()
 
         return self.compiled_qoi_data, self.compiled_run_info
 
 
 class VariationBase(Request, ServerRequest):
+
+    # whether the scenario creation supports lazy_scenarios (see scenario_creation)
+    SUPPORTS_LAZY_SCENARIOS = True
+
     def __init__(
         self,
         env_man: AbstractEnvironmentManager,
@@ -298,13 +851,35 @@ class VariationBase(Request, ServerRequest):
         post_changes: PostScenarioChangesBase = None,
         njobs: int = 1,
         remove_output=False,
+        cache: Optional[SimulationCache] = None,
+        resume=False,
+        scenario_format="indent",
+        lazy_scenarios=False,
+        retain_scenarios=False,
+        scratch_path=None,
+        retain_output=None,
     ):
 
+        if lazy_scenarios and not self.SUPPORTS_LAZY_SCENARIOS:
+            raise ValueError(
+                f"lazy_scenarios is not supported by {type(self).__name__}."
+            )
+
         self.parameter_variation = parameter_variation
         self.env_man = env_man
         self.post_changes = post_changes
         self.model = model
         self.remove_output = remove_output
+        self.resume = resume
+        self.scenario_format = scenario_format
+
+        # If lazy_scenarios is True, the scenario files are not written before all runs
+        # start. Instead, each scenario file is written right before its run and removed
+        # afterwards (unless retain_scenarios is True).
+        self.lazy_scenarios = lazy_scenarios
+
+        # see AbstractEnvironmentManager.set_scenario_format for the options
+        self.env_man.set_scenario_format(scenario_format)
 
         if qoi is None and remove_output:
             raise ValueError(
@@ -315,9 +890,19 @@ class VariationBase(Request, ServerRequest):
         self.set_qoi(qoi)
         request_item_list = self.scenario_creation(njobs)
 
-        super(VariationBase, self).__init__(request_item_list, self.model, self.qoi)
+        super(VariationBase, self).__init__(
+            request_item_list,
+            self.model,
+            self.qoi,
+            cache=cache,
+            resume=resume,
+            scratch_path=scratch_path,
+            retain_output=retain_output,
+        )
         ServerRequest.__init__(self)
 
+        self.retain_scenarios = retain_scenarios or not lazy_scenarios
+
     def set_qoi(self, qoi):
         if isinstance(qoi, (str, list)):
             self.qoi = VadereQuantityOfInterest(
@@ -332,15 +917,29 @@ class VariationBase(Request, ServerRequest):
         scenario_creation = VadereScenarioCreation(
             self.env_man, self.parameter_variation, self.post_changes
         )
-        request_item_list = scenario_creation.generate_scenarios(njobs)
+        request_item_list = scenario_creation.generate_scenarios(
+            njobs, resume=self.resume, lazy=self.lazy_scenarios
+        )
+
+        if self.lazy_scenarios:
+            self.lazy_scenario_creation = scenario_creation
+
         return request_item_list
 
     def _remove_output(self):
         if self.env_man.env_path is not None:
             shutil.rmtree(self.env_man.env_path)
 
-    def run(self, njobs: int = 1):
-        qoi_result_df, meta_info = super(VariationBase, self).run(njobs)
+    def run(
+        self,
+        njobs: int = 1,
+        executor: Optional[ExecutorBase] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        shared_memory: bool = False,
+    ):
+        qoi_result_df, meta_info = super(VariationBase, self).run(
+            njobs, executor, retry_policy, shared_memory
+        )
 
         # add another level to distinguish the columns with the parameter lookup
         meta_info = self._add_meta_info_multiindex(meta_info)
@@ -370,17 +969,23 @@ class VariationBase(Request, ServerRequest):
             post_changes=kwargs["post_changes"],
             njobs=kwargs["njobs"],
             remove_output=False,
+            scenario_format=kwargs.get("scenario_format", "indent"),
+            lazy_scenarios=kwargs.get("lazy_scenarios", False),
+            retain_scenarios=kwargs.get("retain_scenarios", False),
         )  # the output for remote will be removed after all is transferred
 
         res = setup.run(kwargs["njobs"])
         cls.dump_result_pickle(res, kwargs["remote_pickle_res_path"])
 
-    def remote(self, njobs=1):
+    def remote(self, njobs=1, transfer_mode="zip"):
         pickle_content = {
             "qoi": self.qoi,
             "parameter_variation": self.parameter_variation,
             "post_changes": self.post_changes,
             "njobs": njobs,
+            "scenario_format": self.scenario_format,
+            "lazy_scenarios": self.lazy_scenarios,
+            "retain_scenarios": self.retain_scenarios,
         }
 
         local_transfer_files = {
@@ -394,6 +999,7 @@ class VariationBase(Request, ServerRequest):
             local_model_obj=self.model,
             class_name="VariationBase",
             transfer_output=not self.remove_output,
+            transfer_mode=transfer_mode,
         )
         return remote_result
 
@@ -405,6 +1011,13 @@ class VariationBase(Request, ServerRequest):
 
 
 class CoupledDictVariation(VariationBase, ServerRequest):
+
+    # see ResultJournal, stored in the temp folder of the environment
+    RESULT_JOURNAL_FILE = "results.sqlite"
+
+    # the omnet and vadere scenarios are all created before the runs
+    SUPPORTS_LAZY_SCENARIOS = False
+
     def __init__(
         self,
         ini_path: str,
@@ -420,9 +1033,16 @@ class CoupledDictVariation(VariationBase, ServerRequest):
         remove_output=False,
         seed_config=None,
         config="final",
+        shared_assets="copy",
     ):
+        """
+        :param shared_assets: how the shared input files ("additional_rover_files") are
+            placed in the folder of each run: "copy", "hardlink" (read-only) or
+            "symlink", see CoupledScenarioCreation
+        """
 
         scenario_path = self._get_scenario_path(ini_path, config=config)
+        self.shared_assets = shared_assets
 
         self.scenario_path = scenario_path
         self.ini_path = ini_path
@@ -465,7 +1085,18 @@ class CoupledDictVariation(VariationBase, ServerRequest):
             remove_output=remove_output,
         )
 
-    def run(self, njobs: int = 1):
+        self._journal = None
+
+    def run(
+        self,
+        njobs: int = 1,
+        executor: Optional[ExecutorBase] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        shared_memory: bool = False,
+    ):
+        # one journal per sweep, the worker processes inherit it
+        self._journal = ResultJournal(self._result_journal_path())
+
         # TODO use finally
         # try:
         #     par_var, data = super(CoupledDictVariation, self).run(njobs)
@@ -477,71 +1108,62 @@ class CoupledDictVariation(VariationBase, ServerRequest):
         #         print("INFO: Simulation failed. Proceed succesful data only.")
         #         par_var, data = self.get_sim_results_from_temp()
         try:
-            par_var, data = super(CoupledDictVariation, self).run(njobs)
-        except:
+            par_var, data = super(CoupledDictVariation, self).run(
+                njobs, executor, retry_policy, shared_memory
+            )
+        except Exception:
             print("INFO: Simulation failed. Proceed succesful data only.")
             par_var, data = self.get_sim_results_from_temp()
 
         return par_var, data
 
+    def _result_journal_path(self):
+        return os.path.join(self.env_man.get_temp_folder(), self.RESULT_JOURNAL_FILE)
+
+    def _result_journal(self) -> ResultJournal:
+        # the journal holds no open connection and can be shared by processes
+        if self._journal is None:
+            self._journal = ResultJournal(self._result_journal_path())
+        return self._journal
+
     def get_sim_results_from_temp(self):
+        """Collects the results of all runs that finished (also if the sweep failed or
+        was interrupted) from the result journal."""
 
         # get planned simulations
         par_var = self.get_simulations()
 
-        # get pickle files from successful simulation runs
-        temp_folder = self.env_man.get_temp_folder()
-        files = os.listdir(temp_folder)
+        if os.path.exists(self._result_journal_path()):
+            entries = list(self._result_journal().read())
+        else:
+            entries = list()
+
+        # runs without a journal entry failed
+        meta_data = {
+            (parameter_id, run_id): (parameter_id, run_id, -1, -1)
+            for parameter_id, run_id in par_var.index.to_list()
+        }
 
-        # read data and build a dataframe which contains all data
-        df = pd.DataFrame()
-        for f in files:
-            if os.path.splitext(f)[1] != ".pkl":
-                raise ValueError(
-                    f"Only .pkl files allowed (generated by suqc). Got file: {f}."
+        collected = dict()
+        for parameter_id, run_id, return_code, required_time, result in entries:
+            if (parameter_id, run_id) in meta_data:
+                meta_data[(parameter_id, run_id)] = (
+                    parameter_id,
+                    run_id,
+                    required_time,
+                    return_code,
                 )
-            df_new = pd.read_pickle(os.path.join(temp_folder, f))
-            df = pd.concat([df, df_new])
-
-        # separate meta info and qoi
-        meta = df.iloc[:, df.columns.get_level_values(0) == "MetaInfo"]
-        meta = meta.dropna()
-        meta.columns = meta.columns.droplevel(0)
-        meta.index = meta.index.droplevel(-1)
-        qoi = df.iloc[:, df.columns.get_level_values(0) != "MetaInfo"]
-
-        # find failed simulation runs
-        ii = set(qoi.index.droplevel(level=-1).to_list())
-        iii = set(par_var.index.to_list())
-        failed_simulation_runs = list(iii.symmetric_difference(ii))
-
-        # save samples and meta information to par_var
-        meta_data = list()
-        for sim in par_var.index.to_list():
-            parameter_id = sim[0]
-            run_id = sim[1]
-
-            if sim in failed_simulation_runs:
-                return_code = -1
-                required_time = -1
-            else:
-                return_code = meta.loc[sim, "return_code"]
-                required_time = meta.loc[sim, "required_wallclock_time"]
 
-            meta_data.append((parameter_id, run_id, required_time, return_code,))
+            if result is not None:
+                for filename, df in result.items():
+                    collected.setdefault(filename, list()).append(df)
 
-        meta_info = self._compile_run_info(data=meta_data)
+        meta_info = self._compile_run_info(data=list(meta_data.values()))
         meta_info = self._add_meta_info_multiindex(meta_info)
         par_var = pd.concat([par_var, meta_info], axis=1)
 
-        # save qoi to data dict
-        dict_keys = list(set(df.columns.get_level_values(0).to_list()))
-        data = dict()
-        for k in dict_keys:
-            df_k = df.iloc[:, df.columns.get_level_values(0) == k]
-            df_k = df_k.dropna()
-            #df_k.columns = df_k.columns.droplevel(0) not sure
-            data[k] = df_k
+        # save qoi to data dict, all data frames are concatenated at once
+        data = {filename: pd.concat(dfs, axis=0) for filename, dfs in collected.items()}
 
         return par_var, data
 
@@ -557,7 +1179,9 @@ class CoupledDictVariation(VariationBase, ServerRequest):
 
         ini_folder = os.path.dirname(ini_path)
         ini_file = OppConfigFileBase.from_path(
-            ini_path=ini_path, config=config, cfg_type=OppConfigType.EXT_DEL_LOCAL,
+            ini_path=ini_path,
+            config=config,
+            cfg_type=OppConfigType.EXT_DEL_LOCAL,
         )
 
         scenario_name = ini_file["*.manager.vadereScenarioPath"].strip('"')
@@ -571,7 +1195,10 @@ class CoupledDictVariation(VariationBase, ServerRequest):
         #    raise Exception("Dataframe must contain parameters of multiple simulators.")
 
         scenario_creation = CoupledScenarioCreation(
-            self.env_man, parameter_variation, self.post_changes
+            self.env_man,
+            parameter_variation,
+            self.post_changes,
+            shared_assets=self.shared_assets,
         )
         request_item_list = scenario_creation.generate_scenarios(njobs)
 
@@ -589,9 +1216,10 @@ class CoupledDictVariation(VariationBase, ServerRequest):
         )
         required_files = [k.filename for k in self.qoi.req_qois]
 
-        return_code, required_time, output_on_error = self.model.run_simulation(
-            dirname, start_file, required_files
-        )
+        with tracing.span("simulation"):
+            return_code, required_time, output_on_error = self.model.run_simulation(
+                dirname, start_file, required_files
+            )
 
         filepath = f"{dirname}/results/**/*.scenario"
         file = glob.glob(filepath, recursive=True)
@@ -633,28 +1261,22 @@ class CoupledDictVariation(VariationBase, ServerRequest):
         if self.remove_output is True:
             shutil.rmtree(dirname)
 
-        temp_file = os.path.join(
-            self.env_man.get_temp_folder(), f"{par_id}__{run_id}.pkl"
-        )
-
-        k = result.keys()
-        df = pd.DataFrame()
-        for key, item in result.items():
-            item.columns = pd.MultiIndex.from_product([[key], item.columns.to_list()])
-            df = pd.concat([df, item], axis=1)
+        if result is not None:
+            # the columns are prefixed with the filename
+            for filename, df in result.items():
+                df.columns = pd.MultiIndex.from_product(
+                    [[filename], df.columns.to_list()]
+                )
 
-        # add meta data information to pickle in temp dir
-        df_meta = pd.DataFrame(
-            {
-                ("MetaInfo", "return_code"): return_code,
-                ("MetaInfo", "required_wallclock_time"): required_time,
-            },
-            index=[(par_id, run_id, 0,)],
+        # crash-safe record of the run, see get_sim_results_from_temp
+        self._result_journal().append(
+            par_id,
+            run_id,
+            qoi_result=result,
+            return_code=return_code,
+            required_time=required_time,
         )
 
-        df = pd.concat([df, df_meta], axis=1, sort=True)
-        df.to_pickle(temp_file)
-
         return request_item
 
 
@@ -672,6 +1294,13 @@ class DictVariation(VariationBase, ServerRequest):
         output_folder=None,
         remove_output=False,
         env_remote=None,
+        cache: Optional[SimulationCache] = None,
+        resume=False,
+        scenario_format="indent",
+        lazy_scenarios=False,
+        retain_scenarios=False,
+        scratch_path=None,
+        retain_output=None,
     ):
 
         self.scenario_path = scenario_path
@@ -681,12 +1310,19 @@ class DictVariation(VariationBase, ServerRequest):
             ".scenario"
         ), "Filepath must exist and the file has to end with .scenario"
 
+        if resume and output_folder is None:
+            raise ValueError(
+                "To resume a sweep the output_folder of the previous sweep has to be set."
+            )
+
         if env_remote is None:
             env = VadereEnvironmentManager.create_variation_env(
                 basis_scenario=self.scenario_path,
                 base_path=output_path,
                 env_name=output_folder,
-                handle_existing="ask_user_replace",
+                handle_existing=(
+                    "write_in_if_exist_else_create" if resume else "ask_user_replace"
+                ),
             )
             self.env_path = env.env_path
         else:
@@ -707,6 +1343,13 @@ class DictVariation(VariationBase, ServerRequest):
             post_changes=post_changes,
             njobs=njobs_create_scenarios,
             remove_output=remove_output,
+            cache=cache,
+            resume=resume,
+            scenario_format=scenario_format,
+            lazy_scenarios=lazy_scenarios,
+            retain_scenarios=retain_scenarios,
+            scratch_path=scratch_path,
+            retain_output=retain_output,
         )
 
 
@@ -724,6 +1367,13 @@ class SingleKeyVariation(DictVariation, ServerRequest):
         output_folder=None,
         remove_output=False,
         env_remote=None,
+        cache: Optional[SimulationCache] = None,
+        resume=False,
+        scenario_format="indent",
+        lazy_scenarios=False,
+        retain_scenarios=False,
+        scratch_path=None,
+        retain_output=None,
     ):
 
         self.key = key
@@ -741,6 +1391,13 @@ class SingleKeyVariation(DictVariation, ServerRequest):
             output_path=output_path,
             remove_output=remove_output,
             env_remote=env_remote,
+            cache=cache,
+            resume=resume,
+            scenario_format=scenario_format,
+            lazy_scenarios=lazy_scenarios,
+            retain_scenarios=retain_scenarios,
+            scratch_path=scratch_path,
+            retain_output=retain_output,
         )
 
 
@@ -821,7 +1478,7 @@ class FolderExistScenarios(Request, ServerRequest):
             scenario_request_items.append(item)
         return scenario_request_items
 
-    def remote(self, njobs=1):
+    def remote(self, njobs=1, transfer_mode="zip"):
 
         local_pickle_content = {"njobs": njobs}
 
@@ -836,10 +1493,19 @@ class FolderExistScenarios(Request, ServerRequest):
             local_model_obj=self.model,
             class_name="FolderExistScenarios",
             transfer_output=True,
+            transfer_mode=transfer_mode,
         )
 
-    def run(self, njobs: int = 1):
-        _, meta_info = super(FolderExistScenarios, self).run(njobs)
+    def run(
+        self,
+        njobs: int = 1,
+        executor: Optional[ExecutorBase] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        shared_memory: bool = False,
+    ):
+        _, meta_info = super(FolderExistScenarios, self).run(
+            njobs, executor, retry_policy, shared_memory
+        )
         return meta_info
 
 
@@ -936,8 +1602,16 @@ class SingleExistScenario(Request, ServerRequest):
             request_item_list.append(request_item)
         return request_item_list
 
-    def run(self, njobs: int = 1):
-        res = super(SingleExistScenario, self).run(njobs)
+    def run(
+        self,
+        njobs: int = 1,
+        executor: Optional[ExecutorBase] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        shared_memory: bool = False,
+    ):
+        res = super(SingleExistScenario, self).run(
+            njobs, executor, retry_policy, shared_memory
+        )
         return res
 
     @classmethod
@@ -958,7 +1632,7 @@ class SingleExistScenario(Request, ServerRequest):
         res = setup.run(njobs=kwargs["njobs"])
         cls.dump_result_pickle(res, kwargs["remote_pickle_res_path"])
 
-    def remote(self, njobs=1):
+    def remote(self, njobs=1, transfer_mode="zip"):
 
         local_pickle_content = {
             "njobs": njobs,
@@ -974,6 +1648,7 @@ class SingleExistScenario(Request, ServerRequest):
             local_model_obj=self.model,
             class_name="SingleExistScenario",
             transfer_output=True,
+            transfer_mode=transfer_mode,
         )
 
 
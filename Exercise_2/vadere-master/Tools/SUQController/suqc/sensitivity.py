@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+"""Global sensitivity analysis of sweeps with a SaltelliSampling (Sobol indices) or a
+MorrisSampling (elementary effects) design. All estimators and bootstrap resamples are
+vectorized with NumPy."""
+
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from suqc.parameter.sampling import MorrisSampling, SaltelliSampling
+
+# maximum number of values in a batch of bootstrap resamples
+_BOOTSTRAP_BATCH_VALUES = 2 ** 24
+
+
+def _point_values(nr_points, qoi) -> np.ndarray:
+    """One value per point of the design (mean over the runs of the point)."""
+
+    if isinstance(qoi, np.ndarray):
+        values = np.asarray(qoi, dtype=float)
+        if values.shape != (nr_points,):
+            raise ValueError(
+                f"Expected {nr_points} values (one per point), got shape {values.shape}."
+            )
+        return values
+
+    if isinstance(qoi, pd.DataFrame):
+        if qoi.shape[1] != 1:
+            raise ValueError(
+                "The QoI data has more than one column, select the column to analyse."
+            )
+        qoi = qoi.iloc[:, 0]
+
+    if "id" in qoi.index.names:
+        qoi = qoi.groupby(level="id").mean()
+
+    values = qoi.reindex(np.arange(nr_points)).to_numpy(dtype=float)
+
+    if np.isnan(values).any():
+        missing = np.flatnonzero(np.isnan(values))
+        raise ValueError(
+            f"No QoI value for {missing.shape[0]} point(s) of the design (e.g. ids "
+            f"{missing[:5].tolist()}), failed runs have to be repeated."
+        )
+    return values
+
+
+def _bootstrap(statistic, nr_samples, nr_bootstrap, values_per_sample, rng):
+    """Evaluates `statistic(indices)` for resamples (with replacement) of the samples.
+    The resamples are drawn in batches to limit the memory."""
+
+    batch_size = max(1, _BOOTSTRAP_BATCH_VALUES // (nr_samples * values_per_sample))
+
+    results = list()
+    for start in range(0, nr_bootstrap, batch_size):
+        size = min(batch_size, nr_bootstrap - start)
+        results.append(statistic(rng.integers(0, nr_samples, size=(size, nr_samples))))
+    return np.concatenate(results, axis=0)
+
+
+def _confidence_bounds(resamples, confidence):
+    alpha = 1 - confidence
+    return np.quantile(resamples, [alpha / 2, 1 - alpha / 2], axis=0)
+
+
+def _sobol_estimates(fa, fb, fab):
+    # fa, fb: (..., N), fab: (..., N, d)
+    # first order: Saltelli et al. (2010), total order: Jansen (1999)
+    variance = np.var(np.concatenate([fa, fb], axis=-1), axis=-1)[..., np.newaxis]
+    first = np.mean(fb[..., np.newaxis] * (fab - fa[..., np.newaxis]), axis=-2)
+    total = 0.5 * np.mean((fa[..., np.newaxis] - fab) ** 2, axis=-2)
+    return first / variance, total / variance
+
+
+def sobol_analysis(
+    sampling: SaltelliSampling,
+    qoi: Union[pd.Series, pd.DataFrame, np.ndarray],
+    nr_bootstrap: int = 100,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """First-order (S1) and total-order (ST) Sobol indices with bootstrap confidence
+    intervals (percentiles of `nr_bootstrap` resamples of the base samples).
+
+    :param sampling: design of the sweep (after create_grid)
+    :param qoi: one value per run (e.g. the compiled QoI data of a scalar reduction),
+        values of several runs of a point are averaged
+    """
+
+    if sampling.unit_points is None:
+        raise ValueError("Create the design with 'create_grid' first.")
+
+    nr_base = sampling.nr_base_samples
+    dimension = len(sampling.parameters)
+    values = _point_values(sampling.unit_points.shape[0], qoi)
+
+    fa = values[:nr_base]
+    fb = values[nr_base : 2 * nr_base]
+    fab = values[2 * nr_base :].reshape(dimension, nr_base).T
+
+    first, total = _sobol_estimates(fa, fb, fab)
+
+    def resampled(idx):
+        return np.stack(_sobol_estimates(fa[idx], fb[idx], fab[idx]), axis=1)
+
+    rng = np.random.default_rng(seed)
+    resamples = _bootstrap(resampled, nr_base, nr_bootstrap, dimension + 2, rng)
+    lower, upper = _confidence_bounds(resamples, confidence)
+
+    df = pd.DataFrame(
+        {
+            "S1": first,
+            "S1_low": lower[0],
+            "S1_high": upper[0],
+            "ST": total,
+            "ST_low": lower[1],
+            "ST_high": upper[1],
+        },
+        index=pd.Index(sampling.parameter_names, name="parameter"),
+    )
+    return df
+
+
+def elementary_effects(sampling: MorrisSampling, values: np.ndarray) -> np.ndarray:
+    """Elementary effects with shape (nr_trajectories, d) (parameter order of the
+    sampling), the steps are measured in the unit hypercube."""
+
+    dimension = len(sampling.parameters)
+    points = sampling.unit_points.reshape(-1, dimension + 1, dimension)
+    values = values.reshape(-1, dimension + 1)
+
+    # exactly one parameter changes in each step of a trajectory
+    steps = np.diff(points, axis=1)
+    changed = np.argmax(np.abs(steps), axis=2)
+    step_sizes = np.take_along_axis(steps, changed[..., np.newaxis], axis=2)[..., 0]
+
+    effects = np.empty_like(step_sizes)
+    np.put_along_axis(effects, changed, np.diff(values, axis=1) / step_sizes, axis=1)
+    return effects
+
+
+def morris_analysis(
+    sampling: MorrisSampling,
+    qoi: Union[pd.Series, pd.DataFrame, np.ndarray],
+    nr_bootstrap: int = 100,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """Morris screening: mean (mu), mean of the absolute values (mu_star) and standard
+    deviation (sigma) of the elementary effects, with a bootstrap confidence interval
+    of mu_star (resamples of the trajectories).
+
+    :param sampling: design of the sweep (after create_grid)
+    :param qoi: one value per run, values of several runs of a point are averaged
+    """
+
+    if sampling.unit_points is None:
+        raise ValueError("Create the design with 'create_grid' first.")
+
+    values = _point_values(sampling.unit_points.shape[0], qoi)
+    effects = elementary_effects(sampling, values)
+    abs_effects = np.abs(effects)
+
+    rng = np.random.default_rng(seed)
+    resamples = _bootstrap(
+        lambda idx: abs_effects[idx].mean(axis=1),
+        effects.shape[0],
+        nr_bootstrap,
+        effects.shape[1],
+        rng,
+    )
+    lower, upper = _confidence_bounds(resamples, confidence)
+
+    df = pd.DataFrame(
+        {
+            "mu": effects.mean(axis=0),
+            "mu_star": abs_effects.mean(axis=0),
+            "mu_star_low": lower,
+            "mu_star_high": upper,
+            "sigma": effects.std(axis=0, ddof=1),
+        },
+        index=pd.Index(sampling.parameter_names, name="parameter"),
+    )
+    return df
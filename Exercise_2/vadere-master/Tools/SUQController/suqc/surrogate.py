@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+import itertools
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+from suqc.parameter.sampling import (
+    Parameter,
+    ParameterVariationBase,
+    UnitHypercube,
+    UserDefinedSampling,
+)
+
+
+def gaussian_process_regressor(dimension: int, random_state=None):
+    """Gaussian process for points in the unit hypercube with an anisotropic RBF kernel.
+    Also used by AdaptiveSampling."""
+
+    from sklearn.gaussian_process import GaussianProcessRegressor
+    from sklearn.gaussian_process.kernels import RBF, ConstantKernel, WhiteKernel
+
+    # the white kernel models the noise of the stochastic simulation runs
+    kernel = ConstantKernel(1.0) * RBF(
+        length_scale=np.full(dimension, 0.3), length_scale_bounds=(1e-2, 1e2)
+    ) + WhiteKernel(noise_level=1e-3, noise_level_bounds=(1e-8, 1e1))
+
+    return GaussianProcessRegressor(
+        kernel=kernel,
+        normalize_y=True,
+        n_restarts_optimizer=2,
+        random_state=random_state,
+    )
+
+
+def valid_qoi_values(y: np.ndarray) -> np.ndarray:
+    """Boolean mask of the QoI values that are not NaN (failed runs). Raises a
+    ValueError if less than two values are valid."""
+
+    is_valid = ~np.isnan(y)
+    if is_valid.sum() < 2:
+        raise ValueError(
+            "Less than two valid QoI values, the surrogate cannot be fitted. Check "
+            "for failed simulation runs."
+        )
+    return is_valid
+
+
+class PolynomialChaosRegressor(object):
+    """Polynomial chaos expansion for uniformly distributed parameters: Legendre
+    polynomials up to a total `degree`, fitted by least squares on points in the unit
+    hypercube. The predictive standard deviation is the one of the linear least squares
+    fit (residual noise and uncertainty of the coefficients)."""
+
+    def __init__(self, degree: int = 3):
+        if degree < 0:
+            raise ValueError(f"degree has to be non-negative. Got {degree}.")
+        self.degree = degree
+
+        self.multi_indices = None
+        self.coefficients = None
+        self._covariance = None  # of the coefficients, without the noise variance
+        self._noise_variance = None
+
+    def _basis(self, x_unit):
+        from numpy.polynomial.legendre import legvander
+
+        # Legendre polynomials are orthogonal on [-1, 1]
+        vander = legvander(2 * x_unit - 1, self.degree)  # (n, d, degree + 1)
+        dims = np.arange(x_unit.shape[1])
+        return vander[:, dims, self.multi_indices].prod(axis=2)  # (n, nr_terms)
+
+    def fit(self, x_unit, y):
+        dimension = x_unit.shape[1]
+        self.multi_indices = np.array(
+            [
+                alpha
+                for alpha in itertools.product(range(self.degree + 1), repeat=dimension)
+                if sum(alpha) <= self.degree
+            ]
+        )
+
+        if x_unit.shape[0] < self.multi_indices.shape[0]:
+            raise ValueError(
+                f"A polynomial chaos expansion of degree {self.degree} in {dimension} "
+                f"dimensions has {self.multi_indices.shape[0]} terms, which requires at "
+                f"least as many points (got {x_unit.shape[0]})."
+            )
+
+        basis = self._basis(x_unit)
+        self.coefficients, _, _, _ = np.linalg.lstsq(basis, y, rcond=None)
+
+        dof = max(basis.shape[0] - basis.shape[1], 1)
+        residuals = y - basis @ self.coefficients
+        self._noise_variance = residuals @ residuals / dof
+        self._covariance = np.linalg.pinv(basis.T @ basis)
+        return self
+
+    def predict(self, x_unit, return_std=False):
+        basis = self._basis(x_unit)
+        mean = basis @ self.coefficients
+
+        if not return_std:
+            return mean
+
+        leverage = np.einsum("ij,jk,ik->i", basis, self._covariance, basis)
+        return mean, np.sqrt(self._noise_variance * (1 + leverage))
+
+
+class Surrogate(object):
+    """Fast regression model of a scalar QoI over the parameter space, trained on the
+    parameter points and compiled QoI data of a sweep (see VariationBase.run):
+
+        par_var, data = setup.run(njobs=4)
+        surrogate = Surrogate(parameters, model="gp").fit(par_var, data)
+        print(surrogate.cv_error)
+        values = surrogate.predict(SobolSampling(parameters).create_grid(2 ** 14))
+
+    Models:
+    * "pce" -- polynomial chaos expansion (Legendre, see PolynomialChaosRegressor)
+    * "gp" -- Gaussian process (RBF kernel with noise)
+    * "gradient_boosting" -- histogram gradient boosting trees (no uncertainty)
+
+    The QoI values of the runs of a parameter point are averaged. With `nr_folds` > 1 the
+    cross-validated error of the model is computed in `fit` (see `cv_error`).
+    """
+
+    MODELS = ["pce", "gp", "gradient_boosting"]
+
+    def __init__(
+        self,
+        parameters: List[Parameter],
+        model: str = "gp",
+        degree: int = 3,
+        nr_folds: int = 5,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param parameters: scalar parameters with range [lower, upper]
+        :param degree: total degree of the polynomial chaos expansion (model "pce")
+        :param nr_folds: folds of the cross-validation (values < 2: no cross-validation)
+        """
+
+        if model not in self.MODELS:
+            raise ValueError(f"model={model} not contained in allowed: {self.MODELS}")
+
+        self.parameters = parameters
+        self.model = model
+        self.degree = degree
+        self.nr_folds = nr_folds
+        self.seed = seed
+
+        self._hypercube = UnitHypercube(parameters)
+
+        self.regressor = None
+        self.cv_error = None
+
+    @property
+    def parameter_names(self):
+        return self._hypercube.parameter_names
+
+    @property
+    def has_uncertainty(self):
+        return self.model != "gradient_boosting"
+
+    def _parameter_values(self, points) -> pd.DataFrame:
+        """Parameter values (columns in the order of the parameters) of the points of a
+        sampling, a lookup DataFrame of a sweep, a DataFrame with the parameter names as
+        columns or an array. For points with several runs, the first run is used."""
+
+        if isinstance(points, ParameterVariationBase):
+            points = points.points
+
+        if isinstance(points, np.ndarray):
+            return pd.DataFrame(points, columns=self.parameter_names)
+
+        if isinstance(points.columns, pd.MultiIndex):
+            is_parameter = (
+                points.columns.get_level_values(0)
+                == ParameterVariationBase.MULTI_IDX_LEVEL0_PAR
+            )
+            points = points.loc[:, is_parameter]
+            points.columns = points.columns.get_level_values(-1)
+
+        if "id" in points.index.names and points.index.nlevels > 1:
+            points = points.groupby(level="id").first()
+
+        return points[self.parameter_names].astype(float)
+
+    def _create_regressor(self):
+        if self.model == "pce":
+            return PolynomialChaosRegressor(degree=self.degree)
+
+        elif self.model == "gp":
+            return gaussian_process_regressor(
+                self._hypercube.dimension, random_state=self.seed
+            )
+
+        else:  # gradient_boosting
+            from sklearn.ensemble import HistGradientBoostingRegressor
+
+            return HistGradientBoostingRegressor(random_state=self.seed)
+
+    def _cross_validate(self, x_unit, y):
+        from sklearn.model_selection import KFold
+
+        predicted = np.empty_like(y)
+        folds = KFold(n_splits=self.nr_folds, shuffle=True, random_state=self.seed)
+
+        for train, test in folds.split(x_unit):
+            regressor = self._create_regressor().fit(x_unit[train], y[train])
+            predicted[test] = regressor.predict(x_unit[test])
+
+        errors = predicted - y
+        return {
+            "rmse": float(np.sqrt(np.mean(errors ** 2))),
+            "mae": float(np.mean(np.abs(errors))),
+            "r2": float(1 - np.sum(errors ** 2) / np.sum((y - y.mean()) ** 2)),
+            "nr_points": int(y.shape[0]),
+        }
+
+    def fit(self, points, qoi: Union[pd.Series, pd.DataFrame]):
+        """
+        :param points: parameter points of the sweep (see `_parameter_values`), e.g. the
+            lookup DataFrame returned by VariationBase.run or the sampling
+        :param qoi: one value per run with the index level "id" (e.g. the compiled QoI
+            data of a scalar reduction)
+        """
+
+        if isinstance(qoi, pd.DataFrame):
+            if qoi.shape[1] != 1:
+                raise ValueError(
+                    "The QoI data has more than one column, select the column to fit."
+                )
+            qoi = qoi.iloc[:, 0]
+
+        values = self._parameter_values(points)
+        y = qoi.groupby(level="id").mean().reindex(values.index).to_numpy(dtype=float)
+
+        is_valid = valid_qoi_values(y)
+        if not is_valid.all():
+            print(
+                f"WARNING: {(~is_valid).sum()} parameter point(s) without QoI value "
+                f"(failed runs) are not used to fit the surrogate."
+            )
+
+        x_unit = self._hypercube.to_unit(values.to_numpy()[is_valid])
+        y = y[is_valid]
+
+        if self.nr_folds > 1:
+            self.cv_error = self._cross_validate(x_unit, y)
+            print(
+                f"INFO: Surrogate ({self.model}) cross-validated RMSE "
+                f"{self.cv_error['rmse']:.4g}, R2 {self.cv_error['r2']:.3f}."
+            )
+
+        self.regressor = self._create_regressor().fit(x_unit, y)
+        return self
+
+    def predict(self, points, return_std=False):
+        """Surrogate prediction (and standard deviation) at the points of a sampling, a
+        DataFrame with the parameter names as columns or an array (parameter space)."""
+
+        if self.regressor is None:
+            raise RuntimeError("Call 'fit' first.")
+
+        if return_std and not self.has_uncertainty:
+            raise ValueError(f"The model {self.model} provides no uncertainty.")
+
+        x_unit = self._hypercube.to_unit(self._parameter_values(points).to_numpy())
+
+        if return_std:
+            return self.regressor.predict(x_unit, return_std=True)
+        return self.regressor.predict(x_unit)
+
+    def split_uncertain(
+        self, points, max_std: float
+    ) -> Tuple[pd.DataFrame, Optional[UserDefinedSampling]]:
+        """Splits points into points where the surrogate is certain (standard deviation
+        <= max_std) and points that have to be simulated.
+
+        Returns the certain points with the columns "qoi" and "std" and a
+        UserDefinedSampling of the uncertain points (same ids; None if all points are
+        certain), which can be run with DictVariation.
+        """
+
+        values = self._parameter_values(points)
+        mean, std = self.predict(values, return_std=True)
+
+        is_certain = std <= max_std
+
+        certain = values.loc[is_certain].copy()
+        certain["qoi"] = mean[is_certain]
+        certain["std"] = std[is_certain]
+
+        if is_certain.all():
+            return certain, None
+
+        uncertain_values = values.loc[~is_certain]
+        uncertain = UserDefinedSampling(uncertain_values.to_dict("records"))
+        uncertain.points.index = pd.Index(
+            uncertain_values.index, name=ParameterVariationBase.ROW_IDX_NAME_ID
+        )
+        return certain, uncertain
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import numpy as np
+
+from suqc.adaptive import AdaptiveSampling
+from suqc.parameter.sampling import Parameter
+
+
+def ramp(points):
+    return 2 * points["x"].to_numpy() + np.sin(3 * points["y"].to_numpy())
+
+
+class AdaptiveSamplingTests(unittest.TestCase):
+    def setUp(self):
+        self.parameters = [
+            Parameter("x", range=[0.0, 1.0]),
+            Parameter("y", range=[-1.0, 1.0]),
+        ]
+
+    def _sampling(self, run_batch=ramp, **kwargs):
+        kwargs = dict(dict(nr_initial=8, batch_size=4, nr_candidates=256), **kwargs)
+        return AdaptiveSampling(self.parameters, run_batch, seed=1, **kwargs)
+
+    def test_variance(self):
+        batches = list()
+
+        def run_batch(points):
+            batches.append(points)
+            return ramp(points)
+
+        sampling = self._sampling(run_batch)
+        points = sampling.run(max_points=20)
+
+        self.assertEqual([batch.shape[0] for batch in batches], [8, 4, 4, 4])
+        self.assertEqual(list(points.columns), ["x", "y", "qoi", "batch"])
+        self.assertEqual(list(points["batch"].unique()), [0, 1, 2, 3])
+        self.assertEqual(len(sampling.history), 3)
+
+        # the points are in the parameter ranges
+        self.assertTrue(points["x"].between(0, 1).all())
+        self.assertTrue(points["y"].between(-1, 1).all())
+
+        rng = np.random.default_rng(2)
+        test_points = np.column_stack([rng.random(50), 2 * rng.random(50) - 1])
+        mean, std = sampling.predict(test_points, return_std=True)
+        expected = 2 * test_points[:, 0] + np.sin(3 * test_points[:, 1])
+        np.testing.assert_allclose(mean, expected, atol=0.1)
+        self.assertTrue((std < 0.1).all())
+
+    def test_tolerance(self):
+        sampling = self._sampling()
+        points = sampling.run(max_points=100, tolerance=1.0)
+
+        # the initial points already meet the tolerance
+        self.assertEqual(points.shape[0], 8)
+        self.assertEqual(len(sampling.history), 1)
+        self.assertLess(sampling.history[0], 1.0)
+
+    def test_straddle(self):
+        # level set x == 0.5
+        def run_batch(points):
+            return points["x"].to_numpy()
+
+        sampling = self._sampling(run_batch, acquisition="straddle", threshold=0.5)
+        points = sampling.run(max_points=24)
+
+        # the adaptive points are selected close to the level set
+        adaptive = points.loc[points["batch"] > 0, "x"]
+        initial = points.loc[points["batch"] == 0, "x"]
+        self.assertLess(np.abs(adaptive - 0.5).mean(), np.abs(initial - 0.5).mean() / 2)
+
+        with self.assertRaises(ValueError):
+            self._sampling(acquisition="straddle")
+
+    def test_failed_runs(self):
+        def run_batch(points):
+            values = ramp(points)
+            values[0] = np.nan
+            return values
+
+        sampling = self._sampling(run_batch)
+        points = sampling.run(max_points=12)
+        self.assertEqual(points["qoi"].isna().sum(), 2)
+
+        sampling = self._sampling(lambda points: np.full(points.shape[0], np.nan))
+        with self.assertRaises(ValueError):
+            sampling.run(max_points=12)
+
+        sampling = self._sampling(lambda points: np.zeros(1))
+        with self.assertRaises(ValueError):
+            sampling.run(max_points=12)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self._sampling(acquisition="expected_improvement")
+
+        with self.assertRaises(ValueError):
+            AdaptiveSampling([Parameter("z")], ramp)
+
+        with self.assertRaises(RuntimeError):
+            self._sampling().predict(np.zeros((1, 2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
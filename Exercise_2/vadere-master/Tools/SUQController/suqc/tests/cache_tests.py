@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+from suqc.cache import SimulationCache
+
+
+class SimulationCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.folder.name, "cache")
+
+        # stands in for the Vadere .jar file
+        self.jar_path = os.path.join(self.folder.name, "vadere-console.jar")
+        with open(self.jar_path, "wb") as f:
+            f.write(b"jar")
+
+        self.scenario = {
+            "name": "a",
+            "description": "",
+            "scenario": {"attributesSimulation": {"useFixedSeed": True}, "x": 1},
+        }
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _write_output(self, name, content):
+        output_path = os.path.join(self.folder.name, name)
+        os.makedirs(os.path.join(output_path, "sub"))
+        with open(os.path.join(output_path, "out.txt"), "w") as f:
+            f.write(content)
+        with open(os.path.join(output_path, "sub", "traj.txt"), "w") as f:
+            f.write("trajectories")
+        return output_path
+
+    def test_create_key(self):
+        cache = SimulationCache(self.cache_path)
+        key = cache.create_key(self.scenario, self.jar_path, ["out.txt"])
+
+        # cosmetic keys and the order of the requested files do not matter
+        renamed = dict(self.scenario, name="b", description="renamed")
+        self.assertEqual(cache.create_key(renamed, self.jar_path, ["out.txt"]), key)
+        self.assertEqual(
+            cache.create_key(self.scenario, self.jar_path, ["b.txt", "out.txt"]),
+            cache.create_key(self.scenario, self.jar_path, ["out.txt", "b.txt"]),
+        )
+
+        changed = dict(self.scenario)
+        changed["scenario"] = dict(self.scenario["scenario"], x=2)
+        self.assertNotEqual(cache.create_key(changed, self.jar_path, ["out.txt"]), key)
+        self.assertNotEqual(
+            cache.create_key(self.scenario, self.jar_path, ["traj.txt"]), key
+        )
+
+        with open(self.jar_path, "wb") as f:
+            f.write(b"new version of the jar")
+        self.assertNotEqual(
+            cache.create_key(self.scenario, self.jar_path, ["out.txt"]), key
+        )
+
+        # random seed: never cached
+        random_seed = dict(self.scenario)
+        random_seed["scenario"] = {"attributesSimulation": {"useFixedSeed": False}}
+        self.assertIsNone(cache.create_key(random_seed, self.jar_path, ["out.txt"]))
+
+    def test_hit_and_miss(self):
+        cache = SimulationCache(self.cache_path)
+        key = cache.create_key(self.scenario, self.jar_path, ["out.txt"])
+        restore_path = os.path.join(self.folder.name, "restored")
+
+        self.assertFalse(cache.contains(key))
+        self.assertIsNone(cache.restore(key, restore_path))
+
+        output_path = self._write_output("run", "1 2 3")
+        cache.store(key, output_path, ["out.txt"], required_time=12.5)
+        self.assertTrue(cache.contains(key))
+
+        info = cache.restore(key, restore_path)
+        self.assertEqual(info["files"], ["out.txt"])
+        self.assertEqual(info["required_time"], 12.5)
+        with open(os.path.join(restore_path, "out.txt"), "r") as f:
+            self.assertEqual(f.read(), "1 2 3")
+
+        # only the requested files are stored by default
+        self.assertFalse(os.path.exists(os.path.join(restore_path, "sub")))
+
+        # an existing entry is not overwritten
+        cache.store(key, self._write_output("run2", "other"), ["out.txt"], 1.0)
+        self.assertEqual(cache.restore(key, restore_path)["required_time"], 12.5)
+
+    def test_store_all_output(self):
+        cache = SimulationCache(self.cache_path, store_all_output=True)
+        key = cache.create_key(self.scenario, self.jar_path, ["out.txt"])
+
+        cache.store(key, self._write_output("run", "1"), ["out.txt"], 1.0)
+
+        restore_path = os.path.join(self.folder.name, "restored")
+        info = cache.restore(key, restore_path)
+        self.assertEqual(
+            sorted(info["files"]), ["out.txt", os.path.join("sub", "traj.txt")]
+        )
+        self.assertTrue(os.path.isfile(os.path.join(restore_path, "sub", "traj.txt")))
+
+    def test_eviction(self):
+        # each entry is 100 bytes, the cache holds two of them
+        cache = SimulationCache(self.cache_path, max_size_bytes=250)
+
+        keys = list()
+        for i in range(3):
+            scenario = dict(
+                self.scenario, scenario=dict(self.scenario["scenario"], x=i)
+            )
+            key = cache.create_key(scenario, self.jar_path, ["out.txt"])
+            keys.append(key)
+
+            cache.store(key, self._write_output(f"run{i}", "x" * 100), ["out.txt"], 1)
+
+            # set the last access explicitly, the resolution of mtime can be coarse
+            info_file = os.path.join(cache._entry_path(key), cache.ENTRY_INFO_FILE)
+            os.utime(info_file, (1000 + i, 1000 + i))
+
+            if i == 1:
+                # the first entry is accessed again, the second one is the oldest now
+                cache.restore(keys[0], os.path.join(self.folder.name, "restored"))
+
+        self.assertEqual([cache.contains(key) for key in keys], [True, False, True])
+        self.assertEqual(cache.size(), 200)
+
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+        self.assertFalse(cache.contains(keys[0]))
+
+        with self.assertRaises(ValueError):
+            SimulationCache(self.cache_path, max_size_bytes=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from suqc.utils.dict_utils import *
+
+
+class KeyPathPlanTests(unittest.TestCase):
+    def test_key_path_plan(self):
+        d = {
+            "a": {"z": [{"b": 1, "c": 1}, {"b": 1, "c": 2}]},
+            "y": 99,
+            "x": {"s": "str", "f": 1.0},
+        }
+        changes = {"z.[c==2].b": 5, "y": 3, "x.f": 2.5}
+
+        plan = KeyPathPlan(d, keys=changes.keys())
+        new_d = plan.apply(changes)
+
+        self.assertEqual(new_d, change_dict(d, changes))
+        self.assertEqual(d["a"]["z"][1]["b"], 1)  # basis is not changed
+        self.assertEqual(d["y"], 99)
+        self.assertIs(new_d["a"]["z"][0], d["a"]["z"][0])  # not changed -> shared
+
+        # changes on a result of the plan (e.g. post changes)
+        self.assertEqual(
+            plan.apply({"s": "new", "y": 4}, new_d),
+            change_dict(new_d, {"s": "new", "y": 4}),
+        )
+        self.assertEqual(new_d["x"]["s"], "str")
+
+        with self.assertRaises(KeyError):
+            plan.apply({"not_existing": 1})
+
+        with self.assertRaises(ValueError):
+            plan.apply({"x": 1})  # not a leaf
+
+    def test_scenario_key_index(self):
+        d = {
+            "a": {"b": {"c": 1}, "z": [{"b": 1, "c": 1}, {"b": 1, "c": 2}]},
+            "b": {"c": {"d": 1}},
+            "c": {"a": 1},
+            "e": {"a": {"b": {"g": 3}}},
+        }
+        index = ScenarioKeyIndex(d)
+
+        keys = ["a", ".a", "b", ".b", "c", "d", "g", "b.c", ".b.c.d", "a.b.c"]
+        keys += ["z.[c==2].b", ".a.z.[c==1].c", "z.[c==3].b", "[c==1].c", "x"]
+
+        for key in keys:
+            for final_leaf in [True, False]:
+                for unique_key in [True, False]:
+                    try:
+                        expected = deep_dict_lookup(d, key, final_leaf, unique_key)
+                    except (KeyError, ValueError) as e:
+                        with self.assertRaises(type(e)):
+                            index.lookup(key, final_leaf, unique_key)
+                    else:
+                        self.assertEqual(
+                            index.lookup(key, final_leaf, unique_key), expected
+                        )
+
+        self.assertEqual(index.selected_position(("a", "z"), "[c==2]"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,264 @@
+import glob
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from suqc.executor import (
+    DynamicPoolExecutor,
+    HostRunner,
+    LocalHostRunner,
+    MemoryAdmission,
+    MultiHostExecutor,
+    RetryPolicy,
+    RuntimePredictor,
+)
+from suqc.request import Request, SingleKeyVariation
+from suqc.tests.fake_model import BASIS_SCENARIO, FakeVadereModel
+
+
+class FlakyModel(FakeVadereModel):
+    """The first `nr_failures` calls of each scenario fail (137: killed by the OOM
+    killer)."""
+
+    def __init__(self, log_path, return_code=137, stderr=b"", nr_failures=1):
+        super(FlakyModel, self).__init__(log_path=log_path)
+        self.return_code = return_code
+        self.stderr = stderr
+        self.nr_failures = nr_failures
+
+    def result(self, speed, nr_previous_calls):
+        if nr_previous_calls < self.nr_failures:
+            return self.return_code, self.stderr
+        return 0, None
+
+
+class StragglerModel(FakeVadereModel):
+    """The first call with speed 1.0 takes very long, all other calls are fast."""
+
+    def run_time(self, speed, nr_previous_calls):
+        return 120.0 if speed == 1.0 and nr_previous_calls == 0 else 0.1
+
+
+class BrokenHostRunner(HostRunner):
+    def run_item(self, request_item):
+        raise ConnectionError("host not reachable")
+
+
+class ExecutorTestBase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.folder.name, "calls.log")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _setup(self, model, values=(1.0, 2.0, 3.0, 4.0), output_folder="env", **kwargs):
+        return SingleKeyVariation(
+            scenario_path=BASIS_SCENARIO,
+            key="speedDistributionMean",
+            values=list(values),
+            qoi="evacuationTimes.txt",
+            model=model,
+            output_path=self.folder.name,
+            output_folder=output_folder,
+            **kwargs,
+        )
+
+    def _nr_calls(self, speed=None):
+        return FakeVadereModel.nr_calls(self.log_path, speed)
+
+
+class RetryPolicyTest(ExecutorTestBase):
+    def test_backoff(self):
+        policy = RetryPolicy(backoff_sec=1, backoff_factor=3, max_backoff_sec=5)
+        self.assertEqual([policy.backoff(k) for k in [1, 2, 3]], [1, 3, 5])
+
+        with self.assertRaises(ValueError):
+            RetryPolicy(max_retries=-1)
+
+    def test_retry_until_success(self):
+        model = FlakyModel(self.log_path, return_code=1, nr_failures=2)
+        meta_info, _ = self._setup(model, values=[1.0, 2.0]).run(
+            njobs=1, retry_policy=RetryPolicy(max_retries=2, backoff_sec=0)
+        )
+
+        self.assertEqual(self._nr_calls(), 6)
+        self.assertTrue((meta_info["MetaInfo", "return_code"] == 0).all())
+
+    def test_retry_exhaustion(self):
+        model = FakeVadereModel(self.log_path, fail_speeds=[2.0])
+        meta_info, _ = self._setup(model, values=[1.0, 2.0]).run(
+            njobs=1, retry_policy=RetryPolicy(max_retries=2, backoff_sec=0)
+        )
+
+        self.assertEqual(self._nr_calls(1.0), 1)
+        self.assertEqual(self._nr_calls(2.0), 3)
+        np.testing.assert_array_equal(meta_info["MetaInfo", "return_code"], [0, 1])
+
+
+class MemoryAdmissionTest(unittest.TestCase):
+    def test_estimate(self):
+        self.assertEqual(MemoryAdmission.parse_xmx(["-Xms1g", "-Xmx2g"]), 2**31)
+        self.assertEqual(MemoryAdmission.parse_xmx(["-Xmx2g", "-Xmx512m"]), 2**29)
+        self.assertIsNone(MemoryAdmission.parse_xmx([]))
+
+        admission = MemoryAdmission(min_samples=2, safety_factor=1.5)
+        admission.start(FakeVadereModel())
+        self.assertIsNone(admission.estimate())
+        self.assertTrue(admission.can_admit(0))  # always make progress
+        self.assertFalse(admission.can_admit(1))  # no estimate yet
+
+        admission.observe(100)
+        admission.observe(200)
+        self.assertEqual(admission.estimate(), 300)
+
+        admission.on_out_of_memory()
+        self.assertEqual(admission.estimate(), 450)
+
+    def test_budget(self):
+        if MemoryAdmission.available_bytes() is None:
+            self.skipTest("available memory is unknown")
+
+        admission = MemoryAdmission(run_bytes=2**20, reserve_bytes=0)
+        admission.start(FakeVadereModel())
+        self.assertTrue(admission.can_admit(3))
+
+        admission = MemoryAdmission(run_bytes=2**60, reserve_bytes=0)
+        admission.start(FakeVadereModel())
+        self.assertFalse(admission.can_admit(1))
+
+
+class RuntimePredictorTest(ExecutorTestBase):
+    def test_predict(self):
+        history = pd.DataFrame(
+            {
+                "x": np.linspace(0, 1, 11),
+                "name": ["a"] * 11,
+                "required_wallclock_time": np.exp(np.linspace(0, 1, 11)),
+            }
+        )
+        predictor = RuntimePredictor(history, nr_neighbors=1)
+
+        points = pd.DataFrame({"x": [0.9, 0.1, 0.5], "name": ["b"] * 3})
+        np.testing.assert_allclose(predictor.predict(points), np.exp([0.9, 0.1, 0.5]))
+
+        # longest predicted run first
+        executor = DynamicPoolExecutor(runtime_predictor=predictor)
+        self.assertEqual(executor._order(predictor.predict(points), 3), [0, 2, 1])
+
+        with self.assertRaises(ValueError):
+            RuntimePredictor(history.assign(required_wallclock_time=np.nan))
+
+    def test_from_metainfo(self):
+        setup = self._setup(FakeVadereModel(self.log_path, fail_speeds=[4.0]))
+        setup.run(njobs=1)
+
+        predictor = RuntimePredictor.from_metainfo(setup.env_path)
+
+        # the failed run is not part of the history
+        self.assertEqual(predictor.history.shape[0], 3)
+        self.assertIn("speedDistributionMean", predictor.history.columns)
+
+
+class DynamicPoolExecutorTest(ExecutorTestBase):
+    def test_requeue_after_out_of_memory(self):
+        for return_code, stderr in [(137, b""), (1, b"java.lang.OutOfMemoryError")]:
+            with self.subTest(return_code=return_code):
+                self.log_path = os.path.join(self.folder.name, f"{return_code}.log")
+                admission = MemoryAdmission(run_bytes=1, reserve_bytes=0)
+                executor = DynamicPoolExecutor(njobs=2, admission=admission)
+
+                model = FlakyModel(self.log_path, return_code, stderr)
+                setup = self._setup(model, output_folder=f"env_{return_code}")
+                meta_info, _ = setup.run(executor=executor)
+
+                self.assertEqual(self._nr_calls(), 8)
+                self.assertTrue((meta_info["MetaInfo", "return_code"] == 0).all())
+                self.assertAlmostEqual(admission.estimate(), 1.5**4)
+
+    def test_requeue_exhaustion(self):
+        executor = DynamicPoolExecutor(njobs=2, max_requeues=1)
+        model = FlakyModel(self.log_path, return_code=137, nr_failures=3)
+        meta_info, _ = self._setup(model, values=[1.0]).run(executor=executor)
+
+        self.assertEqual(self._nr_calls(), 2)
+        self.assertEqual(meta_info["MetaInfo", "return_code"].iloc[0], 137)
+
+    def test_speculation(self):
+        setup = self._setup(StragglerModel(self.log_path), lazy_scenarios=True)
+        executor = DynamicPoolExecutor(njobs=2, speculation_factor=2, min_finished=3)
+
+        start = time.time()
+        meta_info, data = setup.run(executor=executor)
+
+        # the speculative copy of the straggler finished first
+        self.assertLess(time.time() - start, 60)
+        self.assertTrue((meta_info["MetaInfo", "return_code"] == 0).all())
+        np.testing.assert_allclose(
+            data.xs(1, level="pedestrianId").iloc[:, 0], [10, 5, 10 / 3, 2.5]
+        )
+
+        # the copy ran its own scenario file
+        names = [name for name, speed in FakeVadereModel.read_log(self.log_path)]
+        self.assertEqual(len(names), 5)
+        self.assertEqual(len([n for n in names if "_speculative" in n]), 1)
+
+        # the output was moved to the original folder, no scenario file is left
+        item = setup.request_item_list[0]
+        self.assertTrue(
+            os.path.isfile(os.path.join(item.output_path, Request.COMPLETION_MARKER))
+        )
+        output_folder = setup.env_man.get_env_outputfolder_path()
+        self.assertEqual(glob.glob(os.path.join(output_folder, "*_speculative*")), [])
+        self.assertEqual(glob.glob(os.path.join(output_folder, "*.scenario*")), [])
+
+
+class MultiHostExecutorTest(ExecutorTestBase):
+    def test_local_hosts(self):
+        executor = MultiHostExecutor(
+            [LocalHostRunner(njobs=1, name="a"), LocalHostRunner(njobs=2, name="b")]
+        )
+        meta_info, data = self._setup(FakeVadereModel(self.log_path)).run(
+            executor=executor
+        )
+
+        self.assertEqual(self._nr_calls(), 4)
+        self.assertTrue((meta_info["MetaInfo", "return_code"] == 0).all())
+        np.testing.assert_allclose(
+            data.xs(1, level="pedestrianId").iloc[:, 0], [10, 5, 10 / 3, 2.5]
+        )
+
+    def test_retry_on_other_host(self):
+        executor = MultiHostExecutor(
+            [BrokenHostRunner("broken", njobs=1), LocalHostRunner(njobs=1)]
+        )
+        meta_info, _ = self._setup(FakeVadereModel(self.log_path)).run(
+            executor=executor
+        )
+
+        self.assertEqual(self._nr_calls(), 4)
+        self.assertTrue((meta_info["MetaInfo", "return_code"] == 0).all())
+
+    def test_max_attempts(self):
+        executor = MultiHostExecutor(
+            [LocalHostRunner(name="a"), LocalHostRunner(name="b")], max_attempts=2
+        )
+        model = FakeVadereModel(self.log_path, fail_speeds=[2.0])
+        meta_info, _ = self._setup(model).run(executor=executor)
+
+        # the failed run was tried once on each host
+        self.assertEqual(self._nr_calls(2.0), 2)
+        np.testing.assert_array_equal(
+            meta_info["MetaInfo", "return_code"], [0, 1, 0, 0]
+        )
+
+        with self.assertRaises(ValueError):
+            MultiHostExecutor([LocalHostRunner(name="a"), LocalHostRunner(name="a")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import glob
+import json
+import os
+import shutil
+import time
+
+from suqc.environment import CoupledConsoleWrapper, VadereConsoleWrapper
+
+BASIS_SCENARIO = os.path.join(os.path.dirname(__file__), "basis.scenario")
+
+
+class FakeVadereModel(VadereConsoleWrapper):
+    """Writes the output files of the basis scenario without running Vadere. The values
+    depend on the pedestrian speed ("speedDistributionMean") of the scenario.
+
+    Each call is logged as one line in log_path (also from worker processes). Subclasses
+    can change the run time and return code of a call with `run_time` and `result`,
+    depending on the number of previous calls with the same speed."""
+
+    def __init__(self, log_path=None, fail_speeds=()):
+        # the module file stands in for the .jar file
+        super(FakeVadereModel, self).__init__(model_path=__file__)
+        self.log_path = log_path
+        self.fail_speeds = list(fail_speeds)
+
+    @staticmethod
+    def read_speed(scenario_fp):
+        with open(scenario_fp, "r") as f:
+            scenario = json.load(f)
+        return scenario["scenario"]["topography"]["attributesPedestrian"][
+            "speedDistributionMean"
+        ]
+
+    @staticmethod
+    def read_log(log_path):
+        """Returns the list of calls (scenario file name, speed)."""
+        if log_path is None or not os.path.isfile(log_path):
+            return list()
+
+        with open(log_path, "r") as f:
+            lines = [line.split() for line in f]
+        return [(name, float(speed)) for name, speed in lines]
+
+    @classmethod
+    def nr_calls(cls, log_path, speed=None):
+        return len([c for c in cls.read_log(log_path) if speed in (None, c[1])])
+
+    def run_time(self, speed, nr_previous_calls):
+        return 0.0
+
+    def result(self, speed, nr_previous_calls):
+        """Return code and stderr of the call."""
+        if speed in self.fail_speeds:
+            return 1, b"failed"
+        return 0, None
+
+    def run_simulation(self, scenario_fp, output_path):
+        start = time.time()
+        speed = self.read_speed(scenario_fp)
+        nr_previous_calls = self.nr_calls(self.log_path, speed)
+
+        if self.log_path is not None:
+            with open(self.log_path, "a") as f:
+                f.write(f"{os.path.basename(scenario_fp)} {speed}\n")
+
+        time.sleep(self.run_time(speed, nr_previous_calls))
+
+        return_code, stderr = self.result(speed, nr_previous_calls)
+        if return_code != 0:
+            return return_code, time.time() - start, {"stdout": b"", "stderr": stderr}
+
+        os.makedirs(output_path, exist_ok=True)
+        with open(os.path.join(output_path, "evacuationTimes.txt"), "w") as f:
+            f.write("#IDXCOL=1,DATACOL=1,SEP=' '\n")
+            f.write("pedestrianId evacuationTime-PID1\n")
+            for i in range(1, 4):
+                f.write(f"{i} {10 * i / speed}\n")
+
+        with open(os.path.join(output_path, "postvis.traj"), "w") as f:
+            f.write("#IDXCOL=2,DATACOL=2,SEP=' '\n")
+            f.write("timeStep pedestrianId x-PID2 y-PID2\n")
+            for t in range(1, 3):
+                f.write(f"{t} 1 {t * speed} 1.0\n")
+
+        return 0, time.time() - start, None
+
+
+class FakeCoupledModel(CoupledConsoleWrapper):
+    """Writes the QoI file "evacuationTimes.txt" of a coupled run without running the
+    simulators (the values depend on the pedestrian speed of the Vadere scenario). Runs
+    with a speed in `crash_speeds` raise an exception (e.g. a lost container)."""
+
+    def __init__(self, crash_speeds=()):
+        super(FakeCoupledModel, self).__init__(model="Coupled")
+        self.crash_speeds = list(crash_speeds)
+
+    def run_simulation(self, dirname, start_file, required_files):
+        start = time.time()
+        scenario_fp = glob.glob(
+            os.path.join(dirname, "**", "*.scenario"), recursive=True
+        )
+        speed = FakeVadereModel.read_speed(scenario_fp[0])
+
+        if speed in self.crash_speeds:
+            raise RuntimeError("simulation crashed")
+
+        # the output is written to a subfolder with a copy of the scenario
+        output_path = os.path.join(dirname, "results", "vadere.d")
+        os.makedirs(output_path)
+        shutil.copy(scenario_fp[0], output_path)
+
+        with open(os.path.join(output_path, "evacuationTimes.txt"), "w") as f:
+            f.write("#IDXCOL=1,DATACOL=1,SEP=' '\n")
+            f.write("pedestrianId evacuationTime-PID1\n")
+            for i in range(1, 4):
+                f.write(f"{i} {10 * i / speed}\n")
+
+        return 0, time.time() - start, None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from suqc.qoi import QuantityOfInterest
+
+
+class QoiReadTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.output_path = self.folder.name
+
+        rng = np.random.default_rng(1)
+        self.values = rng.random((200, 2)) * 1e3
+
+        lines = ["#IDXC=2 DATAC=2 ROW=2", "timeStep pedestrianId x-PID1 y-PID1"]
+        for i, (x, y) in enumerate(self.values):
+            if i == 100:
+                lines.append("# comment inside the data")
+            lines.append(f"{i // 10 + 1} {i % 10 + 1} {x!r} {y!r}")
+
+        with open(os.path.join(self.output_path, "out.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _read(self, **read_options):
+        qoi = QuantityOfInterest("out.txt", **read_options)
+        return qoi.read_and_extract_qois(3, 0, self.output_path)["out.txt"]
+
+    def test_c_engine(self):
+        df = self._read()
+
+        self.assertEqual(QuantityOfInterest("out.txt").engine, "c")
+        self.assertEqual(
+            list(df.index.names), ["id", "run_id", "timeStep", "pedestrianId"]
+        )
+        self.assertEqual(df.shape, (200, 2))
+
+        # identical to the plain pandas call
+        baseline = pd.read_csv(
+            os.path.join(self.output_path, "out.txt"),
+            delimiter=" ",
+            header=[0],
+            comment="#",
+        )
+        np.testing.assert_array_equal(df.to_numpy(), baseline.iloc[:, 2:].to_numpy())
+        np.testing.assert_allclose(df.to_numpy(), self.values, rtol=1e-15)
+
+        df = self._read(usecols=["y"])
+        self.assertEqual(list(df.columns), ["y-PID1"])
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "requires pyarrow")
+    def test_pyarrow_engine(self):
+        expected = self._read()
+        df = self._read(engine="pyarrow")
+
+        # the comment line is skipped, floats may differ in the last digit
+        pd.testing.assert_frame_equal(df, expected, check_exact=False, rtol=1e-13)
+
+        df = self._read(engine="pyarrow", usecols=["x"], dtype_hints=True)
+        self.assertEqual(df.shape, (200, 1))
+        self.assertEqual(df["x-PID1"].dtype, np.float32)
+
+    def test_leading_comment_lines(self):
+        expected = self._read()
+
+        filepath = os.path.join(self.output_path, "out.txt")
+        with open(filepath, "r") as f:
+            content = f.read()
+        with open(filepath, "w") as f:
+            f.write("# written by a post-processing step\n" + content)
+
+        # all leading comment lines are skipped (and the meta-data line is found)
+        pd.testing.assert_frame_equal(self._read(), expected)
+
+        baseline = pd.read_csv(filepath, delimiter=" ", header=[0], comment="#")
+        np.testing.assert_array_equal(
+            expected.to_numpy(), baseline.iloc[:, 2:].to_numpy()
+        )
+
+    def test_schema_cache(self):
+        QuantityOfInterest._create_schema.cache_clear()
+        self._read()
+        self._read()
+
+        info = QuantityOfInterest._create_schema.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+        self.assertEqual(info.maxsize, QuantityOfInterest.SCHEMA_CACHE_SIZE)
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            QuantityOfInterest("out.txt", engine="auto")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from suqc.remote import IncrementalOutputTransfer
+from suqc.request import Request
+
+
+class LocalConnection(object):
+    """Stands in for a fabric Connection, the commands run on the local machine."""
+
+    def run(self, cmd, hide=False, warn=False):
+        result = subprocess.run(["bash", "-c", cmd], capture_output=True, text=True)
+
+        if result.returncode != 0 and not warn:
+            raise RuntimeError(f"Command {cmd} failed: {result.stderr}")
+        return SimpleNamespace(stdout=result.stdout, ok=result.returncode == 0)
+
+    def put(self, local, remote):
+        with open(remote, "wb") as f:
+            f.write(local.read())
+
+    def get(self, remote, local):
+        shutil.copy(remote, local)
+
+
+class IncrementalOutputTransferTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.remote_path = os.path.join(self.folder.name, "remote")
+        self.local_path = os.path.join(self.folder.name, "local")
+        self.connection = LocalConnection()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _write(self, base_path, relpath, content):
+        filepath = os.path.join(base_path, relpath)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "w") as f:
+            f.write(content)
+
+    def _write_run(self, name, completed):
+        self._write(self.remote_path, os.path.join(name, "out.txt"), f"{name} output")
+        self._write(self.remote_path, os.path.join(name, "model.jar"), "jar")
+        if completed:
+            self._write(
+                self.remote_path, os.path.join(name, Request.COMPLETION_MARKER), ""
+            )
+
+    def _read_local(self, relpath):
+        with open(os.path.join(self.local_path, relpath), "r") as f:
+            return f.read()
+
+    def _transfer(self):
+        return IncrementalOutputTransfer(
+            self.connection,
+            self.remote_path,
+            self.local_path,
+            completion_marker=Request.COMPLETION_MARKER,
+        )
+
+    def test_completed_runs(self):
+        self._write_run("1_0_output", completed=True)
+        self._write_run("2_0_output", completed=False)
+        transfer = self._transfer()
+
+        # output file and completion marker of the finished run
+        self.assertEqual(transfer.sync(), 2)
+        self.assertEqual(
+            self._read_local(os.path.join("1_0_output", "out.txt")), "1_0_output output"
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.local_path, "2_0_output")))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.local_path, "1_0_output", "model.jar"))
+        )
+
+        # nothing new
+        self.assertEqual(transfer.sync(), 0)
+
+        self._write(
+            self.remote_path, os.path.join("2_0_output", Request.COMPLETION_MARKER), ""
+        )
+        self.assertEqual(transfer.sync(), 2)
+        self.assertEqual(
+            self._read_local(os.path.join("2_0_output", "out.txt")), "2_0_output output"
+        )
+
+        # no archive is left behind
+        for path in [self.remote_path, self.local_path]:
+            self.assertEqual(
+                [f for f in os.listdir(path) if f.startswith(transfer.ARCHIVE_NAME)], []
+            )
+
+    def test_identical_files_are_skipped(self):
+        self._write_run("1_0_output", completed=True)
+        self._write(self.remote_path, "info.txt", "environment info")
+        self._write(self.remote_path, "arguments.p", "pickle")
+
+        # already transferred in a previous (failed) attempt
+        self._write(
+            self.local_path, os.path.join("1_0_output", "out.txt"), "1_0_output output"
+        )
+
+        transfer = self._transfer()
+        self.assertEqual(transfer.sync(completed_only=False), 2)  # marker and info.txt
+        self.assertEqual(self._read_local("info.txt"), "environment info")
+        self.assertFalse(os.path.exists(os.path.join(self.local_path, "arguments.p")))
+
+        # a changed file is transferred again
+        self._write(self.remote_path, "info.txt", "changed")
+        self.assertEqual(transfer.sync(completed_only=False), 1)
+        self.assertEqual(self._read_local("info.txt"), "changed")
+
+    def test_compressors(self):
+        for compressor in ["zstd", "gzip"]:
+            if shutil.which(compressor) is None:
+                continue
+
+            with self.subTest(compressor=compressor):
+                name = f"run_{compressor}"
+                self._write_run(name, completed=True)
+
+                transfer = self._transfer()
+                transfer.compressor = compressor
+                self.assertEqual(transfer.sync(), 2)
+                self.assertEqual(
+                    self._read_local(os.path.join(name, "out.txt")), f"{name} output"
+                )
+
+        # the first compressor available on both machines
+        transfer = self._transfer()
+        available = [c for c in transfer.COMPRESSORS if shutil.which(c) is not None]
+        self.assertEqual(transfer._select_compressor(), available[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,683 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from suqc.adaptive import AdaptiveSampling, request_batch_runner
+from suqc.cache import SimulationCache
+from suqc.journal import ResultJournal
+from suqc.parameter.postchanges import ChangeRandomNumber, PostScenarioChangesBase
+from suqc.parameter.sampling import Parameter
+from suqc.request import (
+    EXISTING_OUTPUT_CACHE,
+    EXISTING_OUTPUT_CACHE_VERSION,
+    CoupledDictVariation,
+    Request,
+    SingleExistScenario,
+    SingleKeyVariation,
+    _read_existing_file,
+    read_from_existing_output,
+)
+from suqc.tracing import Tracer
+from suqc.tests.fake_model import BASIS_SCENARIO, FakeCoupledModel, FakeVadereModel
+from suqc.utils.scenario_template import SCENARIO_FORMATS, materialize_scenario
+
+
+class RaisingModel(FakeVadereModel):
+    def run_simulation(self, scenario_fp, output_path):
+        raise RuntimeError("simulation crashed")
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.folder.name, "calls.log")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _run(self, values, resume, output_folder="env", **kwargs):
+        setup = SingleKeyVariation(
+            scenario_path=BASIS_SCENARIO,
+            key="speedDistributionMean",
+            values=values,
+            qoi="evacuationTimes.txt",
+            model=FakeVadereModel(log_path=self.log_path),
+            output_path=self.folder.name,
+            output_folder=output_folder,
+            resume=resume,
+            **kwargs,
+        )
+        _, data = setup.run(njobs=1)
+        return setup, data
+
+    def _nr_calls(self):
+        return FakeVadereModel.nr_calls(self.log_path)
+
+    @staticmethod
+    def _first_values(data):
+        # evacuation time of the first pedestrian (10 / speed) per parameter id
+        return data.xs(1, level="pedestrianId").iloc[:, 0].to_numpy()
+
+    def test_resume_skips_completed_runs(self):
+        setup, data = self._run([1.0, 2.0, 4.0], resume=False)
+        self.assertEqual(self._nr_calls(), 3)
+
+        # interrupted sweep: the last run did not finish
+        item = setup.request_item_list[2]
+        os.remove(os.path.join(item.output_path, Request.COMPLETION_MARKER))
+
+        _, resumed = self._run([1.0, 2.0, 4.0], resume=True)
+        self.assertEqual(self._nr_calls(), 4)
+        self.assertTrue(resumed.equals(data))
+
+    def test_resume_changed_grid(self):
+        for lazy_scenarios in [False, True]:
+            with self.subTest(lazy_scenarios=lazy_scenarios):
+                kwargs = dict(
+                    output_folder=f"env_{lazy_scenarios}",
+                    lazy_scenarios=lazy_scenarios,
+                    retain_scenarios=True,
+                )
+                calls = self._nr_calls()
+
+                self._run([1.0, 2.0, 4.0], resume=False, **kwargs)
+                setup, data = self._run([1.0, 2.0, 5.0], resume=True, **kwargs)
+
+                # only the run of the changed parameter value is carried out again
+                self.assertEqual(self._nr_calls() - calls, 4)
+                np.testing.assert_allclose(self._first_values(data), [10, 5, 2])
+
+                scenario_path = setup.request_item_list[2].scenario_path
+                self.assertEqual(FakeVadereModel.read_speed(scenario_path), 5.0)
+
+    def test_resume_changed_basis_scenario(self):
+        self._run([1.0, 2.0], resume=False)
+
+        setup = SingleKeyVariation(
+            scenario_path=BASIS_SCENARIO,
+            key="speedDistributionStandardDeviation",
+            values=[0.1, 0.2],
+            qoi="evacuationTimes.txt",
+            model=FakeVadereModel(log_path=self.log_path),
+            output_path=self.folder.name,
+            output_folder="env",
+            resume=True,
+        )
+        setup.run(njobs=1)
+        self.assertEqual(self._nr_calls(), 4)
+
+    def test_resume_changed_post_changes(self):
+        def post_changes(seed):
+            changes = PostScenarioChangesBase(apply_default=True)
+            random_number = ChangeRandomNumber(fixed=True)
+            random_number.set_fixed_random_nr(seed)
+            changes.add_scenario_change(random_number)
+            return changes
+
+        self._run([1.0, 2.0], resume=False, post_changes=post_changes(1))
+        self._run([1.0, 2.0], resume=True, post_changes=post_changes(1))
+        self.assertEqual(self._nr_calls(), 2)
+
+        # other seed: the finished runs are stale
+        self._run([1.0, 2.0], resume=True, post_changes=post_changes(2))
+        self.assertEqual(self._nr_calls(), 4)
+
+        self._run([1.0, 2.0], resume=True)
+        self.assertEqual(self._nr_calls(), 6)
+
+
+class SimulationCacheTest(unittest.TestCase):
+    def test_sweep_reads_cached_runs(self):
+        with tempfile.TemporaryDirectory() as folder:
+            log_path = os.path.join(folder, "calls.log")
+            cache = SimulationCache(os.path.join(folder, "cache"))
+
+            def run(values, output_folder):
+                setup = SingleKeyVariation(
+                    scenario_path=BASIS_SCENARIO,
+                    key="speedDistributionMean",
+                    values=values,
+                    qoi="evacuationTimes.txt",
+                    model=FakeVadereModel(log_path=log_path),
+                    output_path=folder,
+                    output_folder=output_folder,
+                    cache=cache,
+                )
+                return setup.run(njobs=1)
+
+            run([1.0, 2.0], "env1")
+            self.assertEqual(FakeVadereModel.nr_calls(log_path), 2)
+
+            # another sweep (environment): only the new parameter value is simulated
+            meta_info, cached = run([2.0, 1.0, 4.0], "env2")
+            self.assertEqual(FakeVadereModel.nr_calls(log_path), 3)
+            self.assertEqual(FakeVadereModel.nr_calls(log_path, 4.0), 1)
+
+            self.assertTrue((meta_info["MetaInfo", "return_code"] == 0).all())
+            np.testing.assert_allclose(
+                cached.xs(1, level="pedestrianId").iloc[:, 0], [5, 10, 2.5]
+            )
+
+
+class ScenarioFormatTest(unittest.TestCase):
+    def test_formats_give_identical_scenarios(self):
+        with tempfile.TemporaryDirectory() as folder:
+            scenarios, results = dict(), dict()
+
+            for scenario_format in SCENARIO_FORMATS:
+                setup = SingleKeyVariation(
+                    scenario_path=BASIS_SCENARIO,
+                    key="speedDistributionMean",
+                    values=[1.0, 2.0],
+                    qoi="evacuationTimes.txt",
+                    model=FakeVadereModel(),
+                    output_path=folder,
+                    output_folder=scenario_format,
+                    scenario_format=scenario_format,
+                    retain_scenarios=True,
+                )
+                _, results[scenario_format] = setup.run(njobs=1)
+
+                scenario_path = setup.request_item_list[1].scenario_path
+                materialize_scenario(scenario_path)  # no-op for indent and compact
+                with open(scenario_path, "r") as f:
+                    scenarios[scenario_format] = json.load(f)
+
+            for scenario_format in ["compact", "overlay"]:
+                self.assertEqual(scenarios[scenario_format], scenarios["indent"])
+                self.assertTrue(results[scenario_format].equals(results["indent"]))
+
+            self.assertEqual(FakeVadereModel.read_speed(scenario_path), 2.0)
+
+
+class AdaptiveSamplingTest(unittest.TestCase):
+    @staticmethod
+    def _max_evacuation_time(data):
+        return data.groupby(["id", "run_id"]).max().iloc[:, 0]
+
+    def test_request_batch_runner(self):
+        with tempfile.TemporaryDirectory() as folder:
+            log_path = os.path.join(folder, "calls.log")
+            run_batch = request_batch_runner(
+                scenario_path=BASIS_SCENARIO,
+                model=FakeVadereModel(log_path=log_path, fail_speeds=[2.0]),
+                qoi="evacuationTimes.txt",
+                qoi_reduction=self._max_evacuation_time,
+                scenario_runs=2,
+                output_path=folder,
+            )
+
+            points = pd.DataFrame({"speedDistributionMean": [1.0, 2.0, 4.0]})
+            values = run_batch(points)
+
+            # the mean of the runs (maximum evacuation time 30 / speed), NaN if failed
+            np.testing.assert_allclose(values, [30, np.nan, 7.5])
+            self.assertEqual(FakeVadereModel.nr_calls(log_path), 6)
+
+            # each batch is a new environment
+            run_batch(points.iloc[:1])
+            self.assertTrue(os.path.isdir(os.path.join(folder, "adaptive_batch1")))
+
+            sampling = AdaptiveSampling(
+                [Parameter("speedDistributionMean", range=[3.0, 4.0])],
+                run_batch,
+                nr_initial=4,
+                batch_size=2,
+                seed=1,
+            )
+            result = sampling.run(max_points=6)
+            np.testing.assert_allclose(
+                result["qoi"], 30 / result["speedDistributionMean"]
+            )
+
+
+class TracingTest(unittest.TestCase):
+    def test_spans_of_worker_processes(self):
+        with tempfile.TemporaryDirectory() as folder:
+            setup = SingleKeyVariation(
+                scenario_path=BASIS_SCENARIO,
+                key="speedDistributionMean",
+                values=[1.0, 2.0, 3.0, 4.0],
+                qoi="evacuationTimes.txt",
+                model=FakeVadereModel(),
+                output_path=folder,
+                output_folder="env",
+            )
+
+            with Tracer() as tracer:
+                setup.run(njobs=2)
+
+        summary = tracer.summary()
+        self.assertEqual(summary.loc["simulation", "count"], 4)
+        self.assertEqual(summary.loc["runs", "count"], 1)
+        self.assertIn("compile_qoi", summary.index)
+
+        # the simulations ran in the worker processes
+        pids = {e["pid"] for e in tracer.events if e["name"] == "simulation"}
+        self.assertNotIn(os.getpid(), pids)
+
+
+class ScratchOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.scratch_path = os.path.join(self.folder.name, "scratch")
+        os.mkdir(self.scratch_path)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _run(self, **kwargs):
+        kwargs.setdefault("scratch_path", self.scratch_path)
+        setup = SingleKeyVariation(
+            scenario_path=BASIS_SCENARIO,
+            key="speedDistributionMean",
+            values=[1.0, 2.0],
+            qoi="evacuationTimes.txt",
+            model=FakeVadereModel(fail_speeds=[2.0]),
+            output_path=self.folder.name,
+            output_folder="env",
+            **kwargs,
+        )
+        meta_info, data = setup.run(njobs=1)
+        return setup, meta_info, data
+
+    def _output_files(self, setup, index):
+        return sorted(os.listdir(setup.request_item_list[index].output_path))
+
+    def test_requested_files_are_retained(self):
+        setup, meta_info, data = self._run()
+
+        np.testing.assert_array_equal(meta_info["MetaInfo", "return_code"], [0, 1])
+        np.testing.assert_allclose(data.iloc[:, 0], [10, 20, 30])
+
+        self.assertEqual(
+            self._output_files(setup, 0),
+            sorted([Request.COMPLETION_MARKER, "evacuationTimes.txt"]),
+        )
+        # the console output of the failed run is written to the output folder
+        self.assertIn("stderr_on_error.txt", self._output_files(setup, 1))
+
+        self.assertEqual(os.listdir(self.scratch_path), [])
+
+    def test_retain_output_patterns(self):
+        setup, _, data = self._run(retain_output=["*.traj"])
+
+        # the QoI is read from the scratch folder before the output is retained
+        np.testing.assert_allclose(data.iloc[:, 0], [10, 20, 30])
+        self.assertEqual(
+            self._output_files(setup, 0),
+            sorted([Request.COMPLETION_MARKER, "postvis.traj"]),
+        )
+        self.assertEqual(os.listdir(self.scratch_path), [])
+
+    def test_invalid_scratch_path(self):
+        with self.assertRaises(ValueError):
+            self._run(scratch_path=os.path.join(self.folder.name, "missing"))
+
+
+class SharedMemoryTest(unittest.TestCase):
+    def test_same_data_as_pickled_results(self):
+        with tempfile.TemporaryDirectory() as folder:
+            results = list()
+            for shared_memory in [False, True]:
+                setup = SingleKeyVariation(
+                    scenario_path=BASIS_SCENARIO,
+                    key="speedDistributionMean",
+                    values=[1.0, 2.0, 3.0, 4.0],
+                    qoi=["evacuationTimes.txt", "postvis.traj"],
+                    model=FakeVadereModel(fail_speeds=[3.0]),
+                    output_path=folder,
+                    output_folder=f"env_{shared_memory}",
+                )
+                results.append(setup.run(njobs=2, shared_memory=shared_memory)[1])
+
+        for filename in ["evacuationTimes.txt", "postvis.traj"]:
+            pd.testing.assert_frame_equal(results[1][filename], results[0][filename])
+        self.assertEqual(results[1]["evacuationTimes.txt"].shape, (9, 1))
+
+    def test_existing_scenario(self):
+        with tempfile.TemporaryDirectory() as folder:
+            results = list()
+            for shared_memory in [False, True]:
+                setup = SingleExistScenario(
+                    path_scenario=BASIS_SCENARIO,
+                    qoi="evacuationTimes.txt",
+                    model=FakeVadereModel(),
+                    scenario_runs=2,
+                    output_path=folder,
+                    output_folder=f"env_{shared_memory}",
+                )
+                results.append(setup.run(njobs=2, shared_memory=shared_memory)[0])
+
+        pd.testing.assert_frame_equal(results[1], results[0])
+        self.assertEqual(results[1].shape, (6, 1))
+
+
+class ExistingOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        setup = SingleKeyVariation(
+            scenario_path=BASIS_SCENARIO,
+            key="speedDistributionMean",
+            values=[1.0, 2.0, 4.0],
+            qoi="evacuationTimes.txt",
+            model=FakeVadereModel(),
+            output_path=self.folder.name,
+            output_folder="env",
+        )
+        _, self.data = setup.run(njobs=1)
+
+        self.env_path = setup.env_man.env_path
+
+        # read_from_existing_output expects a metainfo.csv with a single header row
+        pd.DataFrame(
+            {"id": [0, 1, 2], "run_id": [0, 0, 0], "return_code": [0, 0, 0]}
+        ).to_csv(os.path.join(self.env_path, "metainfo.csv"), index=False)
+        self.output_path = os.path.join(self.env_path, "vadere_output")
+        self.cache_path = os.path.join(
+            self.env_path, EXISTING_OUTPUT_CACHE.format("evacuationTimes.txt")
+        )
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _segments(self):
+        return sorted(f for f in os.listdir(self.cache_path) if f.startswith("segment"))
+
+    def _read(self, **kwargs):
+        """Returns the data and the number of parsed files (only counted for njobs=1,
+        the mock cannot be passed to worker processes)."""
+        with mock.patch(
+            "suqc.request._read_existing_file", wraps=_read_existing_file
+        ) as read_file:
+            data, meta_data = read_from_existing_output(
+                self.env_path, "evacuationTimes.txt", **kwargs
+            )
+        return data, meta_data, read_file.call_count
+
+    def _add_run(self, parameter_id):
+        # another run folder, e.g. from a sweep that is continued
+        shutil.copytree(
+            os.path.join(self.output_path, "2_0_output"),
+            os.path.join(self.output_path, f"{parameter_id}_0_output"),
+        )
+
+    def _assert_added_runs(self, data, resumed, parameter_ids):
+        pd.testing.assert_frame_equal(resumed.loc[:2], data)
+        for parameter_id in parameter_ids:
+            pd.testing.assert_frame_equal(
+                resumed.loc[parameter_id].reset_index(drop=True),
+                data.loc[2].reset_index(drop=True),
+            )
+
+    def test_parallel_read(self):
+        data, meta_data = read_from_existing_output(
+            self.env_path, "evacuationTimes.txt", njobs=2
+        )
+
+        self.assertEqual(sorted(set(data.index)), [(0, 0), (1, 0), (2, 0)])
+        np.testing.assert_allclose(
+            data.iloc[:, 1].to_numpy(), self.data.iloc[:, 0].to_numpy()
+        )
+        self.assertEqual(list(meta_data.index), [(0, 0), (1, 0), (2, 0)])
+        self.assertEqual(self._segments(), ["segment_0.p"])
+
+        # same data from the cache
+        cached, _, nr_read = self._read()
+        self.assertEqual(nr_read, 0)
+        pd.testing.assert_frame_equal(cached, data)
+
+        # parallel read of the new runs only
+        self._add_run(3)
+        self._add_run(4)
+        resumed, _ = read_from_existing_output(
+            self.env_path, "evacuationTimes.txt", njobs=2
+        )
+        self._assert_added_runs(data, resumed, [3, 4])
+
+    def test_resume_with_new_run(self):
+        data, _, nr_read = self._read()
+        self.assertEqual(nr_read, 3)
+
+        # only the file of the new run is read, its data is stored in a new segment
+        segment_path = os.path.join(self.cache_path, "segment_0.p")
+        mtime = os.stat(segment_path).st_mtime_ns
+
+        self._add_run(3)
+        resumed, _, nr_read = self._read()
+        self.assertEqual(nr_read, 1)
+        self.assertEqual(self._segments(), ["segment_0.p", "segment_1.p"])
+        self.assertEqual(os.stat(segment_path).st_mtime_ns, mtime)
+        self._assert_added_runs(data, resumed, [3])
+
+        cached, _, nr_read = self._read()
+        self.assertEqual(nr_read, 0)
+        pd.testing.assert_frame_equal(cached, resumed)
+
+        # removed runs: the segments are consolidated
+        shutil.rmtree(os.path.join(self.output_path, "3_0_output"))
+        removed, _, nr_read = self._read()
+        self.assertEqual(nr_read, 0)
+        self.assertEqual(self._segments(), ["segment_2.p"])
+        pd.testing.assert_frame_equal(removed, data)
+
+    def test_consolidate_segments(self):
+        data, _, _ = self._read()
+
+        with mock.patch("suqc.request.EXISTING_OUTPUT_MAX_SEGMENTS", 2):
+            self._add_run(3)
+            self._read()
+            self.assertEqual(len(self._segments()), 2)
+
+            self._add_run(4)
+            resumed, _, nr_read = self._read()
+
+        self.assertEqual(nr_read, 1)
+        self.assertEqual(self._segments(), ["segment_2.p"])
+        self._assert_added_runs(data, resumed, [3, 4])
+
+        cached, _, nr_read = self._read()
+        self.assertEqual(nr_read, 0)
+        pd.testing.assert_frame_equal(cached, resumed)
+
+    def test_changed_file_and_version(self):
+        self._read()
+
+        filepath = os.path.join(self.output_path, "0_0_output", "evacuationTimes.txt")
+        with open(filepath, "a") as f:
+            f.write("4 40.0\n")
+
+        data, _, nr_read = self._read()
+        self.assertEqual(nr_read, 1)
+        self.assertEqual(data.loc[0].shape[0], 4)
+        self.assertEqual(len(self._segments()), 1)
+
+        # a cache of another format version is rebuilt
+        with mock.patch(
+            "suqc.request.EXISTING_OUTPUT_CACHE_VERSION",
+            EXISTING_OUTPUT_CACHE_VERSION + 1,
+        ):
+            rebuilt, _, nr_read = self._read()
+        self.assertEqual(nr_read, 3)
+        pd.testing.assert_frame_equal(rebuilt, data)
+
+        # other settings are not taken from the cache
+        data, _, nr_read = self._read(extract_ids=False)
+        self.assertEqual(nr_read, 3)
+        self.assertEqual(sorted(set(data.index)), [0, 1, 2])
+
+    def test_without_cache(self):
+        # cache files of previous format versions
+        with open(f"{self.cache_path}.p", "wb") as f:
+            f.write(b"single cache file")
+        os.makedirs(self.cache_path)
+        with open(os.path.join(self.cache_path, "entry.p"), "wb") as f:
+            f.write(b"cache file per run")
+
+        data, _, nr_read = self._read(use_cache=False)
+        self.assertEqual(nr_read, 3)
+        self.assertEqual(data.shape[0], 9)
+        self.assertEqual(os.listdir(self.cache_path), ["entry.p"])
+
+        self._read()
+        self.assertFalse(os.path.exists(f"{self.cache_path}.p"))
+        self.assertEqual(
+            sorted(os.listdir(self.cache_path)), ["manifest.p", "segment_0.p"]
+        )
+
+
+class LazyScenarioTest(unittest.TestCase):
+    def test_scenario_removed_if_run_raises(self):
+        for scenario_format in ["indent", "overlay"]:
+            with tempfile.TemporaryDirectory() as folder:
+                setup = SingleKeyVariation(
+                    scenario_path=BASIS_SCENARIO,
+                    key="speedDistributionMean",
+                    values=[1.0],
+                    qoi="evacuationTimes.txt",
+                    model=RaisingModel(),
+                    output_path=folder,
+                    output_folder="env",
+                    scenario_format=scenario_format,
+                    lazy_scenarios=scenario_format == "indent",
+                )
+
+                with self.assertRaises(RuntimeError):
+                    setup.run(njobs=1)
+
+                scenario_path = setup.request_item_list[0].scenario_path
+                self.assertFalse(os.path.exists(scenario_path))
+
+    def test_unsupported_variation(self):
+        # the scenarios of coupled variations are all created before the runs
+        self.assertFalse(CoupledDictVariation.SUPPORTS_LAZY_SCENARIOS)
+
+        with tempfile.TemporaryDirectory() as folder:
+            with mock.patch.object(
+                SingleKeyVariation, "SUPPORTS_LAZY_SCENARIOS", False
+            ):
+                with self.assertRaises(ValueError):
+                    SingleKeyVariation(
+                        scenario_path=BASIS_SCENARIO,
+                        key="speedDistributionMean",
+                        values=[1.0],
+                        qoi="evacuationTimes.txt",
+                        model=FakeVadereModel(),
+                        output_path=folder,
+                        output_folder="env",
+                        lazy_scenarios=True,
+                    )
+
+
+class CoupledResultJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+        ini_folder = os.path.join(self.folder.name, "simulation")
+        os.makedirs(os.path.join(ini_folder, "vadere", "scenarios"))
+        shutil.copy(BASIS_SCENARIO, os.path.join(ini_folder, "vadere", "scenarios"))
+
+        self.ini_path = os.path.join(ini_folder, "omnetpp.ini")
+        with open(self.ini_path, "w") as f:
+            f.write(
+                "[General]\n"
+                "sim-time-limit = 10s\n\n"
+                "[Config final]\n"
+                '*.manager.vadereScenarioPath = "vadere/scenarios/basis.scenario"\n'
+                '*.manager.host = "vadere"\n'
+                '*.manager.useVadereSeed = "true"\n'
+            )
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _setup(self, model, output_folder="env"):
+        parameter_dict_list = [
+            {"vadere": {"speedDistributionMean": speed}, "omnet": {"sim-time-limit": t}}
+            for speed, t in [(1.0, "1s"), (2.0, "2s")]
+        ]
+        return CoupledDictVariation(
+            ini_path=self.ini_path,
+            parameter_dict_list=parameter_dict_list,
+            qoi="evacuationTimes.txt",
+            model=model,
+            scenario_runs=2,
+            output_path=self.folder.name,
+            output_folder=output_folder,
+            seed_config={"vadere": "fixed", "omnet": "fixed"},
+        )
+
+    @staticmethod
+    def _first_values(data):
+        df = data["evacuationTimes.txt"].xs(1, level="pedestrianId").sort_index()
+        return df.iloc[:, 0].to_numpy()
+
+    def test_results_from_temp(self):
+        setup = self._setup(FakeCoupledModel())
+        par_var, data = setup.run(njobs=2)
+
+        np.testing.assert_allclose(self._first_values(data), [10, 10, 5, 5])
+
+        # the journal entries of the worker processes are read back
+        temp_par_var, temp_data = setup.get_sim_results_from_temp()
+        for column in ["return_code", "required_wallclock_time"]:
+            np.testing.assert_array_equal(
+                temp_par_var["MetaInfo", column], par_var["MetaInfo", column]
+            )
+        np.testing.assert_allclose(self._first_values(temp_data), [10, 10, 5, 5])
+
+    def test_interrupted_sweep(self):
+        setup = self._setup(FakeCoupledModel(crash_speeds=[2.0]))
+
+        with mock.patch("suqc.request.ResultJournal", wraps=ResultJournal) as journal:
+            par_var, data = setup.run(njobs=1)
+
+        # one journal for all runs of the sweep
+        self.assertEqual(journal.call_count, 1)
+
+        # the finished runs are collected from the journal, the crashed runs are -1
+        np.testing.assert_array_equal(
+            par_var["MetaInfo", "return_code"], [0, 0, -1, -1]
+        )
+        np.testing.assert_allclose(self._first_values(data), [10, 10])
+
+    def test_concurrent_appends(self):
+        setup = self._setup(FakeCoupledModel())
+        journal = setup._result_journal()
+        ids = setup.get_simulations().index.to_list()
+
+        def append(par_id, run_id):
+            index = pd.MultiIndex.from_tuples(
+                [(par_id, run_id)], names=["id", "run_id"]
+            )
+            result = {"out.txt": pd.DataFrame({"value": [10 * par_id]}, index=index)}
+            journal.append(par_id, run_id, result, return_code=0, required_time=run_id)
+
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=append, args=i) for i in ids]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertTrue(all(p.exitcode == 0 for p in processes))
+
+        par_var, data = setup.get_sim_results_from_temp()
+        np.testing.assert_array_equal(par_var["MetaInfo", "return_code"], 0)
+        np.testing.assert_array_equal(
+            par_var["MetaInfo", "required_wallclock_time"], [0, 1, 0, 1]
+        )
+        np.testing.assert_array_equal(
+            data["out.txt"].sort_index()["value"], [0, 0, 10, 10]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.stats import qmc
+
+from suqc.parameter.sampling import *
+
+
+def legacy_multiply_scenario_runs(points, scenario_runs):
+    # row-wise implementation of ParameterVariationBase.multiply_scenario_runs before
+    # it was vectorized
+    if isinstance(scenario_runs, int):
+        scenario_runs = scenario_runs * np.ones((len(points.index.values),), dtype=int)
+
+    k = 0
+    for idx_vals in points.index.values:
+        idx_id = idx_vals.repeat(scenario_runs[k])
+        idx_run_id = np.arange(0, scenario_runs[k])
+        df0 = np.tile(points.values[k], (scenario_runs[k], 1))
+        if k == 0:
+            idx_ids = idx_id
+            idx_run_ids = idx_run_id
+            df = df0
+        else:
+            idx_ids = np.append(idx_ids, idx_id)
+            idx_run_ids = np.append(idx_run_ids, idx_run_id)
+            df = np.append(df, df0, axis=0)
+        k += 1
+
+    df = pd.DataFrame(
+        df,
+        index=pd.MultiIndex.from_arrays([idx_ids, idx_run_ids], names=["id", "run_id"]),
+        columns=points.columns,
+    )
+    return df.sort_index(axis=1)
+
+
+def legacy_par_iter(points, simulator=None):
+    # row-wise implementation of ParameterVariationBase.par_iter before it was vectorized
+    if points.columns.nlevels == 3:
+        df = points[("Parameter", simulator)]
+    else:
+        df = points["Parameter"]
+
+    for (par_id, run_id), row in df.iterrows():
+        parameter_variation = dict(row)
+        delete_keys = list()
+
+        for k, v in parameter_variation.items():
+            if isinstance(v, float) and np.isnan(v):
+                delete_keys.append(k)
+
+        for dk in delete_keys:
+            del parameter_variation[dk]
+
+        yield (par_id, run_id, parameter_variation)
+
+
+class VectorizedPointsTests(unittest.TestCase):
+    """The vectorized points and iteration are identical to the row-wise
+    implementation (legacy_* functions)."""
+
+    def setUp(self):
+        # missing keys are NaN, mixed value types
+        self.dict_points = [
+            {"speed": 1.0, "number": 3, "name": "a", "flag": True},
+            {"speed": 1.5, "number": 4, "name": "b", "flag": False},
+            {"speed": 2.0, "name": "c"},
+            {"number": 5, "flag": True},
+        ]
+        self.coupled_points = [
+            {"vadere": {"speed": 1.0, "groups": 2}, "omnet": {"*.host": '"h1"'}},
+            {"vadere": {"speed": 1.5}, "omnet": {"*.host": '"h2"', "*.rate": 0.5}},
+            {"vadere": {"groups": 3}, "omnet": {"*.host": '"h3"'}},
+        ]
+
+    @staticmethod
+    def _typed(variations):
+        return [
+            (par_id, run_id, [(k, type(v), v) for k, v in variation.items()])
+            for par_id, run_id, variation in variations
+        ]
+
+    def _assert_same_iteration(self, sampling, simulator=None):
+        expected = self._typed(legacy_par_iter(sampling.points, simulator))
+        self.assertEqual(self._typed(sampling.par_iter(simulator=simulator)), expected)
+
+        # batches do not change the result
+        batches = list(sampling.par_iter_batches(batch_size=2, simulator=simulator))
+        self.assertEqual(len(batches), int(np.ceil(len(expected) / 2)))
+        self.assertEqual(self._typed(v for b in batches for v in b), expected)
+
+    def _assert_multiply(self, points, scenario_runs):
+        expected = legacy_multiply_scenario_runs(
+            UserDefinedSampling(points).points, scenario_runs
+        )
+        sampling = UserDefinedSampling(points).multiply_scenario_runs(scenario_runs)
+
+        pd.testing.assert_frame_equal(sampling.points, expected)
+        pd.testing.assert_series_equal(sampling.points.dtypes, expected.dtypes)
+        return sampling
+
+    def test_multiply_scenario_runs(self):
+        for scenario_runs in [1, 3, [1, 3, 2, 1], [2, 1, 1, 2, 5]]:
+            with self.subTest(scenario_runs=scenario_runs):
+                sampling = self._assert_multiply(self.dict_points, scenario_runs)
+                self._assert_same_iteration(sampling)
+
+        with self.assertRaises(ValueError):
+            UserDefinedSampling(self.dict_points).multiply_scenario_runs([1, 2])
+
+    def test_nan_removal(self):
+        sampling = UserDefinedSampling(self.dict_points).multiply_scenario_runs(2)
+        variations = list(sampling.par_iter())
+
+        self.assertEqual(variations[4], (2, 0, {"name": "c", "speed": 2.0}))
+        self.assertEqual(variations[6][2], {"flag": True, "number": 5.0})
+
+        # numeric columns (no object values)
+        sampling = UserDefinedSampling(
+            [{"a": 1.0, "b": 2.0}, {"a": np.nan, "b": 3.0}]
+        ).multiply_scenario_runs(1)
+        self._assert_same_iteration(sampling)
+        self.assertEqual(
+            [v for _, _, v in sampling.par_iter()], [{"a": 1.0, "b": 2.0}, {"b": 3.0}]
+        )
+
+    def test_multiple_simulators(self):
+        sampling = self._assert_multiply(self.coupled_points, [2, 1, 3])
+        self.assertTrue(sampling.is_multiple_simulators())
+
+        for simulator in ["vadere", "omnet"]:
+            with self.subTest(simulator=simulator):
+                self._assert_same_iteration(sampling, simulator=simulator)
+
+    def test_structured(self):
+        sampling = UserDefinedSampling(self.coupled_points)
+        sampling.multiply_scenario_runs([2, 1, 3])
+
+        for simulator in ["vadere", "omnet"]:
+            df = sampling.points[("Parameter", simulator)]
+            batches = list(
+                sampling.par_iter_batches(
+                    batch_size=4, simulator=simulator, structured=True
+                )
+            )
+            batch = np.concatenate(batches)
+
+            self.assertEqual([b.shape[0] for b in batches], [4, 2])
+            self.assertEqual(
+                list(batch.dtype.names), ["id", "run_id"] + df.columns.tolist()
+            )
+            np.testing.assert_array_equal(batch["id"], df.index.get_level_values("id"))
+            np.testing.assert_array_equal(
+                batch["run_id"], df.index.get_level_values("run_id")
+            )
+
+            # NaN entries are kept, same dtypes as the columns
+            for key in df.columns:
+                self.assertEqual(batch[key].dtype, df[key].dtype)
+                pd.testing.assert_series_equal(
+                    pd.Series(batch[key]),
+                    df[key].reset_index(drop=True),
+                    check_names=False,
+                )
+
+    def test_random_sampling(self):
+        def create(rng_seed):
+            sampling = RandomSampling()
+            rng = np.random.default_rng(rng_seed)
+            sampling.add_parameter("speed", rng.normal, loc=1.3, scale=0.1)
+            sampling.add_parameter("number", rng.integers, low=1, high=10)
+            return sampling
+
+        sampling = create(1)
+        sampling.create_grid(nr_samples=50)
+
+        # row-wise: one dict per sample
+        legacy = create(1)
+        samples = legacy._create_distribution_samples(50)
+        legacy._add_dict_points(
+            [{k: samples[k][i] for k in samples} for i in range(50)]
+        )
+
+        pd.testing.assert_frame_equal(sampling.points, legacy.points)
+
+        sampling.multiply_scenario_runs(2)
+        legacy.multiply_scenario_runs(2)
+        self.assertEqual(
+            self._typed(sampling.par_iter()),
+            self._typed(legacy_par_iter(legacy.points)),
+        )
+
+
+class QuasiMonteCarloSamplingTests(unittest.TestCase):
+    def setUp(self):
+        self.parameters = [
+            Parameter("a", range=[0.0, 2.0]),
+            Parameter("b", range=[-1.0, 1.0]),
+        ]
+
+    @staticmethod
+    def _values(sampling):
+        return sampling.points["Parameter"].to_numpy(dtype=float)
+
+    def test_sobol(self):
+        sampling = SobolSampling(self.parameters, seed=1).create_grid(16)
+
+        expected = qmc.Sobol(d=2, seed=1).random(16)
+        np.testing.assert_allclose(sampling.unit_points, expected)
+        np.testing.assert_allclose(self._values(sampling), expected * [2, 2] + [0, -1])
+        self.assertEqual(list(sampling.points.index), list(range(16)))
+
+        with self.assertRaises(ValueError):
+            sampling.create_grid(16)
+
+    def test_append(self):
+        sampling = HaltonSampling(self.parameters, seed=1)
+
+        with self.assertRaises(ValueError):
+            sampling.append(4)
+
+        sampling.create_grid(8)
+        appended = sampling.append(8)
+
+        # the next points of the same sequence, with continuing ids
+        full = HaltonSampling(self.parameters, seed=1).create_grid(16)
+        self.assertEqual(list(appended.points.index), list(range(8, 16)))
+        np.testing.assert_allclose(self._values(appended), self._values(full)[8:])
+        np.testing.assert_allclose(sampling.unit_points, full.unit_points)
+
+    def test_units_and_simulators(self):
+        parameters = [
+            Parameter("a", range=[0.0, 2.0], simulator="vadere"),
+            Parameter("b", range=[10.0, 20.0], simulator="omnet", unit="s"),
+        ]
+        points = SobolSampling(parameters, seed=1).create_grid(4).points
+
+        self.assertEqual(
+            list(points.columns),
+            [("Parameter", "vadere", "a"), ("Parameter", "omnet", "b")],
+        )
+        self.assertTrue(points["Parameter", "omnet", "b"].str.endswith("s").all())
+
+        with self.assertRaises(ValueError):
+            SobolSampling([parameters[0], Parameter("c", range=[0.0, 1.0])])
+
+        with self.assertRaises(ValueError):
+            SobolSampling([Parameter("c", list=[1, 2], list_index=0)])
+
+
+class SensitivitySamplingTests(unittest.TestCase):
+    def setUp(self):
+        self.parameters = [
+            Parameter("a", range=[0.0, 2.0]),
+            Parameter("b", range=[-1.0, 1.0]),
+            Parameter("c", range=[5.0, 6.0]),
+        ]
+
+    def test_saltelli(self):
+        sampling = SaltelliSampling(self.parameters, seed=1).create_grid(8)
+
+        unit_points = sampling.unit_points.reshape(5, 8, 3)  # [A, B, AB_1, AB_2, AB_3]
+        a, b = unit_points[0], unit_points[1]
+
+        self.assertEqual(sampling.points.shape[0], 40)
+        for i in range(3):
+            # AB_i is A with column i taken from B
+            expected = a.copy()
+            expected[:, i] = b[:, i]
+            np.testing.assert_array_equal(unit_points[2 + i], expected)
+
+        with self.assertRaises(ValueError):
+            sampling.append(8)
+
+    def test_morris(self):
+        sampling = MorrisSampling(self.parameters, nr_levels=4, seed=1)
+        sampling.create_grid(10)
+
+        self.assertEqual(sampling.points.shape[0], 40)
+        self.assertAlmostEqual(sampling.delta, 2 / 3)
+
+        unit_points = sampling.unit_points.reshape(10, 4, 3)
+        self.assertTrue(((unit_points >= 0) & (unit_points <= 1)).all())
+
+        # each step of a trajectory changes exactly one parameter by +-delta, each
+        # parameter is changed once
+        steps = np.diff(unit_points, axis=1)
+        is_changed = ~np.isclose(steps, 0)
+        np.testing.assert_array_equal(is_changed.sum(axis=2), 1)
+        np.testing.assert_array_equal(is_changed.sum(axis=1), 1)
+        np.testing.assert_allclose(np.abs(steps[is_changed]), sampling.delta)
+
+        # the points are on the grid of the levels
+        levels = unit_points * (sampling.nr_levels - 1)
+        np.testing.assert_allclose(levels, np.round(levels), atol=1e-12)
+
+        with self.assertRaises(ValueError):
+            MorrisSampling(self.parameters, nr_levels=3)
+
+
+class BoxSamplingUlamMethodTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        markov = rng.random((20, 20)) * (rng.random((20, 20)) < 0.3)
+        np.fill_diagonal(markov, 1)
+        self.markov = markov / markov.sum(axis=1)[:, np.newaxis]  # row-stochastic
+
+    def _assert_eigenpairs(self, eigval, eigvec):
+        np.testing.assert_allclose(
+            self.markov.T @ eigvec, eigvec * eigval[np.newaxis, :], atol=1e-10
+        )
+
+    def test_compute_eig_all(self):
+        # explicitly all eigenpairs (dense solver), also for a sparse transition matrix
+        for markov in [self.markov, csr_matrix(self.markov)]:
+            eigval, eigvec = BoxSamplingUlamMethod().compute_eig(
+                markov, nr_eigenpairs=None
+            )
+
+            self.assertEqual(eigval.shape, (20,))
+            self.assertEqual(eigvec.shape, (20, 20))
+            self.assertAlmostEqual(eigval[0], 1)
+            self._assert_eigenpairs(eigval, eigvec)
+
+            expected = np.linalg.eigvals(self.markov.T)
+            np.testing.assert_allclose(eigval, np.sort(expected)[::-1], atol=1e-10)
+
+    def test_compute_eig_default(self):
+        # the eigenvalues with largest magnitude
+        magnitudes = np.sort(np.abs(np.linalg.eigvals(self.markov.T)))[::-1]
+
+        # default: iterative solver for a sparse and dense solver for a dense matrix
+        for markov in [csr_matrix(self.markov), self.markov]:
+            with mock.patch("numpy.linalg.eig", wraps=np.linalg.eig) as dense:
+                eigval, eigvec = BoxSamplingUlamMethod().compute_eig(markov)
+
+            self.assertEqual(dense.called, not isinstance(markov, csr_matrix))
+            self.assertEqual(eigval.shape, (6,))
+            self.assertEqual(eigvec.shape, (20, 6))
+            self.assertAlmostEqual(eigval[0], 1)
+            self._assert_eigenpairs(eigval, eigvec)
+            np.testing.assert_allclose(
+                np.sort(np.abs(eigval))[::-1], magnitudes[:6], atol=1e-10
+            )
+
+    def test_compute_eig_sparse(self):
+        sampling = BoxSamplingUlamMethod()
+        eigval, eigvec = sampling.compute_eig(csr_matrix(self.markov), nr_eigenpairs=3)
+
+        self.assertEqual(eigval.shape, (3,))
+        self.assertEqual(eigvec.shape, (20, 3))
+        self._assert_eigenpairs(eigval, eigvec)
+
+        # too many eigenpairs for the iterative solver
+        eigval, _ = sampling.compute_eig(csr_matrix(self.markov), nr_eigenpairs=19)
+        self.assertEqual(eigval.shape, (19,))
+
+        with self.assertRaises(ValueError):
+            sampling.compute_eig(self.markov, nr_eigenpairs=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
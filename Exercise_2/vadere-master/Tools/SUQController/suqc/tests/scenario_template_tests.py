@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import unittest
+
+from suqc.utils.dict_utils import change_dict
+from suqc.utils.scenario_template import *
+
+
+class ScenarioTemplateTests(unittest.TestCase):
+    def setUp(self):
+        self.basis = {
+            "name": "basis",
+            "scenario": {
+                "attributesPedestrian": {"speedDistributionMean": 1.34, "radius": 0.2},
+                "topography": {"sources": [{"id": 1, "spawnNumber": 10}]},
+                "text": '"quoted" value',
+            },
+        }
+        self.paths = [
+            ("scenario", "attributesPedestrian", "speedDistributionMean"),
+            ("name",),
+            ("scenario", "topography", "sources", 0, "spawnNumber"),
+        ]
+
+    def _scenario(self, speed, name, spawn_number):
+        scenario = json.loads(json.dumps(self.basis))
+        scenario["scenario"]["attributesPedestrian"]["speedDistributionMean"] = speed
+        scenario["name"] = name
+        scenario["scenario"]["topography"]["sources"][0]["spawnNumber"] = spawn_number
+        return scenario
+
+    def test_render_identical_to_json_dump(self):
+        scenario = self._scenario(0.8, 'a "new" name', 25)
+
+        template = ScenarioTemplate(self.basis, self.paths)
+        self.assertEqual(template.render(scenario), json.dumps(scenario, indent=4))
+
+        compact = ScenarioTemplate(self.basis, self.paths, compact=True)
+        self.assertEqual(
+            compact.render(scenario), json.dumps(scenario, separators=(",", ":"))
+        )
+
+        # the basis is not changed by the template
+        self.assertEqual(self.basis["name"], "basis")
+
+    def test_render_values(self):
+        template = ScenarioTemplate(self.basis, self.paths)
+
+        values = [1.0, "x", [1, 2]]
+        rendered = json.loads(template.render_values(values))
+        self.assertEqual(template.values(rendered), values)
+        self.assertEqual(rendered["scenario"]["text"], '"quoted" value')
+
+    def test_template_from_change_dict(self):
+        template = ScenarioTemplate(self.basis, self.paths[:1])
+
+        changed = change_dict(self.basis, changes={"speedDistributionMean": 2.0})
+        self.assertEqual(template.render(changed), json.dumps(changed, indent=4))
+
+
+class OverlayTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+        self.basis = {"name": "basis", "scenario": {"speed": 1.34, "seed": 1}}
+        self.basis_path = os.path.join(self.folder.name, "basis.scenario")
+        with open(self.basis_path, "w") as f:
+            json.dump(self.basis, f, indent=4)
+
+        os.makedirs(os.path.join(self.folder.name, "scenarios"))
+        self.scenario_path = os.path.join(self.folder.name, "scenarios", "1.scenario")
+        self.template = ScenarioTemplate(self.basis, [("scenario", "speed")])
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _read_scenario(self):
+        with open(self.scenario_path, "r") as f:
+            return f.read()
+
+    def test_materialize(self):
+        scenario = {"name": "basis", "scenario": {"speed": 0.5, "seed": 1}}
+        write_overlay(self.scenario_path, self.basis_path, self.template, scenario)
+
+        self.assertFalse(os.path.exists(self.scenario_path))
+        self.assertTrue(os.path.isfile(f"{self.scenario_path}{OVERLAY_SUFFIX}"))
+
+        self.assertTrue(materialize_scenario(self.scenario_path))
+        self.assertEqual(self._read_scenario(), json.dumps(scenario, indent=4))
+
+        # an existing scenario file is not written again
+        self.assertFalse(materialize_scenario(self.scenario_path))
+
+        os.remove(self.scenario_path)
+        os.remove(f"{self.scenario_path}{OVERLAY_SUFFIX}")
+        self.assertFalse(materialize_scenario(self.scenario_path))
+
+    def test_changed_basis(self):
+        scenario = {"name": "basis", "scenario": {"speed": 0.5, "seed": 1}}
+        write_overlay(self.scenario_path, self.basis_path, self.template, scenario)
+        materialize_scenario(self.scenario_path)
+        os.remove(self.scenario_path)
+
+        # the template of the basis file is not reused once the file changed
+        with open(self.basis_path, "w") as f:
+            json.dump({"name": "basis", "scenario": {"speed": 1.34, "seed": 2}}, f)
+        stat = os.stat(self.basis_path)
+        os.utime(self.basis_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        materialize_scenario(self.scenario_path)
+        self.assertEqual(json.loads(self._read_scenario())["scenario"]["seed"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from suqc.parameter.sampling import MorrisSampling, Parameter, SaltelliSampling
+from suqc.sensitivity import morris_analysis, sobol_analysis
+
+
+def ishigami(points, a=7.0, b=0.1):
+    x1, x2, x3 = points.T
+    return np.sin(x1) + a * np.sin(x2) ** 2 + b * x3 ** 4 * np.sin(x1)
+
+
+class SobolAnalysisTests(unittest.TestCase):
+    def setUp(self):
+        self.parameters = [
+            Parameter(name, range=[-np.pi, np.pi]) for name in ["x1", "x2", "x3"]
+        ]
+
+    def test_ishigami(self):
+        sampling = SaltelliSampling(self.parameters, seed=1).create_grid(4096)
+        values = ishigami(sampling.points["Parameter"].to_numpy(dtype=float))
+
+        indices = sobol_analysis(sampling, values, seed=1)
+
+        # analytical indices of the Ishigami function (a=7, b=0.1)
+        self.assertEqual(list(indices.index), ["x1", "x2", "x3"])
+        np.testing.assert_allclose(indices["S1"], [0.3139, 0.4424, 0.0], atol=0.05)
+        np.testing.assert_allclose(indices["ST"], [0.5576, 0.4424, 0.2437], atol=0.05)
+
+        self.assertTrue((indices["S1_low"] <= indices["S1"]).all())
+        self.assertTrue((indices["S1"] <= indices["S1_high"]).all())
+        self.assertTrue((indices["ST_low"] <= indices["ST"]).all())
+        self.assertTrue((indices["ST"] <= indices["ST_high"]).all())
+
+    def test_qoi_data(self):
+        sampling = SaltelliSampling(self.parameters, seed=1).create_grid(64)
+        values = ishigami(sampling.points["Parameter"].to_numpy(dtype=float))
+        expected = sobol_analysis(sampling, values, seed=1)
+
+        # two runs per point, the values are averaged
+        nr_points = values.shape[0]
+        index = pd.MultiIndex.from_product(
+            [np.arange(nr_points), [0, 1]], names=["id", "run_id"]
+        )
+        qoi = pd.DataFrame({"qoi": np.repeat(values, 2) + np.tile([-1, 1], nr_points)})
+        qoi.index = index
+        pd.testing.assert_frame_equal(sobol_analysis(sampling, qoi, seed=1), expected)
+
+        with self.assertRaises(ValueError):
+            sobol_analysis(sampling, qoi.drop(index=3, level="id"))
+
+        with self.assertRaises(ValueError):
+            sobol_analysis(sampling, values[:-1])
+
+        with self.assertRaises(ValueError):
+            sobol_analysis(SaltelliSampling(self.parameters), values)
+
+
+class MorrisAnalysisTests(unittest.TestCase):
+    def test_linear_model(self):
+        parameters = [
+            Parameter("a", range=[0.0, 1.0]),
+            Parameter("b", range=[0.0, 2.0]),
+            Parameter("c", range=[5.0, 6.0]),
+        ]
+        sampling = MorrisSampling(parameters, nr_levels=4, seed=1).create_grid(20)
+
+        points = sampling.points["Parameter"].to_numpy(dtype=float)
+        values = points @ np.array([2.0, -3.0, 0.0]) + 1
+
+        result = morris_analysis(sampling, values, seed=1)
+
+        # elementary effects in the unit hypercube: coefficient times range length
+        np.testing.assert_allclose(result["mu_star"], [2, 6, 0], atol=1e-10)
+        np.testing.assert_allclose(result["mu"], [2, -6, 0], atol=1e-10)
+        np.testing.assert_allclose(result["sigma"], 0, atol=1e-10)
+        np.testing.assert_allclose(result["mu_star_low"], [2, 6, 0], atol=1e-10)
+        np.testing.assert_allclose(result["mu_star_high"], [2, 6, 0], atol=1e-10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from suqc.utils.shared_frames import *
+
+
+def create_frame(par_id, nr_rows=5, with_strings=False):
+    index = pd.MultiIndex.from_arrays(
+        [
+            np.full(nr_rows, par_id),
+            np.zeros(nr_rows, dtype=np.int64),
+            np.arange(nr_rows),
+        ],
+        names=["id", "run_id", "pedestrianId"],
+    )
+    columns = pd.MultiIndex.from_product([["out.txt"], ["x", "y"]])
+    df = pd.DataFrame(
+        np.arange(2 * nr_rows, dtype=float).reshape(nr_rows, 2) + par_id,
+        index=index,
+        columns=columns,
+    )
+
+    if with_strings:
+        df["out.txt", "state"] = [f"s{i}" for i in range(nr_rows)]
+    return df
+
+
+def shared_frame_in_worker(par_id):
+    return share_frames({"out.txt": create_frame(par_id), "other": 1})
+
+
+class SharedFrameTests(unittest.TestCase):
+    def setUp(self):
+        start_resource_tracker()
+
+    def _assert_released(self, frame, name):
+        self.assertIsNone(frame.name)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_round_trip(self):
+        df = create_frame(3)
+        frame = SharedFrame(df)
+        name = frame.name
+
+        self.assertIsNotNone(name)
+        self.assertEqual(frame.objects, dict())
+        pd.testing.assert_frame_equal(frame.to_frame(), df)
+
+        # a frame can only be read once
+        self._assert_released(frame, name)
+
+    def test_object_values(self):
+        df = create_frame(1, with_strings=True)
+        df.index = df.index.set_levels(
+            df.index.levels[0].astype(str), level=0, verify_integrity=False
+        )
+
+        frame = SharedFrame(df)
+        self.assertEqual(sorted(frame.objects.keys()), [0, 5])  # "id" and "state"
+        pd.testing.assert_frame_equal(frame.to_frame(), df)
+
+    def test_empty_frame(self):
+        df = create_frame(1, nr_rows=0)
+        frame = SharedFrame(df)
+
+        self.assertIsNone(frame.name)
+        pd.testing.assert_frame_equal(frame.to_frame(), df, check_index_type=False)
+
+    def test_concat(self):
+        dfs = [create_frame(i, nr_rows=i + 1) for i in range(4)]
+        expected = pd.concat(dfs, axis=0)
+
+        frames = [SharedFrame(df) for df in dfs]
+        names = [frame.name for frame in frames]
+        pd.testing.assert_frame_equal(concat_frames(frames), expected)
+
+        for frame, name in zip(frames, names):
+            self._assert_released(frame, name)
+
+        # different layouts and data frames that were not shared
+        mixed = [SharedFrame(dfs[0]), dfs[1], SharedFrame(dfs[2].astype(np.float32))]
+        pd.testing.assert_frame_equal(
+            concat_frames(mixed),
+            pd.concat([dfs[0], dfs[1], dfs[2].astype(np.float32)], axis=0),
+        )
+
+        pd.testing.assert_frame_equal(concat_frames(dfs), expected)
+
+    def test_release(self):
+        frame = SharedFrame(create_frame(1))
+        name = frame.name
+
+        frame.release()
+        self._assert_released(frame, name)
+        frame.release()  # no-op
+
+    def test_share_frames_from_workers(self):
+        self.assertIsNone(share_frames(None))
+
+        context = multiprocessing.get_context("fork")
+        with context.Pool(2) as pool:
+            results = pool.map(shared_frame_in_worker, range(4))
+
+        self.assertTrue(all(r["other"] == 1 for r in results))
+        self.assertTrue(all(isinstance(r["out.txt"], SharedFrame) for r in results))
+
+        pd.testing.assert_frame_equal(
+            concat_frames([r["out.txt"] for r in results]),
+            pd.concat([create_frame(i) for i in range(4)], axis=0),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
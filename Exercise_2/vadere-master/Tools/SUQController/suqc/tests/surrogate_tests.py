@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from suqc.parameter.sampling import Parameter, SobolSampling, UnitHypercube
+from suqc.surrogate import PolynomialChaosRegressor, Surrogate
+
+
+def quadratic(x):
+    return 1 + x[:, 0] ** 2 - 0.5 * x[:, 0] * x[:, 1]
+
+
+class SurrogateTests(unittest.TestCase):
+    def setUp(self):
+        self.parameters = [
+            Parameter("a", range=[0.0, 2.0]),
+            Parameter("b", range=[-1.0, 1.0]),
+        ]
+
+        self.sampling = SobolSampling(self.parameters, seed=1).create_grid(32)
+        values = self._values(self.sampling)
+        self.qoi = pd.Series(
+            quadratic(values),
+            index=pd.Index(np.arange(values.shape[0]), name="id"),
+        )
+
+        self.test_points = SobolSampling(self.parameters, seed=2).create_grid(16)
+
+    @staticmethod
+    def _values(sampling):
+        return sampling.points.loc[:, "Parameter"][["a", "b"]].to_numpy(dtype=float)
+
+    def test_unit_hypercube(self):
+        hypercube = UnitHypercube(self.parameters)
+        points = np.array([[0.0, -1.0], [1.0, 0.5]])
+
+        np.testing.assert_allclose(hypercube.to_unit(points), [[0, 0], [0.5, 0.75]])
+        np.testing.assert_allclose(
+            hypercube.to_parameter_space(hypercube.to_unit(points)), points
+        )
+
+        with self.assertRaises(ValueError):
+            UnitHypercube([Parameter("c")])
+
+    def test_pce(self):
+        surrogate = Surrogate(self.parameters, model="pce", degree=2)
+        surrogate.fit(self.sampling, self.qoi)
+
+        # the quadratic function is represented exactly
+        expected = quadratic(self._values(self.test_points))
+        mean, std = surrogate.predict(self.test_points, return_std=True)
+        np.testing.assert_allclose(mean, expected, atol=1e-10)
+        np.testing.assert_allclose(std, 0, atol=1e-6)
+
+        self.assertLess(surrogate.cv_error["rmse"], 1e-10)
+        self.assertAlmostEqual(surrogate.cv_error["r2"], 1)
+        self.assertEqual(surrogate.cv_error["nr_points"], 32)
+
+        with self.assertRaises(ValueError):
+            PolynomialChaosRegressor(degree=4).fit(np.zeros((3, 2)), np.zeros(3))
+
+    def test_gp(self):
+        surrogate = Surrogate(self.parameters, model="gp", nr_folds=4, seed=1)
+        surrogate.fit(self.sampling, self.qoi)
+
+        expected = quadratic(self._values(self.test_points))
+        mean, std = surrogate.predict(self.test_points, return_std=True)
+        np.testing.assert_allclose(mean, expected, atol=0.05)
+        self.assertTrue((std < 0.1).all())
+
+        self.assertGreater(surrogate.cv_error["r2"], 0.99)
+
+    def test_gradient_boosting(self):
+        surrogate = Surrogate(self.parameters, model="gradient_boosting", nr_folds=0)
+        surrogate.fit(self.sampling, self.qoi)
+
+        self.assertIsNone(surrogate.cv_error)
+        self.assertEqual(surrogate.predict(self.test_points).shape, (16,))
+
+        with self.assertRaises(ValueError):
+            surrogate.predict(self.test_points, return_std=True)
+
+    def test_fit_lookup_and_failed_runs(self):
+        # lookup DataFrame of a sweep with two runs per parameter point
+        values = self._values(self.sampling)
+        index = pd.MultiIndex.from_product(
+            [np.arange(values.shape[0]), [0, 1]], names=["id", "run_id"]
+        )
+        lookup = pd.DataFrame(
+            np.repeat(values, 2, axis=0),
+            index=index,
+            columns=pd.MultiIndex.from_product([["Parameter"], ["a", "b"]]),
+        )
+
+        # the runs are averaged, the failed point 0 is not used
+        y = np.repeat(quadratic(values), 2) + np.tile([-0.1, 0.1], values.shape[0])
+        y[:2] = np.nan
+        qoi = pd.DataFrame({"qoi": y}, index=index)
+
+        surrogate = Surrogate(self.parameters, model="pce", degree=2, nr_folds=0)
+        surrogate.fit(lookup, qoi)
+        np.testing.assert_allclose(
+            surrogate.predict(values[:1]), quadratic(values[:1]), atol=1e-10
+        )
+
+        with self.assertRaises(ValueError):
+            surrogate.fit(lookup, qoi * np.nan)
+
+        with self.assertRaises(ValueError):
+            surrogate.fit(lookup, qoi.assign(other=1))
+
+    def test_split_uncertain(self):
+        def wave(x):
+            return np.sin(3 * x[:, 0]) + x[:, 1]
+
+        # trained on the lower half of the range of "a" only
+        values = self._values(self.sampling)
+        is_lower = values[:, 0] < 1
+        qoi = pd.Series(wave(values), index=self.qoi.index)
+
+        surrogate = Surrogate(self.parameters, model="gp", nr_folds=0, seed=1)
+        surrogate.fit(self.sampling.points[is_lower], qoi[is_lower])
+
+        points = pd.DataFrame({"a": [0.5, 0.6, 1.9, 2.0], "b": [0.0, 0.2, 0.0, 0.5]})
+        certain, uncertain = surrogate.split_uncertain(points, max_std=0.05)
+
+        self.assertEqual(list(certain.index), [0, 1])
+        self.assertEqual(list(certain.columns), ["a", "b", "qoi", "std"])
+        np.testing.assert_allclose(
+            certain["qoi"], wave(points.to_numpy()[:2]), atol=0.05
+        )
+
+        # the uncertain points keep their ids
+        self.assertEqual(list(uncertain.points.index), [2, 3])
+        self.assertEqual(uncertain.points.shape[0], 2)
+
+        certain, uncertain = surrogate.split_uncertain(points, max_std=np.inf)
+        self.assertEqual(certain.shape[0], 4)
+        self.assertIsNone(uncertain)
+
+
+if __name__ == "__main__":
+    unittest.main()
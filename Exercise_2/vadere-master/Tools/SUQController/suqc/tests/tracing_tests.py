@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from suqc import tracing
+from suqc.tracing import Tracer
+
+
+@tracing.traced("decorated")
+def add(a, b):
+    return a + b
+
+
+class TracingTests(unittest.TestCase):
+    def test_disabled(self):
+        self.assertFalse(tracing.is_enabled())
+        self.assertIs(tracing.span("phase"), tracing._NULL_SPAN)
+
+        with tracing.collect() as events:
+            with tracing.span("phase"):
+                pass
+            self.assertEqual(add(1, 2), 3)
+        self.assertEqual(events, [])
+
+    def test_spans(self):
+        with Tracer() as tracer:
+            self.assertTrue(tracing.is_enabled())
+
+            with tracing.span("outer", nr_runs=2):
+                with tracing.span("inner"):
+                    pass
+            self.assertEqual(add(1, 2), 3)
+
+            with self.assertRaises(KeyError):
+                with tracing.span("failing"):
+                    raise KeyError("x")
+
+        self.assertFalse(tracing.is_enabled())
+
+        # spans are recorded when they end
+        names = [e["name"] for e in tracer.events]
+        self.assertEqual(names, ["inner", "outer", "decorated", "failing"])
+
+        outer = tracer.events[1]
+        self.assertEqual(outer["args"], {"nr_runs": 2})
+        self.assertEqual(outer["pid"], os.getpid())
+        self.assertGreaterEqual(outer["dur"], tracer.events[0]["dur"])
+        self.assertEqual(tracer.events[3]["args"], {"error": "KeyError"})
+
+    def test_collect(self):
+        with Tracer() as tracer:
+            with tracing.collect() as events:
+                with tracing.span("simulation"):
+                    pass
+
+            # captured instead of recorded, e.g. returned from a worker process
+            self.assertEqual(tracer.events, [])
+            self.assertEqual([e["name"] for e in events], ["simulation"])
+
+            tracing.add_events(events)
+            self.assertEqual(tracer.events, events)
+
+    def test_single_active_tracer(self):
+        with Tracer():
+            with self.assertRaises(RuntimeError):
+                Tracer().enable()
+
+    def test_chrome_trace_and_summary(self):
+        with Tracer() as tracer:
+            for _ in range(3):
+                with tracing.span("run"):
+                    pass
+
+            thread = threading.Thread(target=add, args=(1, 2))
+            thread.start()
+            thread.join()
+
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "trace.json")
+            tracer.export_chrome_trace(filepath)
+            with open(filepath, "r") as f:
+                trace = json.load(f)
+
+        events = trace["traceEvents"]
+        self.assertEqual(len(events), 4)
+        self.assertTrue(all(e["ph"] == "X" for e in events))
+        self.assertEqual(sorted({e["tid"] for e in events}), [0, 1])  # short ids
+
+        summary = tracer.summary()
+        self.assertEqual(summary.loc["run", "count"], 3)
+        self.assertEqual(summary.loc["run", "workers"], 1)
+        self.assertEqual(summary.loc["decorated", "count"], 1)
+        self.assertAlmostEqual(
+            summary.loc["run", "mean_sec"] * 3, summary.loc["run", "total_sec"]
+        )
+
+        self.assertEqual(Tracer().summary().shape[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
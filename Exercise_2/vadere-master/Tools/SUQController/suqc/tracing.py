@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+# Active tracer of this process (None: tracing disabled). Worker processes that are
+# forked while a tracer is active record spans as well.
+_TRACER = None
+
+# per thread: stack of lists that capture the spans (see `collect`)
+_LOCAL = threading.local()
+
+
+class _NullSpan(object):
+    """Returned by `span` if tracing is disabled (no time is measured)."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+
+    __slots__ = ("name", "args", "_start", "_t0")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self._start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter() - self._t0
+
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+
+        _record(
+            {
+                "name": self.name,
+                "ph": "X",  # complete event (with duration)
+                "ts": self._start * 1e6,  # microseconds
+                "dur": duration * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self.args,
+            }
+        )
+        return False
+
+
+def _record(event):
+    buffers = getattr(_LOCAL, "buffers", None)
+    if buffers:
+        buffers[-1].append(event)
+    elif _TRACER is not None:
+        _TRACER.events.append(event)
+
+
+def span(name: str, **args):
+    """Context manager that records the time of a phase, e.g.
+
+        with span("simulation", parameter_id=3):
+            ...
+
+    If tracing is disabled, a shared object without any measurement is returned.
+    """
+    if _TRACER is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name: str):
+    """Decorator that records a span for each call of the function."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _TRACER is None:
+                return func(*args, **kwargs)
+            with _Span(name, dict()):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def is_enabled() -> bool:
+    return _TRACER is not None
+
+
+@contextlib.contextmanager
+def collect():
+    """Captures the spans of the current thread in a list (instead of recording them in
+    the tracer), e.g. to return the spans of a run from a worker process with the
+    request item."""
+
+    events = list()
+
+    if _TRACER is None:
+        yield events
+        return
+
+    if not hasattr(_LOCAL, "buffers"):
+        _LOCAL.buffers = list()
+
+    _LOCAL.buffers.append(events)
+    try:
+        yield events
+    finally:
+        _LOCAL.buffers.pop()
+
+
+def add_events(events: List[dict]):
+    """Adds spans that were collected elsewhere (e.g. in a worker process)."""
+    if _TRACER is not None:
+        _TRACER.events.extend(events)
+
+
+class Tracer(object):
+    """Records the spans of the phases of a sweep (scenario creation, simulation, QoI
+    parsing, ...) while it is active:
+
+        with Tracer() as tracer:
+            setup.run(njobs=4)
+
+        tracer.export_chrome_trace("trace.json")  # open in chrome://tracing or Perfetto
+        print(tracer.summary())
+
+    The spans of worker processes are returned with the request items. Worker processes
+    are required to be forked (default on Linux) while the tracer is active.
+    """
+
+    def __init__(self):
+        self.events = list()
+
+    def enable(self):
+        global _TRACER
+        if _TRACER is not None and _TRACER is not self:
+            raise RuntimeError("Another tracer is already active.")
+        _TRACER = self
+        return self
+
+    def disable(self):
+        global _TRACER
+        if _TRACER is self:
+            _TRACER = None
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+        return False
+
+    def to_chrome_trace(self) -> dict:
+        events = sorted(self.events, key=lambda e: e["ts"])
+
+        # short worker ids (thread ids are large numbers)
+        tids = dict()
+        trace_events = list()
+        for event in events:
+            key = (event["pid"], event["tid"])
+            tids.setdefault(key, len(tids))
+            trace_events.append(dict(event, tid=tids[key]))
+
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, filepath: str):
+        """Writes the spans in the Chrome trace event format (JSON)."""
+        with open(filepath, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def summary(self) -> pd.DataFrame:
+        """Per phase: number of spans, total, mean and maximum time (seconds), and the
+        number of workers (processes and threads). Nested phases are contained in the
+        time of the enclosing phase (e.g. "simulation" in "run")."""
+
+        columns = ["count", "total_sec", "mean_sec", "max_sec", "workers"]
+
+        if len(self.events) == 0:
+            return pd.DataFrame(columns=columns)
+
+        df = pd.DataFrame(
+            {
+                "phase": [e["name"] for e in self.events],
+                "duration": np.array([e["dur"] for e in self.events]) * 1e-6,
+                "worker": [(e["pid"], e["tid"]) for e in self.events],
+            }
+        )
+
+        grouped = df.groupby("phase")
+        summary = pd.DataFrame(
+            {
+                "count": grouped["duration"].count(),
+                "total_sec": grouped["duration"].sum(),
+                "mean_sec": grouped["duration"].mean(),
+                "max_sec": grouped["duration"].max(),
+                "workers": grouped["worker"].nunique(),
+            }
+        )
+        return summary.sort_values("total_sec", ascending=False)
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
+import os
 import unittest
 
+# the tests of the modules are in suqc/tests (files "*_tests.py")
+TESTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests")
+
 
 class TestExamples(unittest.TestCase):
     def test_first_example(self):
@@ -10,5 +14,13 @@ class TestExamples(unittest.TestCase):
         self.assertTrue(True)
 
 
+def load_tests(loader, tests, pattern):
+    top_level_path = os.path.dirname(os.path.dirname(TESTS_PATH))
+    tests.addTests(
+        loader.discover(TESTS_PATH, pattern="*_tests.py", top_level_dir=top_level_path)
+    )
+    return tests
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 
 import numbers  # required to check for numeric types
-from copy import deepcopy
+import re
+from copy import copy, deepcopy
 from functools import reduce
-from typing import List
+from typing import Iterable, List, Optional
 
 import numpy as np
 from suqc.opp.config_parser import OppConfigFileBase
@@ -33,9 +34,9 @@ def _deep_dict_breadth_first(d: dict, key: str):
                 val = v
                 cur_path.append(k)
                 level_found = cur_level
-                final_path = deepcopy(cur_path)
+                final_path = list(cur_path)
             elif isinstance(v, dict):
-                path = deepcopy(cur_path)
+                path = list(cur_path)
                 path.append(k)
                 stack.append((cur_level + 1, path, v))
         else:
@@ -51,7 +52,7 @@ def key_split(key: str):
 
 def _handle_chained_keys(d, key, check_final_leaf, check_unique_key):
     key_chain = key.split(SYMBOL_KEY_CHAINING)  # get the user specified key chain
-    cur_d = deepcopy(d)  # start with the root dict
+    cur_d = d  # start with the root dict (the lookup is read-only, no copy required)
     cur_p = list()  # cur_p = current path
 
     if len(key_chain) == 2 and key_chain[0] == "":  # special case if value follows root
@@ -66,7 +67,7 @@ def _handle_chained_keys(d, key, check_final_leaf, check_unique_key):
 
         for k in key_chain[:-1]:  # do breath first for all path-descriptive keys
             d_, p_ = _deep_dict_breadth_first(cur_d, k)
-            cur_d = deepcopy(d_)
+            cur_d = d_
             cur_p += p_
 
         val, p_ = deep_dict_lookup(
@@ -211,9 +212,7 @@ def deep_dict_lookup(d: dict, key: str, check_final_leaf=True, check_unique_key=
                             f"There is a conflict (two or more) of key {key} in the dictionary. \n {d}",
                             f"1. path: {path_to_value} \n" f"2. path: {current_path}",
                         )
-                    path_to_value = deepcopy(
-                        current_path
-                    )  # deepcopy because lists are mutable
+                    path_to_value = list(current_path)  # copy because lists are mutable
                     value = v  # set to final value
                 else:
                     # if the integrity is not checked, return immediately the key and path
@@ -222,7 +221,7 @@ def deep_dict_lookup(d: dict, key: str, check_final_leaf=True, check_unique_key=
                             f"Value to return for key {key} is not a leaf (i.e. value) but a "
                             f"sub-dictionary."
                         )
-                    return v, deepcopy(current_path)
+                    return v, list(current_path)
 
             if isinstance(v, dict):  # fill stack with more subdicts
                 stack.append(iter(v.items()))
@@ -298,7 +297,8 @@ def _avoid_numpy_types(new_value):
     return new_value
 
 
-def change_value(d: dict, path: list, last_key: str, exist_val, new_value):
+def _checked_new_value(path: list, last_key: str, exist_val, new_value):
+    """Returns the new value (possibly casted to the type of the existing value)."""
 
     if isinstance(exist_val, dict):
         raise ValueError("Currently, setting of new sub-directories is not supported!")
@@ -336,14 +336,24 @@ def change_value(d: dict, path: list, last_key: str, exist_val, new_value):
                 print(f"Type-cast failed for key {last_key} at path {path}.")
                 raise e
 
+    return new_value
+
+
+def change_value(d: dict, path: list, last_key: str, exist_val, new_value):
+    new_value = _checked_new_value(path, last_key, exist_val, new_value)
     return set_dict_value_keylist(d, path, last_key, new_value)
 
 
-def change_dict_ini(ini_object: OppConfigFileBase, changes: dict):
+def _assert_value_set(check_val, new_val):
+    assert check_val == new_val, (
+        f"Something went wrong with setting a new value "
+        f"in the scenario! "
+        f"Check val={check_val} vs. new_val={new_val}."
+    )
 
-    for key, value in changes.items():
-        ini_object[key] = value
 
+def change_dict_ini(ini_object: OppConfigFileBase, changes: dict):
+    ini_object.apply(changes)
     return ini_object
 
 
@@ -361,19 +371,312 @@ def change_dict(json_dict: dict, changes: dict):
 
         # Security check:
         check_val, _ = deep_dict_lookup(json_dict, key_chain)
-        assert check_val == new_val, (
-            f"Something went wrong with setting a new value "
-            f"in the scenario! "
-            f"Check val={check_val} vs. new_val={new_val}."
+        _assert_value_set(check_val, new_val)
+
+    return json_dict
+
+
+def get_path_value(d, concrete_path):
+    """Value at a concrete path (dict keys and list indices) in a nested dictionary."""
+    return reduce(lambda cur, key: cur[key], concrete_path, d)
+
+
+def copy_along_path(d, concrete_path, copied: set):
+    """Shallow-copies all containers on the concrete path below `d` (which has to be a
+    copy already) and returns the parent container of the last key. `copied` contains
+    the ids of containers that are already copied."""
+
+    cur = d
+    for key in concrete_path[:-1]:
+        child = cur[key]
+        if id(child) not in copied:
+            child = copy(child)
+            copied.add(id(child))
+            cur[key] = child
+        cur = child
+    return cur
+
+
+class _IndexMiss(Exception):
+    """The key cannot be answered from the index (e.g. a key chain through a value that
+    is not a dictionary); the lookup falls back to deep_dict_lookup."""
+
+
+class ScenarioKeyIndex(object):
+    """Index of all keys in a (nested) dictionary, built in one depth-first pass without
+    copies: key -> list of (path, value) in the order in which deep_dict_lookup visits
+    them.
+
+    `lookup` has the semantics of deep_dict_lookup (key chains, sub-selections,
+    uniqueness and leaf checks), but only looks at the indexed paths of the key instead
+    of the whole dictionary. Dictionaries in lists are indexed when they are first used
+    in a sub-selection. The dictionary must not be changed after the index is built.
+    """
+
+    def __init__(self, d: dict):
+        self.d = d
+
+        # key -> [(path, value), ...] in depth-first order
+        self._entries = dict()
+
+        # (path of a list, position) -> ScenarioKeyIndex of the dictionary in the list
+        self._element_indices = dict()
+
+        stack = [((), iter(d.items()))]
+        while stack:
+            prefix, items = stack[-1]
+            for k, v in items:
+                path = prefix + (k,)
+                self._entries.setdefault(k, list()).append((path, v))
+                if isinstance(v, dict):
+                    stack.append((path, iter(v.items())))
+                    break
+            else:
+                stack.pop()
+
+    def _entries_below(self, prefix, key):
+        # entries in the sub-dictionary at prefix, with the paths relative to it
+        entries = self._entries.get(key, list())
+        if len(prefix) == 0:
+            return entries
+
+        n = len(prefix)
+        return [(p[n:], v) for p, v in entries if len(p) > n and p[:n] == prefix]
+
+    def _lookup_leaf(self, prefix, key, check_final_leaf, check_unique_key):
+        # see deep_dict_lookup (key without chaining)
+        entries = self._entries_below(prefix, key)
+
+        if check_unique_key:
+            value, path_to_value = None, None
+            for path, v in entries:
+                if value is not None:
+                    raise ValueError(
+                        f"There is a conflict (two or more) of key {key} in the "
+                        f"dictionary. \n {get_path_value(self.d, prefix)}",
+                        f"1. path: {path_to_value} \n" f"2. path: {list(path)}",
+                    )
+                value, path_to_value = v, list(path)
+        elif len(entries) > 0:
+            path, value = entries[0]
+            if check_final_leaf and isinstance(value, dict):
+                raise ValueError(
+                    f"Value to return for key {key} is not a leaf (i.e. value) but a "
+                    f"sub-dictionary."
+                )
+            return value, list(path)
+        else:
+            value = None
+
+        if value is None:
+            raise KeyError(f"Key {key} not found. \n {get_path_value(self.d, prefix)}")
+        return value, path_to_value
+
+    def _breadth_first(self, prefix, key):
+        # see _deep_dict_breadth_first: the occurrence with the smallest depth
+        entries = self._entries_below(prefix, key)
+        if len(entries) == 0:
+            return None, None
+
+        level = min(len(p) for p, _ in entries)
+
+        val, final_path = None, None
+        for p, v in entries:
+            if len(p) == level:
+                if val is not None:
+                    raise RuntimeError("please report bug with stacktrace")
+                val, final_path = v, list(p)
+        return val, final_path
+
+    def _lookup_chained(self, prefix, key, check_final_leaf, check_unique_key):
+        # see _handle_chained_keys
+        key_chain = key.split(SYMBOL_KEY_CHAINING)
+
+        if len(key_chain) == 2 and key_chain[0] == "":
+            return self._breadth_first(prefix, key_chain[1])
+
+        if key_chain[0] == "":
+            key_chain = key_chain[1:]
+
+        cur_p = list()
+        for k in key_chain[:-1]:
+            d_, p_ = self._breadth_first(prefix + tuple(cur_p), k)
+            if not isinstance(d_, dict):
+                raise _IndexMiss()
+            cur_p += p_
+
+        val, p_ = self._lookup_leaf(
+            prefix + tuple(cur_p), key_chain[-1], check_final_leaf, check_unique_key
         )
-        check_val, _ = deep_dict_lookup(json_dict, key_chain)
-        assert check_val == new_val, (
-            f"Something went wrong with setting a new value "
-            f"in the scenario! "
-            f"Check val={check_val} vs. new_val={new_val}."
+        return val, cur_p + p_
+
+    def _element_index(self, list_path, position, element):
+        key = (list_path, position)
+        if key not in self._element_indices:
+            self._element_indices[key] = ScenarioKeyIndex(element)
+        return self._element_indices[key]
+
+    def selected_position(self, list_path: tuple, selection: str) -> int:
+        """Position of the dictionary that fulfills the sub-selection (e.g. "[id==1]")
+        in the list at list_path, see _get_selected_json."""
+        try:
+            return self._selected_position(list_path, selection)
+        except _IndexMiss:
+            json_elements = get_path_value(self.d, list_path)
+            selected = _get_selected_json(json_elements, selection)
+            return [id(el) for el in json_elements].index(id(selected))
+
+    def _selected_position(self, list_path, selection):
+        json_elements = get_path_value(self.d, list_path)
+        key_selection, val_selection = _split_subselection_key(
+            selection.lstrip("[").rstrip("]")
         )
 
-    return json_dict
+        position = None
+        for i, el in enumerate(json_elements):
+            if not isinstance(el, dict):
+                raise _IndexMiss()
+
+            val, _ = self._element_index(list_path, i, el).lookup(
+                key_selection, check_final_leaf=True, check_unique_key=True
+            )
+
+            if val_selection == val:
+                if position is not None:
+                    raise KeyError(
+                        f"There are multiple selections with {key_selection}=="
+                        f"{val_selection} in list {json_elements}."
+                    )
+                position = i
+
+        if position is None:
+            raise KeyError(
+                f"No json with the selection {selection} could be found in \n "
+                f"{json_elements} "
+            )
+        return position
+
+    def _lookup_subselection(self, key, check_final_leaf, check_unique_key):
+        # see _handle_subselection_keys
+        keychain = re.split(pattern="[\[\]]", string=key)
+        if len(keychain) != 3 or not keychain[0].rstrip(SYMBOL_KEY_CHAINING):
+            raise _IndexMiss()  # invalid key, raise the error of deep_dict_lookup
+
+        subjsons, path2array = self._lookup_chained(
+            (),
+            keychain[0].rstrip(SYMBOL_KEY_CHAINING),
+            check_final_leaf,
+            check_unique_key,
+        )
+        selection, selarraypath = keychain[1], keychain[2]
+
+        if not isinstance(subjsons, list) or not selarraypath:
+            raise _IndexMiss()
+
+        list_path = tuple(path2array)
+        position = self._selected_position(list_path, selection)
+
+        val, element_path = self._element_index(
+            list_path, position, subjsons[position]
+        )._lookup_chained((), selarraypath, check_final_leaf, check_unique_key)
+
+        return val, path2array + [f"[{selection}]"] + element_path
+
+    def lookup(self, key: str, check_final_leaf=True, check_unique_key=True):
+        """Same as deep_dict_lookup(d, key, check_final_leaf, check_unique_key)."""
+        try:
+            if SYMBOL_KEY_CHAINING in key:
+                if _is_subselection(key):
+                    return self._lookup_subselection(
+                        key, check_final_leaf, check_unique_key
+                    )
+                return self._lookup_chained((), key, check_final_leaf, check_unique_key)
+            return self._lookup_leaf((), key, check_final_leaf, check_unique_key)
+        except _IndexMiss:
+            return deep_dict_lookup(self.d, key, check_final_leaf, check_unique_key)
+
+
+class KeyPathPlan(object):
+    """Key chains (see deep_dict_lookup) that are resolved once to concrete paths in a
+    basis dictionary.
+
+    Changes are applied with `apply`, which is equivalent to `change_dict` but only
+    copies the (sub-)dictionaries and lists on the paths to the changed values. All
+    other parts are shared with the basis, i.e. the returned dictionaries must not be
+    modified in-place. Sub-selections (e.g. "[attributes.id==-1]") are resolved to list
+    indices, therefore the values used in a sub-selection must not be changed.
+
+    The key chains are looked up with a ScenarioKeyIndex of the basis (`key_index`, if
+    not given it is built).
+    """
+
+    def __init__(
+        self,
+        basis: dict,
+        keys: Optional[Iterable[str]] = None,
+        key_index: Optional[ScenarioKeyIndex] = None,
+    ):
+        if key_index is None:
+            key_index = ScenarioKeyIndex(basis)
+        elif key_index.d is not basis:
+            raise ValueError("The key_index has to be built from the basis.")
+
+        self.basis = basis
+        self.key_index = key_index
+
+        # key chain -> (path as returned by deep_dict_lookup, concrete path)
+        self._resolved = dict()
+
+        if keys is not None:
+            for key in keys:
+                self.resolve(key)
+
+    def resolve(self, key_chain: str):
+        if key_chain not in self._resolved:
+            _, fullkeypath = self.key_index.lookup(key_chain)
+            self._resolved[key_chain] = (fullkeypath, self._concrete_path(fullkeypath))
+        return self._resolved[key_chain]
+
+    def concrete_paths(self) -> List[tuple]:
+        """All (unique) concrete paths of the resolved key chains."""
+        return list(dict.fromkeys(tuple(p) for _, p in self._resolved.values()))
+
+    def _concrete_path(self, fullkeypath):
+        concrete_path = list()
+
+        for key in fullkeypath[:-1]:
+            if _is_subselection(key):
+                key = self.key_index.selected_position(tuple(concrete_path), key)
+            concrete_path.append(key)
+
+        concrete_path.append(fullkeypath[-1])
+        return concrete_path
+
+    def apply(self, changes: dict, d: Optional[dict] = None):
+        """Return a copy of `d` (default is the basis) with the changes applied. `d`
+        must have the same structure as the basis (e.g. a result of `apply`)."""
+
+        if d is None:
+            d = self.basis
+
+        new_d = copy(d)
+        copied = {id(new_d)}  # containers that are already copied
+
+        for key_chain, new_val in changes.items():
+            fullkeypath, concrete_path = self.resolve(key_chain)
+
+            cur = copy_along_path(new_d, concrete_path, copied)
+            final_key = concrete_path[-1]
+
+            # exist val is given for sanity checks (e.g. not replace a string with an integer)
+            cur[final_key] = _checked_new_value(
+                fullkeypath[:-1], final_key, cur[final_key], new_val
+            )
+
+            # Security check:
+            _assert_value_set(cur[final_key], new_val)
+
+        return new_d
 
 
 if __name__ == "__main__":
@@ -139,6 +139,74 @@ def remove_folder(path):
         shutil.rmtree(path)
 
 
+# Linux ioctl request of a copy-on-write clone of a whole file (reflink)
+_FICLONE = 0x40049409
+
+LINK_MODES = ["copy", "hardlink", "symlink"]
+
+
+def clone_file(src, dst):
+    """Copy-on-write clone of src (btrfs, xfs, ...), falls back to a regular copy if the
+    file system does not support it."""
+    try:
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+    except (ImportError, OSError):
+        shutil.copy2(src, dst)
+
+
+def link_tree(src, dst, mode="hardlink"):
+    """Places all files below the folder src at the same relative path below dst
+    (existing files are replaced).
+
+    mode:
+    * "hardlink" -- hard links, falls back to a clone (see `clone_file`) if src and dst
+        are on different file systems or the file system has no hard links
+    * "symlink" -- relative symbolic links to the files in src
+    * "copy" -- clones (see `clone_file`), i.e. independent files
+    """
+
+    if mode not in LINK_MODES:
+        raise ValueError(f"mode={mode} not contained in allowed: {LINK_MODES}")
+
+    for root, _, files in os.walk(src):
+        target_dir = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target_dir, exist_ok=True)
+
+        for filename in files:
+            source = os.path.join(root, filename)
+            target = os.path.join(target_dir, filename)
+
+            if os.path.lexists(target):
+                os.remove(target)
+
+            if mode == "symlink":
+                os.symlink(os.path.relpath(source, target_dir), target)
+                continue
+
+            if mode == "hardlink":
+                try:
+                    os.link(source, target)
+                    continue
+                except OSError:
+                    pass
+
+            clone_file(source, target)
+
+
+def make_read_only(path):
+    """Removes the write permissions of all files below the folder path (shared files,
+    e.g. hard links, cannot be changed in place by one of the runs)."""
+    for root, _, files in os.walk(path):
+        for filename in files:
+            filepath = os.path.join(root, filename)
+            mode = os.stat(filepath).st_mode
+            os.chmod(filepath, mode & ~0o222)
+
+
 def user_query_yes_no(question: str, default=None) -> bool:
     """Ask a yes/no question via raw_input() and return their answer.
 
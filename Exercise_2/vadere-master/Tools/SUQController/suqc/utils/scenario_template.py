@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import re
+import uuid
+from copy import copy
+from typing import *
+
+from suqc.utils.dict_utils import copy_along_path, get_path_value
+
+SCENARIO_FORMATS = ["indent", "compact", "overlay"]
+
+# Suffix of overlay files, e.g. "000001_000002.scenario.overlay"
+OVERLAY_SUFFIX = ".overlay"
+
+# Templates used to materialize overlay files. Cached per process, the key contains the
+# modification time of the basis file.
+_OVERLAY_TEMPLATES = dict()
+
+
+class ScenarioTemplate(object):
+    """JSON text of a basis scenario, which is serialized only once. The values at the
+    given (concrete) paths are placeholders, which are filled in for each scenario.
+
+    A rendered scenario is identical to `json.dump` of the scenario, if the scenario
+    only differs from the basis at the paths of the template and all values at the
+    paths are scalars (lists or dicts are spliced in compact format).
+    """
+
+    def __init__(self, basis: dict, paths: List[tuple], compact: bool = False):
+
+        self.paths = [tuple(p) for p in paths]
+        self.compact = compact
+
+        # A unique token makes sure that there is no conflict with the scenario content
+        token = f"suqc_slot_{uuid.uuid4().hex}_"
+
+        slotted = copy(basis)
+        copied = {id(slotted)}
+        for i, path in enumerate(self.paths):
+            copy_along_path(slotted, path, copied)[path[-1]] = f"{token}{i}"
+
+        parts = re.split(f'"{token}(\\d+)"', self._dumps(slotted))
+
+        self.fragments = parts[0::2]
+        self.slot_order = [int(i) for i in parts[1::2]]
+
+    def _dumps(self, content):
+        if self.compact:
+            return json.dumps(content, separators=(",", ":"))
+        else:
+            return json.dumps(content, indent=4)
+
+    def render_values(self, values: list) -> str:
+        """Render the scenario with the values given in the same order as `paths`."""
+
+        text = [self.fragments[0]]
+        for slot, fragment in zip(self.slot_order, self.fragments[1:]):
+            text.append(json.dumps(values[slot]))
+            text.append(fragment)
+        return "".join(text)
+
+    def values(self, scenario: dict) -> list:
+        return [get_path_value(scenario, path) for path in self.paths]
+
+    def render(self, scenario: dict) -> str:
+        return self.render_values(self.values(scenario))
+
+
+def write_text_atomic(path, text):
+    # Write to a temporary file first, such that an existing file is always complete
+    # (e.g. if a sweep is interrupted and resumed).
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as outfile:
+        outfile.write(text)
+    os.replace(temp_path, path)
+
+
+def write_overlay(scenario_path, basis_path, template: ScenarioTemplate, scenario):
+    """Store only the values at the template paths. The scenario file is materialized
+    with `materialize_scenario` right before the simulation is started."""
+
+    overlay = {
+        "basis": os.path.relpath(basis_path, os.path.dirname(scenario_path)),
+        "paths": template.paths,
+        "values": template.values(scenario),
+    }
+    write_text_atomic(f"{scenario_path}{OVERLAY_SUFFIX}", json.dumps(overlay))
+
+
+def materialize_scenario(scenario_path) -> bool:
+    """Writes the scenario file from an overlay file if the scenario file does not
+    exist. Returns True if the scenario file was materialized."""
+
+    overlay_path = f"{scenario_path}{OVERLAY_SUFFIX}"
+
+    if os.path.exists(scenario_path) or not os.path.exists(overlay_path):
+        return False
+
+    with open(overlay_path, "r") as f:
+        overlay = json.load(f)
+
+    basis_path = os.path.join(os.path.dirname(scenario_path), overlay["basis"])
+    paths = tuple(tuple(p) for p in overlay["paths"])
+    key = (os.path.abspath(basis_path), os.path.getmtime(basis_path), paths)
+
+    if key not in _OVERLAY_TEMPLATES:
+        with open(basis_path, "r") as f:
+            basis = json.load(f)
+        _OVERLAY_TEMPLATES[key] = ScenarioTemplate(basis, list(paths))
+
+    write_text_atomic(
+        scenario_path, _OVERLAY_TEMPLATES[key].render_values(overlay["values"])
+    )
+    return True
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+"""Transfer of QoI data frames from the worker processes to the main process through
+shared memory blocks instead of pickling the data through a pipe (see the parameter
+`shared_memory` of Request.run)."""
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import *
+
+import numpy as np
+import pandas as pd
+
+# dtype kinds that are stored in shared memory: bool, int, unsigned int, float
+_NUMERIC_KINDS = "biuf"
+
+# byte alignment of the fields in a shared memory block
+_ALIGNMENT = 64
+
+
+def _aligned(nbytes):
+    return -(-nbytes // _ALIGNMENT) * _ALIGNMENT
+
+
+def start_resource_tracker():
+    """Has to be called in the main process before the worker processes are started.
+    The workers then register their blocks with the resource tracker of the main
+    process, which removes blocks that were not released when the main process exits
+    (e.g. if the sweep failed)."""
+    resource_tracker.ensure_running()
+
+
+class SharedFrame(object):
+    """Small (picklable) descriptor of a pd.DataFrame. The numeric index levels and
+    columns are stored in a shared memory block, other values (e.g. strings) are kept
+    in the descriptor.
+
+    The block is removed when the frame is read in the main process (see
+    `concat_frames`), i.e. a SharedFrame can only be read once.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        fields = [
+            np.asarray(df.index.get_level_values(i)) for i in range(df.index.nlevels)
+        ]
+        fields += [df.iloc[:, j].to_numpy() for j in range(df.shape[1])]
+
+        self.nr_rows = df.shape[0]
+        self.index_names = list(df.index.names)
+        self.columns = df.columns
+
+        # per field: (dtype, offset) in the block, or None if the values are in objects
+        self.layout = list()
+        self.objects = dict()
+
+        nbytes = 0
+        for i, values in enumerate(fields):
+            if values.dtype.kind in _NUMERIC_KINDS:
+                self.layout.append((values.dtype.str, nbytes))
+                nbytes += _aligned(values.nbytes)
+            else:
+                self.layout.append(None)
+                self.objects[i] = values
+
+        self.name = None
+        if nbytes > 0:
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            try:
+                for i, values in enumerate(fields):
+                    if self.layout[i] is not None:
+                        self._view(shm, i)[:] = values
+                self.name = shm.name
+            except BaseException:
+                shm.unlink()
+                raise
+            finally:
+                shm.close()
+
+    def _view(self, shm, i) -> np.ndarray:
+        dtype, offset = self.layout[i]
+        if shm is None:  # no rows
+            return np.empty(0, dtype=dtype)
+        return np.ndarray(self.nr_rows, dtype=dtype, buffer=shm.buf, offset=offset)
+
+    def _signature(self):
+        return self.index_names, [None if f is None else f[0] for f in self.layout]
+
+    def _has_same_layout(self, other: "SharedFrame") -> bool:
+        return (
+            self._signature() == other._signature()
+            and self.columns.equals(other.columns)
+            and self.columns.names == other.columns.names
+        )
+
+    def release(self):
+        """Removes the shared memory block (without reading it)."""
+        if self.name is not None:
+            shm = shared_memory.SharedMemory(name=self.name)
+            shm.close()
+            shm.unlink()
+            self.name = None
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.concat([self])
+
+    @staticmethod
+    def concat(frames: List["SharedFrame"]) -> pd.DataFrame:
+        """Concatenates frames with the same layout. The values of each block are copied
+        once into the final frame and the block is removed directly afterwards."""
+
+        first = frames[0]
+        nr_rows = sum(f.nr_rows for f in frames)
+        nr_levels = len(first.index_names)
+
+        fields = [None] * len(first.layout)
+        for i, field in enumerate(first.layout[:nr_levels]):
+            if field is not None:
+                fields[i] = np.empty(nr_rows, dtype=field[0])
+
+        column_dtypes = {
+            f[0] if f is not None else None for f in first.layout[nr_levels:]
+        }
+        if len(column_dtypes) == 1 and None not in column_dtypes:
+            # one (Fortran-ordered) block for all columns, which pandas uses without copy
+            block = np.empty(
+                (nr_rows, len(first.columns)), dtype=column_dtypes.pop(), order="F"
+            )
+            for j in range(block.shape[1]):
+                fields[nr_levels + j] = block[:, j]
+        else:
+            block = None
+            for i, field in enumerate(first.layout[nr_levels:], start=nr_levels):
+                if field is not None:
+                    fields[i] = np.empty(nr_rows, dtype=field[0])
+
+        start = 0
+        for frame in frames:
+            shm = None if frame.name is None else shared_memory.SharedMemory(frame.name)
+            try:
+                for i, field in enumerate(frame.layout):
+                    if field is not None:
+                        fields[i][start : start + frame.nr_rows] = frame._view(shm, i)
+            finally:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+                    frame.name = None
+            start += frame.nr_rows
+
+        for i in first.objects.keys():
+            fields[i] = np.concatenate([f.objects[i] for f in frames])
+
+        if nr_levels > 1:
+            index = pd.MultiIndex.from_arrays(
+                fields[:nr_levels], names=first.index_names
+            )
+        else:
+            index = pd.Index(fields[0], name=first.index_names[0])
+
+        if block is not None:
+            df = pd.DataFrame(block, index=index, columns=first.columns, copy=False)
+        else:
+            df = pd.DataFrame(dict(enumerate(fields[nr_levels:])), index=index)
+            df.columns = first.columns
+        return df
+
+
+def share_frames(qoi_result: Optional[Dict[str, Any]]):
+    """Replaces the pd.DataFrame values of a QoI result (filename -> data) with
+    SharedFrame descriptors (called in the worker processes)."""
+    if qoi_result is None:
+        return None
+
+    return {
+        key: SharedFrame(value) if isinstance(value, pd.DataFrame) else value
+        for key, value in qoi_result.items()
+    }
+
+
+def concat_frames(frames: List[Union[pd.DataFrame, SharedFrame]]) -> pd.DataFrame:
+    """pd.concat (axis=0) of data frames and shared frames."""
+
+    shared = [f for f in frames if isinstance(f, SharedFrame)]
+
+    if len(shared) == 0:
+        return pd.concat(frames, axis=0)
+
+    if len(shared) == len(frames) and all(
+        f._has_same_layout(shared[0]) for f in shared
+    ):
+        return SharedFrame.concat(shared)
+
+    return pd.concat(
+        [f.to_frame() if isinstance(f, SharedFrame) else f for f in frames], axis=0
+    )